@@ -1,18 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Request
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from fastapi.responses import JSONResponse
+from sse_starlette.sse import EventSourceResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, with_expression
+from typing import Optional
+from app.api.pagination import paginate
+from app.db.database import get_async_db
 from app.models.analysis import Analysis
-from app.models.skin import Skin
-from app.services.agent import analyze_skin
-from app.services.load_model import visualize_prediction
+from app.models.analysis_jobs import AnalysisJob
+from app.services import analysis_pipeline, item_counts, job_queue
+from app.core.config import settings
 from app.core.security import get_current_user
 from app.models.users import User
 from app.schemas.responses import APIResponse
-from app.models.journals import Journals
 import aiofiles
 import os
 from datetime import datetime
-import json
 
 router = APIRouter()
 
@@ -51,9 +55,8 @@ router = APIRouter()
 #         data={"analysis_id": analysis_id}
 #     )
 
-@router.post("/analyze", response_model=APIResponse)
-async def analyze_skin_image(request: Request, image: UploadFile = File(...), current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Upload and analyze skin image"""
+async def save_upload(image: UploadFile, current_user: User):
+    """Validasi dan simpan upload; return (filename, filepath, filepath_classify, content)"""
     # Validate image format
     if not image.content_type.startswith("image/"):
         raise HTTPException(
@@ -76,116 +79,74 @@ async def analyze_skin_image(request: Request, image: UploadFile = File(...), cu
     filepath = os.path.join(upload_dir, filename)
 
     # Save the uplaoded file
-    with open(filepath, "wb") as buffer:
-        buffer.write(await image.read())
+    content = await image.read()
+    async with aiofiles.open(filepath, "wb") as buffer:
+        await buffer.write(content)
 
     filename_classify = filename.replace(".", "_classify.")
     filepath_classify = os.path.join(classify_dir, filename_classify)
-    
-    # with open(filepath_classify, "wb") as buffer:
-    #     buffer.write(await visualize_prediction(image_path=filepath).read())
+    return filename, filepath, filepath_classify, content
+
+
+@router.post("/analyze", response_model=APIResponse)
+async def analyze_skin_image(
+    request: Request,
+    image: UploadFile = File(...),
+    mode: str = "sync",
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Upload and analyze skin image.
+
+    mode=sync (default) menunggu hasil; mode=job langsung mengembalikan 202
+    dengan job id, progress dicek lewat GET /analysis/jobs/{job_id}.
+    """
+    if mode not in ("sync", "job"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="mode must be 'sync' or 'job'"
+        )
+
+    filename, filepath, filepath_classify, content = await save_upload(image, current_user)
+    image_url = str(request.base_url)[:-1] + f"/uploads/skin-images/{filename}"
+
+    if mode == "job":
+        job = await db.run_sync(job_queue.enqueue, current_user.id, filepath, filepath_classify, image_url)
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=APIResponse(
+                success=True,
+                message="Analysis job queued",
+                data={"job": job_queue.job_status(job)}
+            ).model_dump(mode="json"),
+            headers={"Location": f"{request.url.path.rsplit('/', 1)[0]}/jobs/{job.id}"}
+        )
     
     # Perform AI analysis
     try:
-        # Called visualize_prediction and catch the result
-        saved_classify_path = visualize_prediction(filepath, filepath_classify)
-        
-        if not saved_classify_path or not os.path.exists(saved_classify_path):
-            print("Warning: Visualization failed, using original image")
-            import shutil
-            shutil.copy(filepath, filepath_classify)
-            saved_classify_path = filepath_classify
-        
-        query = db.query(Journals).filter(Journals.user_id == current_user.id)
-
-        journals = query.order_by(Journals.created_at.desc()).all()
-        # Convert SQLAlchemy model to dictionary
-        journals_list = []
-        for journal in journals:
-            journals_list.append({
-                "title": journal.title,
-                "content": journal.content,
-                "created_at": journal.created_at,
-                "updated_at": journal.updated_at
-            })
+        # Klasifikasi + render di thread pool agar event loop tidak terblokir
+        prediction = await analysis_pipeline.predict(content)
+        await analysis_pipeline.classify(filepath, filepath_classify, image_bytes=content, prediction=prediction)
+        # Agent menerima foto ringkas di memori + prediksi sebagai teks, bukan gambar klasifikasi
+        agent_input = await analysis_pipeline.prepare_agent_input(filepath, image_bytes=content, prediction=prediction)
 
+        journals_list = await db.run_sync(analysis_pipeline.load_journals, current_user.id)
+        # Lepas koneksi DB selama tahap agent
+        await db.commit()
         
         user_country = current_user.country
-        analysis_result = analyze_skin(image_url=filepath_classify, country=user_country, journals=journals_list)
-
-        # Validate and convert AI response
-        if isinstance(analysis_result, str):
-            analysis_result = json.loads(analysis_result)
-
-        # Validate required fields
-        required_fields = ["overall_health", "skin_type", "concerns", "recommendations", "analysis_metrics", "skincare_products"]
-        if not all(field in analysis_result for field in required_fields):
-            raise ValueError("Invalid AI response structure")
-        
-        # Create analysis record
-        analysis = Analysis(
-            user_id=current_user.id,
-            image_url=str(request.base_url)[:-1] + f"/uploads/skin-images/{filename}",
-            overall_health=analysis_result["overall_health"],
-            skin_type=analysis_result["skin_type"],
-            concerns=analysis_result["concerns"],
-            recommendations=analysis_result["recommendations"],
-            analysis_metrics=analysis_result["analysis_metrics"],
-            skincare_products=analysis_result["skincare_products"]
+        # Jika Gemini tidak tersedia, hasil provisional dari ONNX (di-upgrade otomatis lewat job queue)
+        analysis_result = await analysis_pipeline.analyze(
+            country=user_country, journals=journals_list, agent_input=agent_input, user_id=current_user.id
         )
-        db.add(analysis)
-
-        # Update or create skin profile
-        skin = db.query(Skin).filter(Skin.user_id == current_user.id).first()
-        concerns_list = [concern["name"] for concern in analysis_result["concerns"]]
-
-        if not skin:
-            skin = Skin(
-                user_id=current_user.id,
-                skin_type=analysis_result["skin_type"],
-                concerns=", ".join(concerns_list)
-            )
-            db.add(skin)
-        else:
-            skin.skin_type = analysis_result["skin_type"]
-            skin.concerns = ", ".join(concerns_list)
-        
-        db.commit()
-        db.refresh(analysis)
-
-        # # Convert SQLAlchemy model to Pydantic model for serialization
-        # analysis_response = AnalysisResponse(
-        #     id=analysis.id,
-        #     user_id=analysis.user_id,
-        #     image_url=analysis.image_url,
-        #     created_at=analysis.created_at,
-        #     overall_health=analysis.overall_health,
-        #     skin_type=analysis.skin_type,
-        #     concerns=analysis.concerns,
-        #     recommendations=analysis.recommendations,
-        #     analysis_metrics=analysis.analysis_metrics
-        # )
+
+        analysis, concerns_list = await db.run_sync(analysis_pipeline.save_analysis, current_user.id, image_url, analysis_result)
 
         return APIResponse(
             success=True,
-            message="Image analyzed successfully",
-            data={
-                "analysis": {
-                    "id": analysis.id,
-                    "image_url": analysis.image_url,
-                    "overall_health": analysis.overall_health,
-                    "skin_type": analysis.skin_type,
-                    "concerns": analysis.concerns,
-                    "recommendations": analysis.recommendations,
-                    "analysis_metrics": analysis.analysis_metrics,
-                    "skincare_products": analysis.skincare_products,
-                    "created_at": analysis.created_at.isoformat()
-                },
-                "skin_profile": {
-                    "skin_type": analysis_result["skin_type"],
-                    "concerns": concerns_list
-                }
-            }
+            message="Provisional analysis created, full AI analysis will follow" if analysis.provisional else "Image analyzed successfully",
+            data=analysis_pipeline.analysis_response_data(analysis, concerns_list)
         )
     except Exception as e:
         # Clean up the uploaded file if analysis fails
@@ -198,6 +159,66 @@ async def analyze_skin_image(request: Request, image: UploadFile = File(...), cu
             detail=f"Analysis failed: {str(e)}"
         )
 
+
+@router.post("/analyze/stream")
+async def analyze_skin_image_stream(
+    request: Request,
+    image: UploadFile = File(...),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Upload and analyze skin image dengan Server-Sent Events.
+
+    Event: stage, prediction (hasil ONNX), classification (URL gambar klasifikasi),
+    agent_progress, result (sama dengan data /analyze) atau error.
+    """
+    filename, filepath, filepath_classify, content = await save_upload(image, current_user)
+    base_url = str(request.base_url)[:-1]
+    journals_list = await db.run_sync(analysis_pipeline.load_journals, current_user.id)
+
+    return EventSourceResponse(
+        analysis_pipeline.stream_analysis(
+            user_id=current_user.id,
+            filepath=filepath,
+            filepath_classify=filepath_classify,
+            image_bytes=content,
+            image_url=base_url + f"/uploads/skin-images/{filename}",
+            classify_url=base_url + f"/uploads/classify/{os.path.basename(filepath_classify)}",
+            country=current_user.country,
+            journals=journals_list,
+        ),
+        ping=settings.ANALYSIS_STREAM_PING_SECONDS,
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=APIResponse)
+async def get_analysis_job(job_id: str, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Status job analisis per tahap; berisi hasil analysis jika sudah selesai"""
+    job = await db.scalar(select(AnalysisJob).where(
+        AnalysisJob.id == job_id,
+        AnalysisJob.user_id == current_user.id
+    ))
+
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Analysis job not found"
+        )
+
+    data = {"job": job_queue.job_status(job)}
+    # Relasi job.analysis tidak bisa lazy load di AsyncSession
+    analysis = await db.get(Analysis, job.analysis_id) if job.analysis_id else None
+    if analysis is not None:
+        concerns_list = [concern["name"] for concern in analysis.concerns or []]
+        data.update(analysis_pipeline.analysis_response_data(analysis, concerns_list))
+
+    return APIResponse(
+        success=True,
+        message="Analysis job retrieved successfully",
+        data=data
+    )
+
     
     # # Mock response for development
     # analysis_data = {
@@ -239,56 +260,108 @@ async def analyze_skin_image(request: Request, image: UploadFile = File(...), cu
     
 
 
+# Field item history. "summary" untuk list UI: kolom JSON besar
+# (recommendations, skincare_products) tidak dimuat dari database
+HISTORY_VIEWS = {
+    "summary": ("id", "image_url", "overall_health", "skin_type", "top_concerns", "overall_score", "provisional", "created_at"),
+    "full": (
+        "id", "user_id", "image_url", "overall_health", "skin_type", "concerns", "recommendations",
+        "analysis_metrics", "skincare_products", "provisional", "created_at",
+    ),
+}
+HISTORY_FIELDS = HISTORY_VIEWS["full"] + ("top_concerns", "overall_score", "updated_at")
+HISTORY_TOP_CONCERNS = 3
+
+
+def _history_fields(view, fields):
+    """Field view + tambahan dari ?fields=a,b (sparse fieldset); HTTP 400 jika tidak dikenal"""
+    if view not in HISTORY_VIEWS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown view: {view}")
+    extra = [field.strip() for field in (fields or "").split(",") if field.strip()]
+    unknown = [field for field in extra if field not in HISTORY_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(HISTORY_VIEWS[view] + tuple(extra)))
+
+
+def _history_options(fields):
+    """Muat hanya kolom yang dibutuhkan; akses kolom lain raise (bukan lazy load diam-diam)"""
+    columns = {"id", "created_at"}
+    for field in fields:
+        if field == "top_concerns":
+            columns.add("concerns")
+        elif field != "overall_score":
+            columns.add(field)
+    options = [load_only(*[getattr(Analysis, column) for column in sorted(columns)], raiseload=True)]
+    if "overall_score" in fields:
+        # Diambil dengan JSON extract di database, analysis_metrics tidak ikut dimuat
+        options.append(with_expression(Analysis.overall_score, Analysis.analysis_metrics["overall_score"].as_integer()))
+    return options
+
+
+def _top_concerns(concerns):
+    """Nama concern dengan confidence tertinggi"""
+    concerns = [concern for concern in concerns or [] if isinstance(concern, dict)]
+    concerns.sort(key=lambda concern: concern.get("confidence") or 0, reverse=True)
+    return [concern.get("name") for concern in concerns[:HISTORY_TOP_CONCERNS]]
+
+
+def _history_item(analysis, fields):
+    item = {}
+    for field in fields:
+        if field == "top_concerns":
+            item[field] = _top_concerns(analysis.concerns)
+        elif field in ("created_at", "updated_at"):
+            value = getattr(analysis, field)
+            item[field] = value.isoformat() if value else None
+        else:
+            item[field] = getattr(analysis, field)
+    return item
+
+
 @router.get("/history", response_model=APIResponse)
 async def get_analysis_history(
     current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     skip: int = 0,
-    limit: int = 10
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None,
+    view: str = "full",
+    fields: Optional[str] = None
 ):
-    """Get users' analysis history with pagination"""
-    total = db.query(Analysis).filter(Analysis.user_id == current_user.id).count()
-    analyses = db.query(Analysis)\
-        .filter(Analysis.user_id == current_user.id)\
-        .order_by(Analysis.created_at.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
-    
-    # Convert SQLAlchemy models to dictionaries
-    analysis_list = []
-    for analysis in analyses:
-        analysis_list.append({
-            "id": analysis.id,
-            "user_id": analysis.user_id,
-            "image_url": analysis.image_url,
-            "overall_health": analysis.overall_health,
-            "skin_type": analysis.skin_type,
-            "concerns": analysis.concerns,
-            "recommendations": analysis.recommendations,
-            "analysis_metrics": analysis.analysis_metrics,
-            "skincare_products": analysis.skincare_products,
-            "created_at": analysis.created_at.isoformat()
-        })
-    
+    """
+    Get users' analysis history with pagination (cursor or offset, see app/api/pagination.py).
+    view=summary returns a lean item for list UIs; fields=a,b adds fields to the view.
+    """
+    item_fields = _history_fields(view, fields)
+    analyses, page = await paginate(
+        db,
+        select(Analysis).where(Analysis.user_id == current_user.id).options(*_history_options(item_fields)),
+        Analysis,
+        current_user.id,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        include_total=include_total,
+    )
+
     return APIResponse(
         success=True,
         message="Analysis history retrieved successfully",
         data={
-            "items": analysis_list,
-            "total": total,
-            "skip": skip,
-            "limit": limit
+            "items": [_history_item(analysis, item_fields) for analysis in analyses],
+            **page
         }
     )
 
 @router.get("/get-analysis/{analysis_id}", response_model=APIResponse)
-async def get_analysis(analysis_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_analysis(analysis_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Get specific analysis results"""
-    analysis = db.query(Analysis).filter(
+    analysis = await db.scalar(select(Analysis).where(
         Analysis.id == analysis_id, 
         Analysis.user_id == current_user.id
-    ).first()
+    ))
 
     if not analysis:
         raise HTTPException(
@@ -307,6 +380,7 @@ async def get_analysis(analysis_id: int, current_user: User = Depends(get_curren
         "recommendations": analysis.recommendations,
         "analysis_metrics": analysis.analysis_metrics,
         "skincare_products": analysis.skincare_products,
+        "provisional": analysis.provisional,
         "created_at": analysis.created_at.isoformat()
     }
     
@@ -317,12 +391,12 @@ async def get_analysis(analysis_id: int, current_user: User = Depends(get_curren
     )
 
 @router.delete("/delete-analysis/{analysis_id}", response_model=APIResponse)
-async def delete_analysis(analysis_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def delete_analysis(analysis_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Delete an analysis record"""
-    analysis = db.query(Analysis).filter(
+    analysis = await db.scalar(select(Analysis).where(
         Analysis.id == analysis_id, 
         Analysis.user_id == current_user.id
-    ).first()
+    ))
 
     if not analysis:
         raise HTTPException(
@@ -349,8 +423,9 @@ async def delete_analysis(analysis_id: int, current_user: User = Depends(get_cur
             if os.path.exists(classified_image):
                 os.remove(classified_image)
 
-    db.delete(analysis)
-    db.commit()
+    await db.delete(analysis)
+    await db.commit()
+    item_counts.invalidate(current_user.id, "analyses")
 
     return APIResponse(
         success=True,
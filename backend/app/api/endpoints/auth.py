@@ -1,3 +1,4 @@
+import asyncio
 from jose import JWTError
 from fastapi import APIRouter, HTTPException, Depends, status, Body
 from fastapi.security import OAuth2PasswordRequestForm
@@ -6,9 +7,10 @@ from typing import Optional
 from passlib.context import CryptContext
 import re 
 from datetime import timedelta
-from app.db.database import get_db 
+from app.db.database import get_async_db
 from app.models.users import User
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.security import create_access_token, create_refresh_token
 from app.core.config import settings 
 from jose import jwt
@@ -43,9 +45,9 @@ class Token(BaseModel):
     token_type: str 
 
 @router.post('/register', status_code=status.HTTP_201_CREATED)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Check if email already exists
-    db_user = db.query(User).filter(User.email == user.email).first()
+    db_user = await db.scalar(select(User).where(User.email == user.email))
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -60,8 +62,8 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
     #         detail="Gemini API key already registered"
     #     )
     
-    # Hash password and create user
-    hashed_password = pwd_context.hash(user.password)
+    # Hash password and create user (bcrypt di thread agar event loop tidak terblokir)
+    hashed_password = await asyncio.to_thread(pwd_context.hash, user.password)
     db_user = User(
         name=user.name,
         email=user.email,
@@ -71,8 +73,8 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
     )
 
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
 
     # Generate access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -95,9 +97,9 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not pwd_context.verify(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(User).where(User.email == form_data.username))
+    if not user or not await asyncio.to_thread(pwd_context.verify, form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -121,7 +123,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
 
 
 @router.post("/refresh", response_model=Token)
-async def refresh_token(refresh_token: str = Body(...), db: Session = Depends(get_db)):
+async def refresh_token(refresh_token: str = Body(...), db: AsyncSession = Depends(get_async_db)):
     try:
         payload = jwt.decode(
             refresh_token,
@@ -135,7 +137,7 @@ async def refresh_token(refresh_token: str = Body(...), db: Session = Depends(ge
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
         
         # Verify user still exists
-        user = db.query(User).filter(User.email == email).first()
+        user = await db.scalar(select(User).where(User.email == email))
         if user is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
         
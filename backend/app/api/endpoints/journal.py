@@ -1,18 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 
-from app.db.database import get_db
+from app.api.pagination import paginate
+from app.db.database import get_async_db
 from app.models.journals import Journals
 from app.models.users import User 
 from app.schemas.journal import JournalCreate
 from app.schemas.responses import APIResponse
 from app.core.security import get_current_user
+from app.services import item_counts
+from app.services.journal_context import invalidate_summary
 
 router = APIRouter()
 
 
 @router.post("/create-journal", response_model=APIResponse)
-async def create_journal(journal_data: JournalCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def create_journal(journal_data: JournalCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Create a new journal entry."""
     journal = Journals(
         user_id=current_user.id,
@@ -20,8 +25,9 @@ async def create_journal(journal_data: JournalCreate, current_user: User = Depen
         content=journal_data.content
     )
     db.add(journal)
-    db.commit()
-    db.refresh(journal)
+    await db.commit()
+    item_counts.invalidate(current_user.id, "journals")
+    await db.refresh(journal)
 
     # Convert SQLAlchemy model to dictionary
     journal_dict = {
@@ -41,12 +47,25 @@ async def create_journal(journal_data: JournalCreate, current_user: User = Depen
 
 
 @router.get("/get-journals", response_model=APIResponse)
-async def get_journals(current_user: User = Depends(get_current_user), db: Session = Depends(get_db), skip: int = 0, limit: int = 10):
-    """Get user's journal entries with pagination and optional mood filter"""
-    query = db.query(Journals).filter(Journals.user_id == current_user.id)
-
-    total = query.count()
-    journals = query.order_by(Journals.created_at.desc()).offset(skip).limit(limit).all()
+async def get_journals(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None
+):
+    """Get user's journal entries with pagination (cursor or offset, see app/api/pagination.py)"""
+    journals, page = await paginate(
+        db,
+        select(Journals).where(Journals.user_id == current_user.id),
+        Journals,
+        current_user.id,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        include_total=include_total,
+    )
 
     # Convert SQLAlchemy models to dictionaries
     journals_list = []
@@ -65,20 +84,18 @@ async def get_journals(current_user: User = Depends(get_current_user), db: Sessi
         message="Journals retrieved successfully",
         data={
             "items": journals_list,
-            "total": total,
-            "skip": skip,
-            "limit": limit
+            **page
         }
     )
 
 
 @router.get("/get-journal/{journal_id}", response_model=APIResponse)
-async def get_journal(journal_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_journal(journal_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Get a specific journal entry"""
-    journal = db.query(Journals).filter(
+    journal = await db.scalar(select(Journals).where(
         Journals.id == journal_id,
         Journals.user_id == current_user.id
-    ).first()
+    ))
 
     if not journal:
         raise HTTPException(
@@ -108,13 +125,13 @@ async def update_journal(
     journal_id: int,
     journal_data: JournalCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a journal entry"""
-    journal = db.query(Journals).filter(
+    journal = await db.scalar(select(Journals).where(
         Journals.id == journal_id,
         Journals.user_id == current_user.id
-    ).first()
+    ))
 
     if not journal:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Journal not found")
@@ -123,8 +140,9 @@ async def update_journal(
     journal.title = journal_data.title 
     journal.content = journal_data.content 
 
-    db.commit()
-    db.refresh(journal)
+    await db.commit()
+    await db.refresh(journal)
+    await db.run_sync(invalidate_summary, current_user.id, journal.id)
 
     # Convert SQLAlchemy model to dictionary
     journal_dict = {
@@ -144,12 +162,12 @@ async def update_journal(
 
 
 @router.delete("/delete-journal/{journal_id}", response_model=APIResponse)
-async def delete_journal(journal_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def delete_journal(journal_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """ Delete a journal entry"""
-    journal = db.query(Journals).filter(
+    journal = await db.scalar(select(Journals).where(
         Journals.id == journal_id,
         Journals.user_id == current_user.id
-    ).first()
+    ))
 
     if not journal:
         raise HTTPException(
@@ -157,8 +175,10 @@ async def delete_journal(journal_id: int, current_user: User = Depends(get_curre
             detail="Journal not found"
         )
     
-    db.delete(journal)
-    db.commit()
+    await db.delete(journal)
+    await db.commit()
+    item_counts.invalidate(current_user.id, "journals")
+    await db.run_sync(invalidate_summary, current_user.id, journal_id)
 
     return APIResponse(
         success=True,
@@ -1,19 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, status 
-from sqlalchemy.orm import Session 
-from typing import List 
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
-from app.db.database import get_db
+from app.api.pagination import paginate
+from app.db.database import get_async_db
 from app.models.products import Products
 from app.models.users import User 
 from app.schemas.product import ProductCreate, ProductResponse
 from app.schemas.responses import APIResponse
 from app.core.security import get_current_user
+from app.services import item_counts
 
 
 router = APIRouter()
 
 @router.post("/create-product", response_model=APIResponse)
-async def create_product(product_data: ProductCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def create_product(product_data: ProductCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     product = Products(
         user_id=current_user.id,
         product_name=product_data.product_name,
@@ -22,8 +25,9 @@ async def create_product(product_data: ProductCreate, current_user: User = Depen
     )
 
     db.add(product)
-    db.commit()
-    db.refresh(product)
+    await db.commit()
+    item_counts.invalidate(current_user.id, "products")
+    await db.refresh(product)
 
     # Convert SQLAlchemy model to dictionary
     product_dict = {
@@ -45,9 +49,24 @@ async def create_product(product_data: ProductCreate, current_user: User = Depen
 
 
 @router.get("/get-products", response_model=APIResponse)
-async def get_products(current_user: User = Depends(get_current_user), db: Session = Depends(get_db), skip: int = 0, limit: int = 10):
-    total = db.query(Products).filter(Products.user_id == current_user.id).count()
-    products = db.query(Products).filter(Products.user_id == current_user.id).order_by(Products.created_at.desc()).offset(skip).limit(limit).all()
+async def get_products(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None
+):
+    products, page = await paginate(
+        db,
+        select(Products).where(Products.user_id == current_user.id),
+        Products,
+        current_user.id,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        include_total=include_total,
+    )
 
     # Convert SQLAlchemy models to dictionaries
     products_list = []
@@ -67,15 +86,13 @@ async def get_products(current_user: User = Depends(get_current_user), db: Sessi
         message="Products retrieved successfully",
         data={
             "items": products_list,
-            "total": total,
-            "skip": skip,
-            "limit": limit
+            **page
         }
     )
 
 
 # @router.get("/{product_id}", response_model=APIResponse)
-# async def get_product(product_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+# async def get_product(product_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
 #     product = db.query(Products).filter(Products.id == product_id, Products.user_id == current_user.id).first()
 
 #     if not product:
@@ -94,11 +111,11 @@ async def get_products(current_user: User = Depends(get_current_user), db: Sessi
 
 
 @router.put("/update-product/{product_id}", response_model=APIResponse)
-async def update_product(product_id: int, product_data: ProductCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    product = db.query(Products).filter(
+async def update_product(product_id: int, product_data: ProductCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    product = await db.scalar(select(Products).where(
         Products.id == product_id,
         Products.user_id == current_user.id
-    ).first()
+    ))
 
     if not product:
         return APIResponse(
@@ -111,8 +128,8 @@ async def update_product(product_id: int, product_data: ProductCreate, current_u
     product.product_category = product_data.product_category
     product.ai_recommendation = product_data.ai_recommendation
 
-    db.commit()
-    db.refresh(product)
+    await db.commit()
+    await db.refresh(product)
 
     # Convert SQLAlchemy model to dictionary
     product_dict = {
@@ -133,11 +150,11 @@ async def update_product(product_id: int, product_data: ProductCreate, current_u
 
 
 @router.delete("/delete-product/{product_id}", response_model=APIResponse)
-async def delete_product(product_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    product = db.query(Products).filter(
+async def delete_product(product_id: int, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    product = await db.scalar(select(Products).where(
         Products.id == product_id,
         Products.user_id == current_user.id
-    ).first()
+    ))
 
     if not product:
         return APIResponse(
@@ -146,8 +163,9 @@ async def delete_product(product_id: int, current_user: User = Depends(get_curre
             data=None
         )
 
-    db.delete(product)
-    db.commit()
+    await db.delete(product)
+    await db.commit()
+    item_counts.invalidate(current_user.id, "products")
 
     return APIResponse(
         success=True,
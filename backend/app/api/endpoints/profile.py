@@ -1,10 +1,13 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status, Request 
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_db
 from app.models.users import User 
 from app.core.security import get_current_user, pwd_context
 from pydantic import BaseModel, EmailStr, validator
 from app.schemas.responses import APIResponse
+from app.services import item_counts
 from typing import Optional
 import re
 from fastapi import UploadFile, File 
@@ -36,7 +39,7 @@ router = APIRouter()
 async def update_profile(
     user_update: UserProfileUpdate, 
     current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update user profile including password"""
     # Validate current password if trying to change password or email
@@ -48,7 +51,7 @@ async def update_profile(
 
     # Verify current password if provided
     if user_update.current_password:
-        if not pwd_context.verify(user_update.current_password, current_user.hashed_password):
+        if not await asyncio.to_thread(pwd_context.verify, user_update.current_password, current_user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Current password is incorrect"
@@ -56,7 +59,7 @@ async def update_profile(
 
     # Update email if provided
     if user_update.email and user_update.email != current_user.email:
-        existing_user = db.query(User).filter(User.email == user_update.email).first()
+        existing_user = await db.scalar(select(User).where(User.email == user_update.email))
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -70,11 +73,11 @@ async def update_profile(
 
     # Update password if provided
     if user_update.new_password:
-        current_user.hashed_password = pwd_context.hash(user_update.new_password)
+        current_user.hashed_password = await asyncio.to_thread(pwd_context.hash, user_update.new_password)
 
     try:
-        db.commit()
-        db.refresh(current_user)
+        await db.commit()
+        await db.refresh(current_user)
 
         return APIResponse(
             success=True,
@@ -87,7 +90,7 @@ async def update_profile(
             }
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while updating the profile"
@@ -110,7 +113,7 @@ async def get_profile(request: Request, current_user: User = Depends(get_current
 
 
 @router.delete("/delete-account", response_model=APIResponse)
-async def delete_account(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def delete_account(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Delete user account permanently"""
     try:
         # Delete profile image if exists
@@ -121,8 +124,9 @@ async def delete_account(current_user: User = Depends(get_current_user), db: Ses
                 os.remove(image_path)
         
         # Delete the user (cascading delete will handle related records)
-        db.delete(current_user)
-        db.commit()
+        await db.delete(current_user)
+        await db.commit()
+        item_counts.invalidate(current_user.id)
 
         return APIResponse(
             success=True,
@@ -130,7 +134,7 @@ async def delete_account(current_user: User = Depends(get_current_user), db: Ses
             data=None
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while deleting the account"
@@ -138,7 +142,7 @@ async def delete_account(current_user: User = Depends(get_current_user), db: Ses
     
 
 @router.post("/upload-profile-image", response_model=APIResponse)
-async def upload_profile_image(request: Request, file: UploadFile = File(...), current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def upload_profile_image(request: Request, file: UploadFile = File(...), current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Upload profile image for user"""
     # Validate image format
     if not file.content_type.startswith("image/"):
@@ -170,7 +174,7 @@ async def upload_profile_image(request: Request, file: UploadFile = File(...), c
     # Update user profile image
     file_path_url = f"/{filepath.replace(os.sep, '/')}"  # Convert path to URL format
     current_user.profile_image = file_path_url
-    db.commit()
+    await db.commit()
 
    
     base_url_image = f"{str(request.base_url)[:-1]}{file_path_url}"
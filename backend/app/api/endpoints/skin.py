@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session 
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.database import get_db
+from app.db.database import get_async_db
 from app.models.skin import Skin
 from app.models.users import User 
 from app.schemas.skin import SkinCreate, SkinResponse, SkinUpdate
@@ -16,12 +18,12 @@ router = APIRouter()
 @router.get("/get-profile-skin", response_model=APIResponse)
 async def get_profile_skin(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get user profile skin"""
-    query = db.query(Skin).filter(
+    query = await db.scalar(select(Skin).where(
         Skin.user_id == current_user.id
-    ).first()
+    ))
 
     if not query:
         return APIResponse(
@@ -45,9 +47,9 @@ async def get_profile_skin(
 
 
 @router.post("/create-profile-skin", response_model=APIResponse)
-async def create_profile_skin(skin_create: SkinCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def create_profile_skin(skin_create: SkinCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Create new skin profile"""
-    existing_skin = db.query(Skin).filter(Skin.user_id == current_user.id).first()
+    existing_skin = await db.scalar(select(Skin).where(Skin.user_id == current_user.id))
     if existing_skin:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -66,8 +68,8 @@ async def create_profile_skin(skin_create: SkinCreate, current_user: User = Depe
             concerns=concerns_str
         )
         db.add(skin)
-        db.commit()
-        db.refresh(skin)
+        await db.commit()
+        await db.refresh(skin)
 
         return APIResponse(
             success=True,
@@ -81,8 +83,15 @@ async def create_profile_skin(skin_create: SkinCreate, current_user: User = Depe
                 updated_at=skin.updated_at
             )
         )
+    except IntegrityError:
+        # Request bersamaan: unique index skin.user_id menolak profil kedua
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Skin profile already exists"
+        )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Creation failed: {str(e)}"
@@ -92,9 +101,9 @@ async def create_profile_skin(skin_create: SkinCreate, current_user: User = Depe
 async def update_skin_profile(
     skin_update: SkinUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    skin = db.query(Skin).filter(Skin.user_id == current_user.id).first()
+    skin = await db.scalar(select(Skin).where(Skin.user_id == current_user.id))
     if not skin:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -104,8 +113,8 @@ async def update_skin_profile(
     try:
         skin.skin_type = skin_update.skin_type
         skin.concerns = skin_update.concerns if isinstance(skin_update.concerns, str) else ", ".join(skin_update.concerns)
-        db.commit()
-        db.refresh(skin)
+        await db.commit()
+        await db.refresh(skin)
 
         return APIResponse(
             success=True,
@@ -120,7 +129,7 @@ async def update_skin_profile(
             )
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Update failed: {str(e)}"
@@ -0,0 +1,114 @@
+"""
+Paginasi list per user (history analisis, journal, produk).
+
+Dua mode, urutan sama (created_at DESC, id DESC):
+
+- cursor : ?cursor=<next_cursor halaman sebelumnya>. Keyset
+           (created_at, id) < (cursor) lewat index (user_id, created_at),
+           jadi latency halaman ke-1000 sama dengan halaman pertama.
+- offset : ?skip=N (perilaku lama, untuk client yang sudah ada). OFFSET
+           tetap membaca N baris yang dilewati.
+
+Kedua mode mengembalikan next_cursor (None di halaman terakhir), jadi client
+offset bisa pindah ke cursor kapan saja. `total` opt-in lewat
+?include_total=true (default true di mode offset agar response lama tidak
+berubah) dan diambil dari cache per user (services/item_counts.py).
+
+Cursor adalah token opaque: base64url dari JSON {jenis, created_at, id}.
+Di SQLite created_at disimpan sebagai teks dengan format yang berbeda
+(server_default CURRENT_TIMESTAMP tanpa mikrodetik, default Python dengan
+mikrodetik), jadi cursor menyimpan teks mentah kolom dan membandingkannya
+sebagai teks; membandingkan dengan datetime hasil parse akan mengulang baris
+dengan detik yang sama.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import String, literal, tuple_, type_coerce
+
+from app.services.item_counts import cached_total
+
+CURSOR_COLUMN = "cursor_created_at"
+
+
+def encode_cursor(kind, created_at, item_id) -> str:
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    payload = json.dumps({"k": kind, "c": created_at, "i": item_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(kind, cursor) -> Tuple[str, int]:
+    """(created_at, id) dari cursor; HTTP 400 jika rusak atau milik list lain"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if payload["k"] != kind or not isinstance(payload["c"], str) or not isinstance(payload["i"], int):
+            raise ValueError(payload)
+        return payload["c"], payload["i"]
+    except (ValueError, KeyError, TypeError, UnicodeError, binascii.Error):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def _cursor_bound(db, created_at):
+    """Nilai pembanding created_at dengan tipe yang sama seperti yang tersimpan"""
+    if db.bind.dialect.name == "sqlite":
+        return literal(created_at, String())
+    try:
+        return literal(datetime.fromisoformat(created_at))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+async def paginate(
+    db,
+    statement,
+    model,
+    user_id,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None,
+) -> Tuple[List, Dict]:
+    """
+    Jalankan `statement` (select(model) yang sudah difilter per user) satu
+    halaman; return (item ORM, metadata halaman untuk data response)
+    """
+    kind = model.__tablename__
+    if limit < 1:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="limit must be at least 1")
+    if skip < 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="skip must not be negative")
+    if cursor and skip:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Use either cursor or skip, not both")
+
+    statement = statement\
+        .add_columns(type_coerce(model.created_at, String).label(CURSOR_COLUMN))\
+        .order_by(model.created_at.desc(), model.id.desc())
+    if cursor:
+        created_at, item_id = decode_cursor(kind, cursor)
+        statement = statement.where(
+            tuple_(model.created_at, model.id) < tuple_(_cursor_bound(db, created_at), literal(item_id))
+        )
+    elif skip:
+        statement = statement.offset(skip)
+
+    # Satu baris ekstra menandakan masih ada halaman berikutnya
+    rows = (await db.execute(statement.limit(limit + 1))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if include_total is None:
+        include_total = not cursor
+    last = rows[-1] if rows else None
+    page = {
+        "total": await cached_total(db, model, user_id) if include_total else None,
+        "skip": None if cursor else skip,
+        "limit": limit,
+        "next_cursor": encode_cursor(kind, last[1], last[0].id) if has_more else None,
+    }
+    return [row[0] for row in rows], page
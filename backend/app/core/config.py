@@ -1,9 +1,28 @@
 from pydantic_settings import BaseSettings
 import os
+from typing import Optional
 
 class Settings(BaseSettings):
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
     DATABASE_URL: str = "sqlite:///./rona_ai.db"
+    ASYNC_DATABASE_URL: Optional[str] = None  # default: DATABASE_URL dengan driver aiosqlite / asyncpg
+
+    # Engine database (app/db/database.py); pragma SQLite None = default SQLite
+    SQLITE_JOURNAL_MODE: Optional[str] = "wal"  # wal: writer tidak memblokir reader
+    SQLITE_SYNCHRONOUS: Optional[str] = "normal"  # normal aman untuk WAL (hanya commit terakhir bisa hilang saat OS crash)
+    SQLITE_BUSY_TIMEOUT_MS: Optional[int] = 5000  # tunggu lock tulis sebelum "database is locked"
+    SQLITE_CACHE_SIZE_KB: Optional[int] = 64 * 1024  # page cache per koneksi
+    SQLITE_MMAP_SIZE_MB: Optional[int] = 256
+    DB_POOL_SIZE: int = 10  # per engine (sync dan async masing-masing punya pool)
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_PRE_PING: bool = True  # server database: cek koneksi sebelum dipakai
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # server database: tutup koneksi lebih tua dari ini; -1 = nonaktif
+
+    # Paginasi list history/journal/produk (app/api/pagination.py, services/item_counts.py)
+    ITEM_COUNT_CACHE_TTL_SECONDS: float = 300.0  # batas basi total antar worker; dalam satu proses diinvalidasi saat tulis
+    ITEM_COUNT_CACHE_MAX_ENTRIES: int = 10000  # (jenis, user)
+
     PROJECT_NAME: str = "RonaAI"
     API_V1_STR: str = "/api/v1"
     SECRET_KEY: str = os.urandom(32).hex()
@@ -11,6 +30,127 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
     ALLOWED_ORIGINS: list = ["*"]
 
+    # Model ONNX: fp32 | int8 | fp16 (lihat services/model_variants.py)
+    MODEL_VARIANT: str = "fp32"
+
+    # Pipeline analisis (/analysis/analyze)
+    ANALYSIS_CPU_WORKERS: int = 2  # thread untuk klasifikasi ONNX + render
+    ANALYSIS_MAX_CONCURRENT_CLASSIFY: int = 4
+    ANALYSIS_MAX_CONCURRENT_AGENT: int = 8  # request Gemini yang berjalan bersamaan
+    ANALYSIS_STREAM_PROGRESS_SECONDS: float = 2.0  # interval event agent_progress (SSE)
+    ANALYSIS_STREAM_PING_SECONDS: int = 15  # ping keep-alive SSE untuk proxy
+
+    # Guard tahap LLM (services/llm_guard.py) + mode degraded (services/provisional_analysis.py)
+    LLM_GUARD_ENABLED: bool = True
+    LLM_CALL_TIMEOUT_SECONDS: float = 120.0  # 0 = tanpa timeout
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 15.0  # menunggu slot agent lebih lama dari ini -> provisional
+    LLM_MAX_WAITING: int = 16  # antrean slot agent; jika penuh langsung provisional
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5  # kegagalan berturut-turut sebelum circuit terbuka
+    LLM_CIRCUIT_RESET_SECONDS: float = 30.0  # circuit terbuka sebelum satu panggilan percobaan
+    LLM_DEGRADED_MODE_ENABLED: bool = True  # False = error seperti sebelumnya
+    LLM_DEGRADED_MIN_CONFIDENCE: float = 0.15  # skor minimal kelas ONNX untuk dijadikan concern
+    LLM_DEGRADED_MAX_CONCERNS: int = 3
+    LLM_DEGRADED_MAX_RECOMMENDATIONS: int = 4
+    LLM_DEGRADED_RECOMMENDATION_SCAN: int = 200  # analisis LLM terbaru milik user yang dicari rekomendasinya
+
+    # Backend agent: gemini | fake (services/fake_agent.py, load test tanpa kuota)
+    AGENT_BACKEND: str = "gemini"
+    AGENT_FAKE_LATENCY_DISTRIBUTION: str = "lognormal"  # fixed | uniform | lognormal
+    AGENT_FAKE_LATENCY_SECONDS: float = 3.0  # median (lognormal) / nilai tengah (uniform) / nilai tetap
+    AGENT_FAKE_LATENCY_SIGMA: float = 0.5  # sigma lognormal / lebar relatif uniform
+    AGENT_FAKE_ERROR_RATE: float = 0.0
+    AGENT_FAKE_SEED: Optional[int] = None
+
+    # Gambar yang dikirim ke agent (services/agent_payload.py)
+    AGENT_IMAGE_MAX_SIDE: int = 768  # Gemini memotong gambar besar menjadi tile 768x768
+    AGENT_IMAGE_FORMAT: str = "jpeg"  # jpeg | webp
+    AGENT_IMAGE_QUALITY: int = 80
+
+    # Pool Team agno (services/agent.py)
+    AGENT_POOL_MAX_IDLE: int = 8  # Team siap pakai yang disimpan per API key
+    AGENT_POOL_PREBUILD: int = 1  # Team yang dibangun saat startup
+    AGENT_SEARCH_BACKEND: str = "web"  # web (DuckDuckGo/Baidu/arXiv) | local (offline, services/local_search.py)
+    AGENT_LOCAL_SEARCH_LATENCY: float = 0.0  # latency buatan tool lokal (detik)
+
+    # Konteks journal di prompt agent (services/journal_context.py)
+    JOURNAL_CONTEXT_MAX_TOKENS: int = 600  # estimasi: karakter / 4
+    JOURNAL_CONTEXT_ENTRY_MAX_TOKENS: int = 120  # isi journal dipotong sampai batas ini
+    JOURNAL_CONTEXT_CANDIDATES: int = 50  # journal terbaru yang dinilai; yang lebih lama masuk ringkasan
+    JOURNAL_CONTEXT_RELEVANCE_WEIGHT: float = 0.6  # bobot TF-IDF vs recency
+    JOURNAL_CONTEXT_RECENCY_HALF_LIFE_DAYS: float = 30.0
+
+    # Katalog produk per (country, concern) (services/product_catalog.py)
+    PRODUCT_CATALOG_ENABLED: bool = True
+    PRODUCT_CATALOG_MIN_PRODUCTS: int = 3  # produk segar minimal per concern sebelum agent berhenti membuat produk
+    PRODUCT_CATALOG_TOP_K: int = 5  # skincare_products per analisis
+    PRODUCT_CATALOG_MAX_AGE_DAYS: float = 30.0  # entry hasil analisis setelah ini dianggap basi (harga berubah)
+    PRODUCT_CATALOG_MAX_PER_CONCERN: int = 20
+    PRODUCT_CATALOG_SEED_PATH: Optional[str] = None  # file JSON produk curated
+    PRODUCT_CATALOG_REFRESH_SECONDS: float = 3600.0  # 0 = tanpa refresh background
+    PRODUCT_CATALOG_REGENERATE_PER_REFRESH: int = 5  # (country, concern) basi yang dibuat ulang per refresh; 0 = nonaktif
+
+    # Cache hasil tool agent (key: tool + query ternormalisasi + country)
+    TOOL_CACHE_ENABLED: bool = True
+    TOOL_CACHE_TTL_SECONDS: float = 6 * 3600
+    TOOL_CACHE_MAX_ENTRIES: int = 2048
+    TOOL_CACHE_DB_PATH: Optional[str] = None  # contoh: ./data/tool_cache.db
+
+    # Job queue analisis (/analysis/analyze?mode=job)
+    ANALYSIS_JOB_WORKERS: int = 2  # worker per proses; 0 = tidak memproses job
+    ANALYSIS_JOB_MAX_ATTEMPTS: int = 3
+    ANALYSIS_JOB_RETRY_BACKOFF_SECONDS: float = 10.0  # backoff = nilai ini * 2^(attempt-1)
+    ANALYSIS_JOB_POLL_SECONDS: float = 2.0
+    ANALYSIS_JOB_STALE_SECONDS: float = 900.0  # job running tanpa heartbeat selama ini dianggap ditinggal
+
+    # Visualisasi hasil klasifikasi
+    VISUALIZATION_RENDERER: str = "pillow"  # pillow | matplotlib (export kualitas tinggi, lambat)
+    VISUALIZATION_HEIGHT: int = 480  # tinggi panel gambar dalam pixel (renderer pillow)
+    VISUALIZATION_QUALITY: int = 85  # kualitas JPEG/WebP
+    VISUALIZATION_PNG_COMPRESS_LEVEL: int = 1  # zlib 0-9; makin tinggi makin lambat
+
+    # Hot reload model
+    MODEL_HOT_RELOAD_POLL_SECONDS: float = 0  # 0 = nonaktif
+    MODEL_SMOKE_SET_DIR: Optional[str] = None  # folder gambar + expected.json opsional
+    MODEL_SMOKE_MIN_AGREEMENT: float = 0.9
+
+    # Inference micro-batching
+    INFERENCE_BATCHING_ENABLED: bool = True
+    INFERENCE_MAX_BATCH_SIZE: int = 8
+    INFERENCE_MAX_WAIT_MS: float = 5.0
+
+    # Prediction cache (key: sha256 gambar + versi model)
+    PREDICTION_CACHE_ENABLED: bool = True
+    PREDICTION_CACHE_SIZE: int = 1024
+    PREDICTION_CACHE_DB_PATH: Optional[str] = None  # contoh: ./data/prediction_cache.db
+
+    # Offline batch prediction (batch_predict)
+    BATCH_PREDICT_CHUNK_SIZE: int = 32
+    BATCH_PREDICT_DECODE_WORKERS: int = 0  # 0 = os.cpu_count()
+
+    # Image preprocessing
+    PREPROCESS_JPEG_DRAFT: bool = True
+    PREPROCESS_REDUCING_GAP: float = 3.0  # 0 = resize langsung tanpa reduce()
+
+    # ONNX Runtime session (lihat SESSION_PROFILES di services/load_model.py)
+    ONNX_SESSION_PROFILE: str = "latency"  # latency | throughput | low_memory
+    ONNX_INTRA_OP_THREADS: Optional[int] = None
+    ONNX_INTER_OP_THREADS: Optional[int] = None
+    ONNX_EXECUTION_MODE: Optional[str] = None  # sequential | parallel
+    ONNX_GRAPH_OPTIMIZATION_LEVEL: Optional[str] = None  # disabled | basic | extended | all
+    ONNX_ENABLE_MEM_ARENA: Optional[bool] = None
+    ONNX_ENABLE_MEM_PATTERN: Optional[bool] = None
+    ONNX_OPTIMIZED_MODEL_DIR: Optional[str] = None  # default: saved_models/optimized
+    ONNX_PERSIST_OPTIMIZED_MODEL: bool = True
+    ONNX_WARMUP_BATCH_SIZES: list = [1, 8]
+
+    # Out-of-process inference pool (python -m app.services.inference_pool)
+    INFERENCE_POOL_ENABLED: bool = False
+    INFERENCE_POOL_WORKERS: int = 2
+    INFERENCE_POOL_PORT: int = 50055  # manager selalu listen di 127.0.0.1 (shared memory hanya di host yang sama)
+    INFERENCE_POOL_AUTHKEY: Optional[str] = None  # wajib diisi secret yang sama untuk server pool dan API
+    INFERENCE_POOL_SESSION_PROFILE: str = "throughput"
+    INFERENCE_POOL_TIMEOUT: float = 30.0
+
     class Config:
         case_sensitive = True 
 
@@ -4,8 +4,9 @@ from jose import jwt, JWTError
 from typing import Optional, Dict
 from .config import settings
 from fastapi import Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_db
 from app.models.users import User 
 from fastapi.security import OAuth2PasswordBearer
 
@@ -36,7 +37,7 @@ def create_refresh_token(data: Dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt 
 
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
+async def get_current_user(db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -54,7 +55,10 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == email).first()
+    user = await db.scalar(select(User).where(User.email == email))
     if user is None:
         raise credentials_exception
+    # Akhiri transaksi baca agar koneksi kembali ke pool selama request berjalan
+    # (mis. menunggu Gemini); expire_on_commit=False jadi user tetap bisa dibaca
+    await db.commit()
     return user 
\ No newline at end of file
@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine 
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
@@ -6,9 +8,83 @@ from app.core.config import settings
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Driver async untuk endpoint (get_async_db); engine sync tetap dipakai
+# service yang berjalan di thread (job queue, katalog produk, SSE)
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg", "postgres": "postgresql+asyncpg"}
+
+
+def async_database_url(url) -> str:
+    """DATABASE_URL sync -> URL dengan driver async (aiosqlite / asyncpg)"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend: {backend}")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def sqlite_pragmas() -> dict:
+    """Pragma yang dijalankan di setiap koneksi SQLite baru (nilai None dilewati)"""
+    pragmas = {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        # Nilai negatif = ukuran dalam KiB, bukan jumlah page
+        "cache_size": -settings.SQLITE_CACHE_SIZE_KB if settings.SQLITE_CACHE_SIZE_KB is not None else None,
+        "mmap_size": settings.SQLITE_MMAP_SIZE_MB * 1024 * 1024 if settings.SQLITE_MMAP_SIZE_MB is not None else None,
+    }
+    return {name: value for name, value in pragmas.items() if value not in (None, "")}
+
+
+def engine_options(url) -> dict:
+    """
+    Argumen create_engine/create_async_engine per backend: pool untuk semua
+    database file/server, pre-ping + recycle hanya untuk server database
+    """
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        if url.database in (None, "", ":memory:"):
+            # SQLite in-memory memakai SingletonThreadPool/StaticPool tanpa opsi ukuran pool
+            return {}
+        return {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        }
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+    }
+
+
+def apply_sqlite_pragmas(sync_engine):
+    """Pasang pragma SQLite pada event connect (engine sync, atau async_engine.sync_engine)"""
+    if sync_engine.dialect.name != "sqlite":
+        return
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
+apply_sqlite_pragmas(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+ASYNC_SQLALCHEMY_DATABASE_URL = settings.ASYNC_DATABASE_URL or async_database_url(SQLALCHEMY_DATABASE_URL)
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, **engine_options(ASYNC_SQLALCHEMY_DATABASE_URL))
+apply_sqlite_pragmas(async_engine.sync_engine)
+# expire_on_commit=False: atribut tetap bisa dibaca setelah commit tanpa lazy load (tidak didukung async)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 from app.models.users import User
@@ -16,12 +92,15 @@ from app.models.skin import Skin
 from app.models.products import Products
 from app.models.analysis import Analysis
 from app.models.journals import Journals
+from app.models.analysis_jobs import AnalysisJob
+from app.models.journal_summaries import JournalSummary
+from app.models.product_catalog import CatalogProduct
+
+# Schema dibuat/diupdate oleh migrasi (app/db/migrations), bukan saat import
+
 
-Base.metadata.create_all(bind=engine)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db 
-    finally: db.close()
 
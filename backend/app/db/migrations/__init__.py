@@ -0,0 +1,93 @@
+"""
+Migrasi schema: modul mNNNN_<nama>.py di package ini dengan fungsi
+upgrade(conn), dijalankan berurutan saat startup (app/main.py) atau lewat
+
+    python -m app.db.migrations            # terapkan migrasi yang belum jalan
+    python -m app.db.migrations --status
+
+Versi yang sudah diterapkan dicatat di tabel schema_migrations. Setiap
+migrasi harus idempotent (IF NOT EXISTS, cek kolom dulu): DDL SQLite tidak
+selalu transaksional dan beberapa worker bisa start bersamaan.
+"""
+import importlib
+import pkgutil
+import re
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, select
+from sqlalchemy.exc import IntegrityError
+
+from app.db.database import engine as default_engine
+
+MODULE_PATTERN = re.compile(r"^m(\d{4})_(\w+)$")
+
+# MetaData sendiri: tabel ini bukan bagian dari model app
+migration_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", Float, nullable=False),
+)
+
+
+def available_migrations() -> List[Dict]:
+    """Semua modul migrasi, urut berdasarkan versi"""
+    migrations = []
+    for module_info in pkgutil.iter_modules(__path__):
+        match = MODULE_PATTERN.match(module_info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f"{__name__}.{module_info.name}")
+        migrations.append({"version": int(match.group(1)), "name": match.group(2), "module": module})
+    migrations.sort(key=lambda migration: migration["version"])
+    versions = [migration["version"] for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+    return migrations
+
+
+def applied_versions(engine=None) -> Dict[int, float]:
+    """{version: applied_at} dari schema_migrations (dibuat jika belum ada)"""
+    engine = engine or default_engine
+    migration_metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        return {row.version: row.applied_at for row in conn.execute(select(schema_migrations))}
+
+
+def run_migrations(engine=None, target: Optional[int] = None) -> List[int]:
+    """Terapkan migrasi yang belum jalan sampai versi `target` (default: terbaru); return versi yang diterapkan"""
+    engine = engine or default_engine
+    applied = applied_versions(engine)
+    newly_applied = []
+    for migration in available_migrations():
+        version = migration["version"]
+        if version in applied or (target is not None and version > target):
+            continue
+        started = time.perf_counter()
+        try:
+            with engine.begin() as conn:
+                migration["module"].upgrade(conn)
+                conn.execute(schema_migrations.insert().values(version=version, name=migration["name"], applied_at=time.time()))
+        except IntegrityError:
+            # Worker lain menerapkan versi yang sama lebih dulu
+            print(f"🧱 Migration {version:04d}_{migration['name']} already applied by another process")
+            continue
+        newly_applied.append(version)
+        print(f"🧱 Applied migration {version:04d}_{migration['name']} ({(time.perf_counter() - started) * 1000:.0f} ms)")
+    return newly_applied
+
+
+def migration_status(engine=None) -> List[Dict]:
+    applied = applied_versions(engine)
+    return [
+        {
+            "version": migration["version"],
+            "name": migration["name"],
+            "description": next(iter((migration["module"].__doc__ or "").strip().splitlines()), ""),
+            "applied_at": applied.get(migration["version"]),
+        }
+        for migration in available_migrations()
+    ]
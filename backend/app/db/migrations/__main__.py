@@ -0,0 +1,18 @@
+import argparse
+
+from app.db.migrations import migration_status, run_migrations
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply or list database schema migrations")
+    parser.add_argument("--status", action="store_true", help="Tampilkan migrasi dan status penerapannya")
+    parser.add_argument("--target", type=int, default=None, help="Berhenti di versi ini (default: terbaru)")
+    args = parser.parse_args()
+
+    if args.status:
+        for migration in migration_status():
+            state = "applied" if migration["applied_at"] else "pending"
+            print(f"{migration['version']:04d}_{migration['name']:<28} {state:<8} {migration['description']}")
+    else:
+        applied = run_migrations(target=args.target)
+        print(f"✅ {len(applied)} migration(s) applied" if applied else "✅ Schema is up to date")
@@ -0,0 +1,173 @@
+"""
+Schema awal: semua tabel + kolom yang ditambahkan sebelum ada migrasi.
+
+Tabel dibekukan di sini (MetaData sendiri), bukan diambil dari model: model
+boleh berubah, migrasi yang sudah diterapkan tidak. Perubahan schema
+berikutnya masuk ke migrasi baru.
+
+Untuk database lama (dibuat create_all saat import), tabel yang sudah ada
+dibiarkan dan hanya kolom baru yang nullable / punya server_default yang
+ditambahkan (mis. analyses.provisional, analysis_jobs.kind).
+"""
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    UniqueConstraint,
+    inspect,
+)
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.sql import expression, func
+
+baseline_metadata = MetaData()
+
+Table(
+    "users",
+    baseline_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, nullable=False),
+    Column("email", String, unique=True, index=True, nullable=False),
+    Column("country", String, nullable=False),
+    Column("hashed_password", String, nullable=False),
+    Column("profile_image", String, nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+Table(
+    "analyses",
+    baseline_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("image_url", String),
+    Column("overall_health", String),
+    Column("skin_type", String),
+    Column("concerns", JSON),
+    Column("recommendations", JSON),
+    Column("analysis_metrics", JSON),
+    Column("skincare_products", JSON),
+    Column("provisional", Boolean, nullable=False, server_default=expression.false()),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+Table(
+    "journals",
+    baseline_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE")),
+    Column("title", String, nullable=False),
+    Column("content", String, nullable=False),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+Table(
+    "journal_summaries",
+    baseline_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), unique=True, index=True, nullable=False),
+    Column("entry_count", Integer, nullable=False),
+    Column("covered_until_id", Integer, nullable=False),
+    Column("first_entry_at", DateTime),
+    Column("last_entry_at", DateTime),
+    Column("term_counts", JSON),
+    Column("summary", Text),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "products",
+    baseline_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE")),
+    Column("product_name", String, nullable=False),
+    Column("product_category", String, nullable=False),
+    Column("ai_recommendation", Boolean, nullable=False),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+Table(
+    "skin",
+    baseline_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE")),
+    Column("skin_type", String, nullable=False),
+    Column("concerns", Text, nullable=False),
+    Column("created_at", String, nullable=False),
+    Column("updated_at", String, nullable=False),
+)
+
+Table(
+    "analysis_jobs",
+    baseline_metadata,
+    Column("id", String, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False),
+    Column("kind", String, nullable=False, server_default="analysis"),
+    Column("status", String, index=True, nullable=False),
+    Column("stage", String),
+    Column("stages", JSON),
+    Column("attempts", Integer, nullable=False),
+    Column("max_attempts", Integer, nullable=False),
+    Column("last_error", Text),
+    Column("image_path", String, nullable=False),
+    Column("classify_path", String, nullable=False),
+    Column("image_url", String),
+    Column("analysis_id", Integer, ForeignKey("analyses.id", ondelete="SET NULL")),
+    Column("available_at", Float, nullable=False),
+    Column("locked_at", Float),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+Table(
+    "product_catalog",
+    baseline_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("country", String, nullable=False),
+    Column("concern", String, nullable=False),
+    Column("title_key", String, nullable=False),
+    Column("title", String, nullable=False),
+    Column("description", Text, nullable=False),
+    Column("priority", String, nullable=False),
+    Column("price", String, nullable=False),
+    Column("how_to_use", Text, nullable=False),
+    Column("benefits", Text, nullable=False),
+    Column("side_effects", Text, nullable=False),
+    Column("dosage", Text, nullable=False),
+    Column("curated", Boolean, nullable=False),
+    Column("times_recommended", Integer, nullable=False),
+    Column("last_seen_at", DateTime(timezone=True), server_default=func.now(), index=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    UniqueConstraint("country", "concern", "title_key", name="uq_product_catalog_entry"),
+    Index("ix_product_catalog_lookup", "country", "concern", "curated", "times_recommended"),
+)
+
+
+def add_missing_columns(conn):
+    """create_all tidak mengubah tabel yang sudah ada: tambahkan kolom yang belum ada"""
+    inspector = inspect(conn)
+    for table in baseline_metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not (column.nullable or column.server_default is not None):
+                continue
+            conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {CreateColumn(column).compile(dialect=conn.dialect)}")
+            print(f"🧱 Added column {table.name}.{column.name}")
+
+
+def upgrade(conn):
+    baseline_metadata.create_all(bind=conn)
+    add_missing_columns(conn)
@@ -0,0 +1,31 @@
+"""
+Index per user + waktu dan satu skin profile per user.
+
+(user_id, created_at) untuk query per user yang diurutkan berdasarkan waktu
+(history analisis, journal, produk, analisis sebelumnya di progress),
+(provisional, created_at) untuk rekomendasi mode degraded, dan unique
+skin.user_id.
+"""
+from sqlalchemy import text
+
+INDEXES = [
+    ("ix_analyses_user_created", "analyses", "user_id, created_at", False),
+    ("ix_analyses_provisional_created", "analyses", "provisional, created_at", False),
+    ("ix_journals_user_created", "journals", "user_id, created_at", False),
+    ("ix_products_user_created", "products", "user_id, created_at", False),
+    ("uq_skin_user_id", "skin", "user_id", True),
+]
+
+
+def upgrade(conn):
+    # Duplikat skin profile (create/update bersamaan sebelum ada unique index):
+    # simpan yang tertua, yang selama ini dibaca dan diupdate oleh .first()
+    removed = conn.execute(text(
+        "DELETE FROM skin WHERE user_id IS NOT NULL AND id NOT IN "
+        "(SELECT MIN(id) FROM skin WHERE user_id IS NOT NULL GROUP BY user_id)"
+    )).rowcount
+    if removed:
+        print(f"🧹 Removed {removed} duplicate skin profile(s)")
+
+    for name, table, columns, unique in INDEXES:
+        conn.execute(text(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
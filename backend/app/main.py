@@ -10,7 +10,11 @@ from fastapi.staticfiles import StaticFiles
 from app.api.routes import router as api_router 
 from app.core.config import settings
 from app.core.exceptions import app_exception_handler, AppException
-from app.services.load_model import validate_model
+from app.services.load_model import validate_model, get_model_cache
+from app.services import analysis_pipeline, job_queue, product_catalog
+from app.services.agent import warm_up_agents
+from app.db.database import async_engine
+from app.db.migrations import run_migrations
 import uvicorn
 
 app = FastAPI(
@@ -38,9 +42,27 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 
 @app.on_event("startup")
 async def startup_event():
+    # Migrasi schema sebelum worker/service lain memakai database
+    run_migrations()
     # Validate model on startup
     if not validate_model():
         print("WARNING: Model validation failed. Application may not function correctly.")
+    # Hot reload saat file model diganti (MODEL_HOT_RELOAD_POLL_SECONDS)
+    get_model_cache().start_watcher()
+    # Bangun Team agno + client Gemini sekali per proses
+    warm_up_agents()
+    # Worker job analisis (mode=job)
+    job_queue.start_workers()
+    # Muat seed + buang entry basi katalog produk secara berkala
+    product_catalog.start_refresher()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await job_queue.stop_workers()
+    await product_catalog.stop_refresher()
+    analysis_pipeline.shutdown()
+    await async_engine.dispose()
 
 
 if __name__=="__main__":
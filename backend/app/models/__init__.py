@@ -3,4 +3,7 @@ from app.models.users import User
 from app.models.analysis import Analysis
 from app.models.journals import Journals
 from app.models.skin import Skin
-from app.models.products import Products
\ No newline at end of file
+from app.models.products import Products
+from app.models.analysis_jobs import AnalysisJob
+from app.models.journal_summaries import JournalSummary
+from app.models.product_catalog import CatalogProduct
@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON
-from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Boolean, Index
+from sqlalchemy.sql import func, expression
+from sqlalchemy.orm import query_expression, relationship
 from app.db.database import Base
 
 class Analysis(Base):
     __tablename__ = "analyses"
+    # Dibuat oleh migrasi 0002 (app/db/migrations)
+    __table_args__ = (
+        Index("ix_analyses_user_created", "user_id", "created_at"),
+        Index("ix_analyses_provisional_created", "provisional", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -15,8 +20,12 @@ class Analysis(Base):
     recommendations = Column(JSON, nullable=True)
     analysis_metrics = Column(JSON, nullable=True)
     skincare_products = Column(JSON, nullable=True)
+    # Hasil mode degraded (tanpa LLM), di-upgrade oleh job "upgrade" (services/job_queue.py)
+    provisional = Column(Boolean, nullable=False, default=False, server_default=expression.false())
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # analysis_metrics.overall_score, diisi lewat with_expression (list history mode summary)
+    overall_score = query_expression()
 
     # Relasi
     user = relationship("User", back_populates="analyses")
\ No newline at end of file
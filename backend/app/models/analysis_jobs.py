@@ -0,0 +1,39 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Text, Float
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.db.database import Base
+
+
+class AnalysisJob(Base):
+    """
+    Job analisis di queue (lihat services/job_queue.py).
+
+    kind  : analysis | upgrade (analisis LLM ulang untuk analysis provisional)
+    status: queued | running | succeeded | dead
+    stage : classify | agent | saving | done
+    """
+    __tablename__ = "analysis_jobs"
+
+    id = Column(String, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    kind = Column(String, nullable=False, default="analysis", server_default="analysis")
+    status = Column(String, nullable=False, default="queued", index=True)
+    stage = Column(String, nullable=True)
+    stages = Column(JSON, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    last_error = Column(Text, nullable=True)
+    image_path = Column(String, nullable=False)
+    classify_path = Column(String, nullable=False)
+    image_url = Column(String, nullable=True)
+    analysis_id = Column(Integer, ForeignKey("analyses.id", ondelete="SET NULL"), nullable=True)
+    # Unix timestamp; job baru diambil worker setelah waktu ini (backoff retry)
+    available_at = Column(Float, nullable=False, default=0)
+    # Heartbeat worker; job running dengan heartbeat lama dianggap ditinggal worker yang mati
+    locked_at = Column(Float, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Relasi
+    user = relationship("User", back_populates="analysis_jobs")
+    analysis = relationship("Analysis")
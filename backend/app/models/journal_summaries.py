@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, JSON, Text
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.db.database import Base
+
+
+class JournalSummary(Base):
+    """
+    Ringkasan incremental journal lama per user (lihat services/journal_context.py).
+
+    Journal dengan id <= covered_until_id sudah dilipat ke term_counts/summary;
+    journal terbaru dinilai satu per satu saat prompt dibangun.
+    """
+    __tablename__ = "journal_summaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, unique=True, index=True)
+    entry_count = Column(Integer, nullable=False, default=0)
+    covered_until_id = Column(Integer, nullable=False, default=0)
+    first_entry_at = Column(DateTime, nullable=True)
+    last_entry_at = Column(DateTime, nullable=True)
+    term_counts = Column(JSON, nullable=True)
+    summary = Column(Text, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Relasi
+    user = relationship("User", back_populates="journal_summary")
@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, UniqueConstraint, Index
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class CatalogProduct(Base):
+    """
+    Katalog rekomendasi produk per (country, concern), lihat services/product_catalog.py.
+
+    country / concern / title_key disimpan ternormalisasi (lowercase) untuk lookup;
+    field lain mengikuti SkincareProducts di services/agent.py.
+    """
+    __tablename__ = "product_catalog"
+    __table_args__ = (
+        UniqueConstraint("country", "concern", "title_key", name="uq_product_catalog_entry"),
+        Index("ix_product_catalog_lookup", "country", "concern", "curated", "times_recommended"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    country = Column(String, nullable=False)
+    concern = Column(String, nullable=False)
+    title_key = Column(String, nullable=False)
+    title = Column(String, nullable=False)
+    description = Column(Text, nullable=False, default="")
+    priority = Column(String, nullable=False, default="Medium")
+    price = Column(String, nullable=False, default="")
+    how_to_use = Column(Text, nullable=False, default="")
+    benefits = Column(Text, nullable=False, default="")
+    side_effects = Column(Text, nullable=False, default="")
+    dosage = Column(Text, nullable=False, default="")
+    # curated = dari PRODUCT_CATALOG_SEED_PATH, selain itu dari output analisis
+    curated = Column(Boolean, nullable=False, default=False)
+    times_recommended = Column(Integer, nullable=False, default=0)
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
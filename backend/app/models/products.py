@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey 
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.database import Base 
 from datetime import datetime 
@@ -7,6 +7,10 @@ from datetime import datetime
 
 class Products(Base):
     __tablename__ = "products"
+    # Dibuat oleh migrasi 0002 (app/db/migrations)
+    __table_args__ = (
+        Index("ix_products_user_created", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
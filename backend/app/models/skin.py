@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Text
+from sqlalchemy import Column, String, Integer, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from app.db.database import Base 
 from datetime import datetime 
@@ -6,6 +6,10 @@ from datetime import datetime
 
 class Skin(Base):
     __tablename__ = "skin"
+    # Dibuat oleh migrasi 0002 (app/db/migrations)
+    __table_args__ = (
+        Index("uq_skin_user_id", "user_id", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
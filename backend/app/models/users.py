@@ -20,4 +20,6 @@ class User(Base):
     products = relationship("Products", back_populates="user", cascade="all, delete-orphan")
     analyses = relationship("Analysis", back_populates="user", cascade="all, delete-orphan")
     journals = relationship("Journals", back_populates="user", cascade="all, delete-orphan")
-    skin = relationship("Skin", back_populates="user", cascade="all, delete-orphan")
\ No newline at end of file
+    skin = relationship("Skin", back_populates="user", cascade="all, delete-orphan")
+    analysis_jobs = relationship("AnalysisJob", back_populates="user", cascade="all, delete-orphan")
+    journal_summary = relationship("JournalSummary", back_populates="user", uselist=False, cascade="all, delete-orphan")
\ No newline at end of file
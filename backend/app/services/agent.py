@@ -1,11 +1,16 @@
 from agno.agent import Agent
 from agno.models.google import Gemini
 from agno.media import Image
-from agno.tools.duckduckgo import DuckDuckGoTools
-from agno.tools.baidusearch import BaiduSearchTools
-from agno.tools.arxiv import ArxivTools
 from agno.team.team import Team
+from google.genai import Client as GeminiClient
+from app.core.config import settings
+from app.services.agent_payload import format_prediction
+from app.services.local_search import search_toolkits
+from app.services.tool_cache import cached_tools, country_context
+from contextlib import contextmanager
 import os
+import threading
+import uuid
 from dotenv import load_dotenv
 
 
@@ -18,6 +23,12 @@ load_dotenv()
 # os.environ["GOOGLE_API_KEY"] = os.getenv("GOOGLE_API_KEY")
 
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+GEMINI_MODEL_ID = "gemini-2.0-flash-exp"
+
+_genai_clients = {}
+_genai_clients_lock = threading.Lock()
+_team_pools = {}
+_team_pools_lock = threading.Lock()
 
 # Class structured agent
 class SkinConcern(BaseModel):
@@ -62,7 +73,8 @@ class AnalysisMetrics(BaseModel):
     )
 
 
-class SkinAnalysisResponse(BaseModel):
+class SkinAssessmentResponse(BaseModel):
+    """Assessment dermatologis saja; produk diambil dari katalog (services/product_catalog.py)"""
     overall_health: str = Field(
         ..., description="General skin health status (Good/Fair/Poor)"
     )
@@ -76,6 +88,9 @@ class SkinAnalysisResponse(BaseModel):
     analysis_metrics: AnalysisMetrics = Field(
         ..., description="Quantitative analysis metrics"
     )
+
+
+class SkinAnalysisResponse(SkinAssessmentResponse):
     skincare_products: List[SkincareProducts] = Field(
        ..., description="List of recommended skincare products"
     )
@@ -127,15 +142,57 @@ class SkinAnalysisResponse(BaseModel):
 
 
 
-def analyze_skin(image_url, api_key=GEMINI_API_KEY, country=None, journals=None):
+class SkincareProductsResponse(BaseModel):
+    """Produk saja, untuk membuat ulang entry katalog yang basi (services/product_catalog.py)"""
+    skincare_products: List[SkincareProducts] = Field(
+       ..., description="List of recommended skincare products"
+    )
+
+
+def get_genai_client(api_key=GEMINI_API_KEY):
+    """
+    Satu google-genai Client per API key untuk semua model Gemini, sehingga
+    connection pool HTTP (dan TLS session) dipakai ulang antar analisis
+    """
+    if not api_key:
+        # Tanpa key: biarkan Gemini membuat client sendiri (GOOGLE_API_KEY / Vertex AI)
+        return None
+    with _genai_clients_lock:
+        client = _genai_clients.get(api_key)
+        if client is None:
+            client = GeminiClient(api_key=api_key)
+            _genai_clients[api_key] = client
+        return client
+
+
+def gemini_model(api_key=GEMINI_API_KEY):
+    # Model object per agent (menyimpan state run), client HTTP dibagi
+    return Gemini(id=GEMINI_MODEL_ID, api_key=api_key, client=get_genai_client(api_key))
+
+
+def build_team(api_key=GEMINI_API_KEY, include_products=True):
+    """
+    Team statis: tidak ada data per-user di constructor. Country dan journals
+    dikirim lewat prompt (build_analysis_prompt) sehingga Team bisa dipakai ulang.
+    Hasil tool search/arXiv di-cache bersama antar analisis (services/tool_cache.py).
+
+    include_products=False: response_model tanpa skincare_products (produk dari katalog).
+    AGENT_BACKEND="fake": FakeTeam lokal (services/fake_agent.py) untuk load test.
+    """
+    if settings.AGENT_BACKEND == "fake":
+        from app.services.fake_agent import FakeTeam
+        return FakeTeam(include_products=include_products)
+
+    search_tools, research_tools = search_toolkits(settings.AGENT_SEARCH_BACKEND, settings.AGENT_LOCAL_SEARCH_LATENCY)
+
     # Set up Agno Agent with Gemini model
     search_agent = Agent(
         name="Searching",
         role="You are a search agent that can search the web for relevant information about the skin problem and how to solve it.",
-        model=Gemini(id="gemini-2.0-flash-exp", api_key=api_key),
-        tools=[DuckDuckGoTools(), BaiduSearchTools()],
+        model=gemini_model(api_key),
+        tools=cached_tools(*search_tools),
         add_name_to_instructions=True,
-        instructions=f"""
+        instructions="""
         When searching for skin-related information:
         1. Focus on finding reliable medical sources (Mayo Clinic, WebMD, dermatology journals)
         2. Prioritize recent research and studies (last 3 years)
@@ -150,15 +207,15 @@ def analyze_skin(image_url, api_key=GEMINI_API_KEY, country=None, journals=None)
         - Sun protection methods
         7. Always include source links for reference
         8. Present findings in clear, organized bullet points
-        9. Give recommendations scincare product that available in {country} and recommended by many people such as writers, or skincare product reviewers or from beauty articles in operating in the {country}. You can use e-commerce products that operate in the {country}.
+        9. Give recommendations scincare product that available in the user's country (stated in the task) and recommended by many people such as writers, or skincare product reviewers or from beauty articles in operating in that country. You can use e-commerce products that operate in that country.
         """,
     )
 
     research_agent = Agent(
         name="Researcher",
         role="You are a researcher that can research the research papers for relevant information about the skin problem and how to solve it.",
-        model=Gemini(id="gemini-2.0-flash-exp", api_key=api_key),
-        tools=[ArxivTools()],
+        model=gemini_model(api_key),
+        tools=cached_tools(*research_tools),
         add_name_to_instructions=True,
         instructions="""
         When researching skin-related information:
@@ -184,108 +241,203 @@ def analyze_skin(image_url, api_key=GEMINI_API_KEY, country=None, journals=None)
     )
 
     image_agent = Agent(
-        model=Gemini(id="gemini-2.0-flash-exp", api_key=api_key),
+        model=gemini_model(api_key),
         agent_id="dermatologist",
         name="Skin Dermatologist",
         markdown=True,
         instructions=[
             "You are a dermatologist AI that analyzes skin conditions from images.",
-            "Compare the original image with the predicted image. Take the prediction point that you think is correct based on the original image.",
+            "Compare the original image with the skin classifier prediction (given as text in the task). Take the prediction point that you think is correct based on the original image.",
             "Provide detailed descriptions and potential diagnoses based on the images you receive (original image).",
         ],
     )
 
-    
-    if journals is not None or journals != []:
-        agent = Team(
-            name="Skin Dermatologist Team",
-            mode="route",
-            model=Gemini(
-                id="gemini-2.0-flash-exp", api_key=api_key),  # Using the strongest multi-modal model
-            members=[image_agent, search_agent, research_agent],
-            instructions=f"""
-            As a dermatologist expert team, your responsibilities are:
-            1. Analyze skin images with clinical precision
-            2. Analyze skin journals user for accurate reccomendations treatment, {journals}
-            3. Collaborate with search and research agents to:
-            - Verify diagnosis with latest medical information
-            - Cross-reference treatment options
-            - Identify emerging therapies
-            4. Provide comprehensive analysis including:
-            - Condition identification
-            - Severity assessment
-            - Root cause analysis
-            5. Create personalized treatment plans that consider:
-            - Skin type
-            - Medical history
-            - Lifestyle factors
-            - Budget considerations
-            6. Present information in clear, patient-friendly language
-            7. Always include:
-            - Primary recommended treatment
-            - Alternative options
-            - Prevention strategies
-            - Expected timeline for results
-            8. For complex cases:
-            - Consult with research agent for latest studies
-            - Verify with search agent for clinical guidelines
-            - Present multiple approaches with pros/cons
-            9. Maintain professional medical standards in all recommendations
-            """,
-            show_tool_calls=True,
-            markdown=True,
-            debug_mode=True,
-            show_members_responses=True,
-            enable_team_history=True,
-            use_json_mode=True,
-            response_model=SkinAnalysisResponse,
-        )
-    else:
-        agent = Team(
-            name="Skin Dermatologist Team",
-            mode="route",
-            model=Gemini(
-                id="gemini-2.0-flash-exp", api_key=api_key),  # Using the strongest multi-modal model
-            members=[image_agent, search_agent, research_agent],
-            instructions=f"""
-            As a dermatologist expert team, your responsibilities are:
-            1. Analyze skin images with clinical precision
-            2. Collaborate with search and research agents to:
-            - Verify diagnosis with latest medical information
-            - Cross-reference treatment options
-            - Identify emerging therapies
-            3. Provide comprehensive analysis including:
-            - Condition identification
-            - Severity assessment
-            - Root cause analysis
-            4. Create personalized treatment plans that consider:
-            - Skin type
-            - Medical history
-            - Lifestyle factors
-            - Budget considerations
-            5. Present information in clear, patient-friendly language
-            6. Always include:
-            - Primary recommended treatment
-            - Alternative options
-            - Prevention strategies
-            - Expected timeline for results
-            7. For complex cases:
-            - Consult with research agent for latest studies
-            - Verify with search agent for clinical guidelines
-            - Present multiple approaches with pros/cons
-            8. Maintain professional medical standards in all recommendations
-            """,
-            show_tool_calls=True,
-            markdown=True,
-            debug_mode=True,
-            show_members_responses=True,
-            enable_team_history=True,
-            use_json_mode=True,
-            response_model=SkinAnalysisResponse,
-        )
+    agent = Team(
+        name="Skin Dermatologist Team",
+        mode="route",
+        model=gemini_model(api_key),  # Using the strongest multi-modal model
+        members=[image_agent, search_agent, research_agent],
+        instructions="""
+        As a dermatologist expert team, your responsibilities are:
+        1. Analyze skin images with clinical precision
+        2. Analyze the user's skin journals (included in the task, if any) for accurate reccomendations treatment
+        3. Collaborate with search and research agents to:
+        - Verify diagnosis with latest medical information
+        - Cross-reference treatment options
+        - Identify emerging therapies
+        - Always pass the user's country from the task to the search agent
+        4. Provide comprehensive analysis including:
+        - Condition identification
+        - Severity assessment
+        - Root cause analysis
+        5. Create personalized treatment plans that consider:
+        - Skin type
+        - Medical history
+        - Lifestyle factors
+        - Budget considerations
+        6. Present information in clear, patient-friendly language
+        7. Always include:
+        - Primary recommended treatment
+        - Alternative options
+        - Prevention strategies
+        - Expected timeline for results
+        8. For complex cases:
+        - Consult with research agent for latest studies
+        - Verify with search agent for clinical guidelines
+        - Present multiple approaches with pros/cons
+        9. Maintain professional medical standards in all recommendations
+        """,
+        show_tool_calls=True,
+        markdown=True,
+        debug_mode=True,
+        show_members_responses=True,
+        enable_team_history=True,
+        use_json_mode=True,
+        response_model=SkinAnalysisResponse if include_products else SkinAssessmentResponse,
+    )
+
+    return agent
+
+
+def _reset_run_state(team):
+    """
+    Hapus memory/session dari run sebelumnya agar history user lain tidak
+    ikut masuk ke prompt; model dan client HTTP tetap dipakai ulang
+    """
+    for member in [team, *team.members]:
+        member.memory = None
+        member.session_id = None
+        member.session_state = None
+        member.session_name = None
+
+
+class TeamPool:
+    """
+    Pool Team yang sudah dibangun. Team agno menyimpan state run, jadi satu
+    Team hanya dipakai satu analisis pada satu waktu; Team baru dibangun jika
+    pool kosong (concurrency dibatasi ANALYSIS_MAX_CONCURRENT_AGENT).
+    """
+
+    def __init__(self, api_key=GEMINI_API_KEY, max_idle=None, include_products=True):
+        self.api_key = api_key
+        self.include_products = include_products
+        self.max_idle = max_idle or settings.AGENT_POOL_MAX_IDLE
+        self.built = 0
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def prebuild(self, count):
+        teams = [self._build() for _ in range(count)]
+        with self._lock:
+            self._idle.extend(teams[:max(0, self.max_idle - len(self._idle))])
+
+    def _build(self):
+        team = build_team(api_key=self.api_key, include_products=self.include_products)
+        with self._lock:
+            self.built += 1
+        return team
+
+    @contextmanager
+    def lease(self):
+        with self._lock:
+            team = self._idle.pop() if self._idle else None
+        if team is None:
+            team = self._build()
+        _reset_run_state(team)
+        try:
+            yield team
+        finally:
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append(team)
+
+    def stats(self):
+        with self._lock:
+            return {"built": self.built, "idle": len(self._idle), "max_idle": self.max_idle}
+
+
+def get_team_pool(api_key=GEMINI_API_KEY, include_products=True) -> TeamPool:
+    with _team_pools_lock:
+        pool = _team_pools.get((api_key, include_products))
+        if pool is None:
+            pool = TeamPool(api_key=api_key, include_products=include_products)
+            _team_pools[(api_key, include_products)] = pool
+        return pool
+
+
+def warm_up_agents(api_key=GEMINI_API_KEY):
+    """Bangun Team awal saat startup agar analisis pertama tidak menanggung setup"""
+    if settings.AGENT_POOL_PREBUILD > 0:
+        try:
+            get_team_pool(api_key).prebuild(settings.AGENT_POOL_PREBUILD)
+            if settings.PRODUCT_CATALOG_ENABLED:
+                get_team_pool(api_key, include_products=False).prebuild(settings.AGENT_POOL_PREBUILD)
+        except Exception as e:
+            print(f"WARNING: Agent warmup failed: {str(e)}")
+
+
+def format_journals(journals):
+    lines = []
+    for journal in journals or []:
+        if journal.get("kind") == "summary":
+            lines.append(f"- {journal.get('title', '')}: {journal.get('content', '')}")
+            continue
+        created_at = journal.get("created_at")
+        date = created_at.strftime("%Y-%m-%d") if hasattr(created_at, "strftime") else (created_at or "")
+        lines.append(f"- [{date}] {journal.get('title', '')}: {journal.get('content', '')}")
+    return "\n".join(lines)
+
+
+def build_analysis_prompt(country=None, journals=None, include_products=True, prediction=None):
+    """include_products=False: hanya assessment, skincare_products diisi dari katalog"""
+    # Data per-user dikirim lewat input run, bukan instructions Team
+    user_context = f"""
+    User context:
+    - Country: {country or "Unknown"}
+    """
+    if format_prediction(prediction):
+        user_context += f"""- Skin classifier (ONNX) prediction for the image:
+{format_prediction(prediction)}
+    """
+    if journals:
+        user_context += f"""- Skin journals (summary of older entries, then most relevant entries, most recent first):
+{format_journals(journals)}
+    """
+
+    products_section = products_schema = ""
+    if include_products:
+        products_section = f"""
+    5. Skincare Product Recommendations:
+    - List recommended skincare products
+    - For each product:
+        * Title
+        * Description
+        * Priority level (High, Medium, Low)
+        * Link to the product page
+        * Price with currency symbols that have been adjusted to the country of {country}
+        * How to use
+        * Benefits
+        * Side effects
+        * Dosage instructions
+
+"""
+        products_schema = f"""
+    5. skincare_products: A JSON array of objects, each containing:
+    {{
+        "title": "Title of the skincare product",
+        "description": "Description of the skincare product",
+        "priority": "Priority level (High/Medium/Low)",
+        "price": "Price of the product",
+        "how_to_use": "How to use the product",
+        "benefits": "Benefits of the product",
+        "side_effects": "Side effects of the product",
+        "dosage": "Dosage instructions for the product"
+    }}
+
+"""
 
     # Analyze the skin image
-    analysis_prompt =f"""
+    analysis_prompt = user_context + f"""
     Analyze this facial skin image in detail and provide a structured assessment in the following format:
 
     1. Overall Skin Health Assessment:
@@ -313,20 +465,7 @@ def analyze_skin(image_url, api_key=GEMINI_API_KEY, country=None, journals=None)
     - Texture uniformity score (0-100)
     - Pore visibility rating (0-100)
     - Overall skin health score (0-100)
-    
-    5. Skincare Product Recommendations:
-    - List recommended skincare products
-    - For each product:
-        * Title
-        * Description
-        * Priority level (High, Medium, Low)
-        * Link to the product page
-        * Price with currency symbols that have been adjusted to the country of {country}
-        * How to use
-        * Benefits
-        * Side effects
-        * Dosage instructions
-
+    {products_section}
     Format your response as a Python dictionary exactly matching this structure:
      1. Required Fields:
     - overall_health: A string indicating general skin health status (e.g., "Good", "Fair", "Poor")
@@ -354,24 +493,91 @@ def analyze_skin(image_url, api_key=GEMINI_API_KEY, country=None, journals=None)
         "pore_visibility": "Score from 0-100",
         "overall_score": "Score from 0-100"
     }}
-    
-    5. skincare_products: A JSON array of objects, each containing:
-    {{
-        "title": "Title of the skincare product",
-        "description": "Description of the skincare product",
-        "priority": "Priority level (High/Medium/Low)",
-        "price": "Price of the product",
-        "how_to_use": "How to use the product",
-        "benefits": "Benefits of the product",
-        "side_effects": "Side effects of the product",
-        "dosage": "Dosage instructions for the product"
-    }}
-
+    {products_schema}
     Ensure all fields are present and properly formatted as they are required by the database schema.
     Return the analysis in a format that exactly matches these database fields.
     """
 
-    response = agent.run(analysis_prompt, images=[Image(filepath=image_url)])
+    return analysis_prompt
+
+
+def _agent_images(image_url=None, agent_input=None):
+    """Gambar ringkas di memori (agent_payload.build_agent_input), atau file di image_url"""
+    if agent_input is not None:
+        return [Image(content=agent_input["content"], format=agent_input["format"])]
+    return [Image(filepath=image_url)]
+
+
+def analyze_skin(image_url=None, api_key=GEMINI_API_KEY, country=None, journals=None, include_products=True, agent_input=None):
+    prediction = agent_input.get("prediction") if agent_input else None
+    with get_team_pool(api_key, include_products).lease() as agent, country_context(country):
+        response = agent.run(
+            build_analysis_prompt(country, journals, include_products, prediction),
+            images=_agent_images(image_url, agent_input),
+            session_id=uuid.uuid4().hex,
+        )
+    response_json = response.content.model_dump_json(indent=2)
+
+    return response_json
+
+
+async def analyze_skin_async(image_url=None, api_key=GEMINI_API_KEY, country=None, journals=None, include_products=True, agent_input=None):
+    """
+    Versi async dari analyze_skin: Team.arun tidak memblokir event loop
+    (tool sync seperti DuckDuckGo/Arxiv dijalankan agno di thread terpisah)
+    """
+    prediction = agent_input.get("prediction") if agent_input else None
+    with get_team_pool(api_key, include_products).lease() as agent, country_context(country):
+        response = await agent.arun(
+            build_analysis_prompt(country, journals, include_products, prediction),
+            images=_agent_images(image_url, agent_input),
+            session_id=uuid.uuid4().hex,
+        )
     response_json = response.content.model_dump_json(indent=2)
 
-    return response_json
\ No newline at end of file
+    return response_json
+
+
+def build_products_agent(api_key=GEMINI_API_KEY):
+    """
+    Agent search tanpa gambar yang hanya membuat skincare_products untuk
+    (country, concern); dipakai refresher katalog, jadi tidak di-pool
+    """
+    if settings.AGENT_BACKEND == "fake":
+        from app.services.fake_agent import FakeTeam
+        return FakeTeam(products_only=True)
+
+    search_tools, _ = search_toolkits(settings.AGENT_SEARCH_BACKEND, settings.AGENT_LOCAL_SEARCH_LATENCY)
+    return Agent(
+        name="Product Searching",
+        role="You are a search agent that finds skincare products for specific skin concerns in a specific country.",
+        model=gemini_model(api_key),
+        tools=cached_tools(*search_tools),
+        instructions="""
+        Recommend skincare products that are available in the user's country (stated in the task) and recommended by
+        many people such as writers, skincare product reviewers or beauty articles operating in that country.
+        You can use e-commerce products that operate in that country. Prices must use the currency of that country.
+        """,
+        use_json_mode=True,
+        response_model=SkincareProductsResponse,
+    )
+
+
+def build_products_prompt(country, concerns):
+    return f"""
+    Country: {country}
+    Skin concerns: {", ".join(concerns)}
+
+    Recommend skincare products for these skin concerns. For each product provide:
+    title, description, priority (High/Medium/Low), price with the currency of {country},
+    how_to_use, benefits, side_effects and dosage.
+    Return a JSON object with a "skincare_products" array of these objects.
+    """
+
+
+async def generate_products_async(country, concerns, api_key=GEMINI_API_KEY):
+    """skincare_products (JSON) untuk concern di country, tanpa analisis gambar"""
+    agent = build_products_agent(api_key)
+    with country_context(country):
+        response = await agent.arun(build_products_prompt(country, concerns), session_id=uuid.uuid4().hex)
+    return response.content.model_dump_json(indent=2)
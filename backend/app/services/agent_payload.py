@@ -0,0 +1,71 @@
+"""
+Input agent yang ringkas: foto asli di-downscale dan di-encode di memori,
+plus prediksi ONNX sebagai teks terstruktur.
+
+Sebelumnya agent menerima gambar klasifikasi (3 panel + teks) dari disk;
+Gemini cukup melihat foto wajah pada resolusi model, sedangkan hasil
+klasifikasi lebih murah dan lebih presisi dikirim sebagai teks.
+"""
+import io
+import time
+from typing import Dict, Optional
+
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+
+# agno 1.5 mengirim gambar inline sebagai image/jpeg; webp mengandalkan deteksi di server Gemini
+IMAGE_FORMATS = {"jpeg": "JPEG", "webp": "WEBP"}
+
+
+def encode_agent_image(image_bytes, max_side=None, image_format=None, quality=None) -> Dict:
+    """
+    Downscale (sisi terpanjang <= max_side) dan encode gambar untuk LLM.
+    Return dict: content (bytes), format, width, height, bytes, original_bytes, encode_ms
+    """
+    max_side = max_side or settings.AGENT_IMAGE_MAX_SIDE
+    image_format = (image_format or settings.AGENT_IMAGE_FORMAT).lower()
+    quality = quality or settings.AGENT_IMAGE_QUALITY
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported AGENT_IMAGE_FORMAT: {image_format}")
+
+    start = time.perf_counter()
+    image = Image.open(io.BytesIO(image_bytes))
+    if image.format == "JPEG":
+        # Draft mode: decode langsung pada skala yang mendekati target
+        image.draft("RGB", (max_side, max_side))
+    image = ImageOps.exif_transpose(image).convert("RGB")
+    image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS, reducing_gap=settings.PREPROCESS_REDUCING_GAP or None)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=IMAGE_FORMATS[image_format], quality=quality, optimize=image_format == "jpeg")
+    content = buffer.getvalue()
+    return {
+        "content": content,
+        "format": image_format,
+        "width": image.width,
+        "height": image.height,
+        "bytes": len(content),
+        "original_bytes": len(image_bytes),
+        "encode_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+
+
+def format_prediction(prediction: Optional[Dict]) -> str:
+    """Prediksi ONNX sebagai teks untuk prompt agent"""
+    if not prediction or not prediction.get("top_5_predictions"):
+        return ""
+    lines = [
+        f"- Predicted class: {prediction['predicted_class']} (confidence {prediction['confidence']:.2f})",
+        "- Top predictions:",
+    ]
+    for name, score in prediction["top_5_predictions"][:5]:
+        lines.append(f"    * {name}: {score:.2f}")
+    return "\n".join(lines)
+
+
+def build_agent_input(image_bytes, prediction=None) -> Dict:
+    """Payload untuk analyze_skin: gambar ringkas + prediksi (blocking, jalankan di executor)"""
+    payload = encode_agent_image(image_bytes)
+    payload["prediction"] = prediction
+    return payload
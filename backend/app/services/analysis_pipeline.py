@@ -0,0 +1,462 @@
+"""
+Pipeline /analysis/analyze tanpa memblokir event loop.
+
+Tahap CPU (klasifikasi ONNX + render gambar) berjalan di ThreadPoolExecutor
+terbatas, tahap agent memakai Team.arun. Setiap tahap punya batas concurrency
+sendiri (Settings.ANALYSIS_MAX_CONCURRENT_*), jadi request lain (login,
+history, dll) tetap dilayani selama analisis menunggu Gemini.
+
+Tahap agent dijaga services/llm_guard.py (antrean terbatas, timeout, circuit
+breaker); jika LLM tidak tersedia, analisis sync/stream mendapat hasil
+provisional dari prediksi ONNX yang di-upgrade otomatis oleh job queue.
+"""
+import asyncio
+import json
+import os
+import shutil
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models.analysis import Analysis
+from app.models.skin import Skin
+from app.services.agent import analyze_skin_async, generate_products_async
+from app.services.agent_payload import build_agent_input
+from app.services.journal_context import build_journal_context
+from app.services import item_counts, llm_guard
+from app.services import product_catalog
+from app.services.load_model import get_model_cache, visualize_prediction
+from app.services.provisional_analysis import build_provisional_analysis, predicted_concerns
+
+STAGES = ("classify", "agent")
+REQUIRED_FIELDS = ["overall_health", "skin_type", "concerns", "recommendations", "analysis_metrics", "skincare_products"]
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# Semaphore asyncio terikat ke event loop, jadi disimpan per loop
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+_in_flight = {stage: 0 for stage in STAGES}
+_waiting = {stage: 0 for stage in STAGES}
+_payload_totals = {"requests": 0, "bytes": 0, "original_bytes": 0}
+_payload_lock = threading.Lock()
+_degraded_totals = {"provisional": 0}
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.ANALYSIS_CPU_WORKERS,
+                    thread_name_prefix="analysis-cpu",
+                )
+    return _executor
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+def _semaphore(stage) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphores = _semaphores.get(loop)
+    if semaphores is None:
+        semaphores = {
+            name: asyncio.Semaphore(getattr(settings, f"ANALYSIS_MAX_CONCURRENT_{name.upper()}"))
+            for name in STAGES
+        }
+        _semaphores[loop] = semaphores
+    return semaphores[stage]
+
+
+class _StageSlot:
+    """
+    Batasi concurrency satu tahap dan catat jumlah yang menunggu / berjalan.
+    max_waiting / max_wait membatasi antrean: jika penuh atau menunggu terlalu
+    lama, raise llm_guard.LLMUnavailable("overloaded")
+    """
+
+    def __init__(self, stage, max_wait=None, max_waiting=None):
+        self.stage = stage
+        self.max_wait = max_wait
+        self.max_waiting = max_waiting
+
+    async def __aenter__(self):
+        semaphore = _semaphore(self.stage)
+        if self.max_waiting is not None and semaphore.locked() and _waiting[self.stage] >= self.max_waiting:
+            raise llm_guard.LLMUnavailable("overloaded")
+        _waiting[self.stage] += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.max_wait or None)
+        except asyncio.TimeoutError:
+            raise llm_guard.LLMUnavailable("overloaded")
+        finally:
+            _waiting[self.stage] -= 1
+        _in_flight[self.stage] += 1
+
+    async def __aexit__(self, *exc_info):
+        _in_flight[self.stage] -= 1
+        _semaphore(self.stage).release()
+
+
+def stats() -> Dict:
+    return {
+        stage: {
+            "in_flight": _in_flight[stage],
+            "waiting": _waiting[stage],
+            "limit": getattr(settings, f"ANALYSIS_MAX_CONCURRENT_{stage.upper()}"),
+        }
+        for stage in STAGES
+    }
+
+
+def llm_stats() -> Dict:
+    """State circuit breaker LLM + jumlah analisis provisional"""
+    return {**llm_guard.get_breaker().snapshot(), **_degraded_totals}
+
+
+def payload_stats() -> Dict:
+    """Ukuran rata-rata gambar yang dikirim ke agent vs upload asli"""
+    with _payload_lock:
+        requests = _payload_totals["requests"]
+        return {
+            **_payload_totals,
+            "avg_bytes": round(_payload_totals["bytes"] / requests) if requests else None,
+            "avg_original_bytes": round(_payload_totals["original_bytes"] / requests) if requests else None,
+        }
+
+
+def classify_and_render(filepath, filepath_classify, image_bytes=None, prediction=None):
+    """
+    Klasifikasi + render gambar (blocking); fallback ke gambar asli jika render gagal
+    """
+    saved_classify_path = visualize_prediction(filepath, filepath_classify, image_bytes=image_bytes, prediction=prediction)
+
+    if not saved_classify_path or not os.path.exists(saved_classify_path):
+        print("Warning: Visualization failed, using original image")
+        shutil.copy(filepath, filepath_classify)
+        saved_classify_path = filepath_classify
+    return saved_classify_path
+
+
+async def run_in_executor(stage, fn, *args, **kwargs):
+    async with _StageSlot(stage):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_executor(), partial(fn, *args, **kwargs))
+
+
+async def predict(image_bytes):
+    """Prediksi ONNX saja (tanpa render)"""
+    return await run_in_executor("classify", get_model_cache().predict, image_bytes)
+
+
+async def classify(filepath, filepath_classify, image_bytes=None, prediction=None):
+    return await run_in_executor(
+        "classify", classify_and_render, filepath, filepath_classify, image_bytes=image_bytes, prediction=prediction
+    )
+
+
+def agent_input_for(filepath, image_bytes=None, prediction=None):
+    """
+    Gambar ringkas + prediksi ONNX untuk agent, dibangun di memori dari foto
+    asli (blocking). Prediksi diambil dari PredictionCache jika sudah ada.
+    """
+    if image_bytes is None:
+        with open(filepath, "rb") as f:
+            image_bytes = f.read()
+    if prediction is None:
+        prediction = get_model_cache().predict(image_bytes)
+    agent_input = build_agent_input(image_bytes, prediction)
+
+    with _payload_lock:
+        _payload_totals["requests"] += 1
+        _payload_totals["bytes"] += agent_input["bytes"]
+        _payload_totals["original_bytes"] += agent_input["original_bytes"]
+    print(
+        f"📦 Agent image {agent_input['width']}x{agent_input['height']} {agent_input['format']}: "
+        f"{agent_input['bytes'] / 1024:.1f} KB (upload {agent_input['original_bytes'] / 1024:.1f} KB, "
+        f"{agent_input['encode_ms']} ms)"
+    )
+    return agent_input
+
+
+async def prepare_agent_input(filepath, image_bytes=None, prediction=None):
+    return await run_in_executor("classify", agent_input_for, filepath, image_bytes=image_bytes, prediction=prediction)
+
+
+def _agent_slot():
+    if not settings.LLM_GUARD_ENABLED:
+        return _StageSlot("agent")
+    return _StageSlot("agent", max_wait=settings.LLM_QUEUE_TIMEOUT_SECONDS, max_waiting=settings.LLM_MAX_WAITING)
+
+
+async def run_agent(image_url=None, country=None, journals=None, include_products=True, agent_input=None):
+    # Circuit terbuka: tolak sebelum antre slot agent
+    llm_guard.check_available()
+    async with _agent_slot():
+        return await llm_guard.guarded_call(
+            analyze_skin_async,
+            image_url=image_url, country=country, journals=journals, include_products=include_products,
+            agent_input=agent_input,
+        )
+
+
+async def run_products_agent(country, concerns):
+    """Buat ulang produk katalog untuk concern di country (refresher katalog); slot dan guard sama dengan analisis"""
+    llm_guard.check_available()
+    async with _agent_slot():
+        result = await llm_guard.guarded_call(generate_products_async, country=country, concerns=concerns)
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result.get("skincare_products") or []
+
+
+def provisional_in_new_session(user_id, country, prediction):
+    db = SessionLocal()
+    try:
+        return build_provisional_analysis(db, user_id, country, prediction)
+    finally:
+        db.close()
+
+
+async def analyze(image_url=None, country=None, journals=None, agent_input=None, user_id=None, allow_degraded=True):
+    """
+    Tahap agent + produk: jika katalog punya cukup produk untuk setiap concern
+    hasil prediksi ONNX di country user, agent hanya membuat assessment dan
+    skincare_products diambil dari katalog; jika tidak, produk dibuat agent
+    lalu disimpan ke katalog (di bawah concern LLM dan concern prediksi).
+
+    Jika tahap LLM gagal (circuit terbuka, antrean penuh, timeout, error) dan
+    allow_degraded, return analisis provisional dari prediksi ONNX di
+    agent_input. Job queue memakai allow_degraded=False dan menunda job.
+    Return dict hasil yang sudah divalidasi (parse_analysis_result).
+    """
+    prediction = agent_input.get("prediction") if agent_input else None
+    predicted = predicted_concerns(prediction)
+    use_catalog = await asyncio.to_thread(product_catalog.covers_concerns, country, predicted)
+    try:
+        analysis_result = await run_agent(
+            image_url=image_url, country=country, journals=journals, include_products=not use_catalog, agent_input=agent_input
+        )
+    except Exception as e:
+        if not (allow_degraded and settings.LLM_DEGRADED_MODE_ENABLED and prediction):
+            raise
+        print(f"⚠️  LLM stage unavailable ({type(e).__name__}: {str(e)}), returning provisional analysis")
+        _degraded_totals["provisional"] += 1
+        return await asyncio.to_thread(provisional_in_new_session, user_id, country, prediction)
+    if isinstance(analysis_result, str):
+        analysis_result = json.loads(analysis_result)
+
+    if use_catalog:
+        analysis_result["skincare_products"] = await asyncio.to_thread(
+            product_catalog.products_for_analysis, country, analysis_result, predicted
+        )
+    else:
+        analysis_result = parse_analysis_result(analysis_result)
+        try:
+            await asyncio.to_thread(product_catalog.record_analysis, country, analysis_result, predicted)
+        except Exception as e:
+            print(f"WARNING: Failed to record products in catalog: {str(e)}")
+    return parse_analysis_result(analysis_result)
+
+
+def load_journals(db, user_id):
+    """
+    Journal user untuk prompt agent: ringkasan journal lama + entry paling
+    relevan/baru dalam budget JOURNAL_CONTEXT_MAX_TOKENS
+    """
+    return build_journal_context(db, user_id)
+
+
+def parse_analysis_result(analysis_result):
+    """Validasi dan konversi respons AI"""
+    if isinstance(analysis_result, str):
+        analysis_result = json.loads(analysis_result)
+
+    if not all(field in analysis_result for field in REQUIRED_FIELDS):
+        raise ValueError("Invalid AI response structure")
+    return analysis_result
+
+
+def _update_skin_profile(db, user_id, analysis_result):
+    """Update or create skin profile; return concerns_list"""
+    skin = db.query(Skin).filter(Skin.user_id == user_id).first()
+    concerns_list = [concern["name"] for concern in analysis_result["concerns"]]
+
+    if not skin:
+        skin = Skin(
+            user_id=user_id,
+            skin_type=analysis_result["skin_type"],
+            concerns=", ".join(concerns_list)
+        )
+        db.add(skin)
+    else:
+        skin.skin_type = analysis_result["skin_type"]
+        skin.concerns = ", ".join(concerns_list)
+    return concerns_list
+
+
+def save_analysis(db, user_id, image_url, analysis_result):
+    """
+    Simpan record Analysis dan update/buat skin profile; return (analysis, concerns_list).
+    Hasil provisional otomatis dijadwalkan untuk di-upgrade oleh job queue.
+    """
+    # Percobaan kedua: analisis pertama bersamaan untuk user yang sama, skin
+    # profile (unique per user) sudah dibuat request lain -> ulangi sebagai update
+    for attempt in range(2):
+        analysis = Analysis(
+            user_id=user_id,
+            image_url=image_url,
+            overall_health=analysis_result["overall_health"],
+            skin_type=analysis_result["skin_type"],
+            concerns=analysis_result["concerns"],
+            recommendations=analysis_result["recommendations"],
+            analysis_metrics=analysis_result["analysis_metrics"],
+            skincare_products=analysis_result["skincare_products"],
+            provisional=bool(analysis_result.get("provisional")),
+        )
+        db.add(analysis)
+        concerns_list = _update_skin_profile(db, user_id, analysis_result)
+        try:
+            db.commit()
+            break
+        except IntegrityError:
+            db.rollback()
+            if attempt:
+                raise
+    item_counts.invalidate(user_id, "analyses")
+    db.refresh(analysis)
+
+    if analysis.provisional:
+        # Import lokal: job_queue mengimport modul ini
+        from app.services import job_queue
+        job_queue.enqueue_upgrade(db, analysis)
+    return analysis, concerns_list
+
+
+def upgrade_analysis(db, analysis_id, analysis_result):
+    """Ganti hasil provisional dengan hasil LLM (in place); return analysis atau None jika sudah dihapus"""
+    analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
+    if analysis is None:
+        return None
+    for field in REQUIRED_FIELDS:
+        setattr(analysis, field, analysis_result[field])
+    analysis.provisional = False
+
+    # Skin profile hanya diupdate jika belum ada analisis yang lebih baru
+    newer = db.query(Analysis.id).filter(Analysis.user_id == analysis.user_id, Analysis.id > analysis.id).first()
+    if newer is None:
+        _update_skin_profile(db, analysis.user_id, analysis_result)
+    db.commit()
+    db.refresh(analysis)
+    return analysis
+
+
+def analysis_response_data(analysis, concerns_list):
+    return {
+        "analysis": {
+            "id": analysis.id,
+            "image_url": analysis.image_url,
+            "overall_health": analysis.overall_health,
+            "skin_type": analysis.skin_type,
+            "concerns": analysis.concerns,
+            "recommendations": analysis.recommendations,
+            "analysis_metrics": analysis.analysis_metrics,
+            "skincare_products": analysis.skincare_products,
+            "provisional": analysis.provisional,
+            "created_at": analysis.created_at.isoformat()
+        },
+        "skin_profile": {
+            "skin_type": analysis.skin_type,
+            "concerns": concerns_list
+        }
+    }
+
+
+def save_analysis_in_new_session(user_id, image_url, analysis_result):
+    """save_analysis dengan session sendiri (dipakai di luar request scope, mis. SSE)"""
+    db = SessionLocal()
+    try:
+        analysis, concerns_list = save_analysis(db, user_id, image_url, analysis_result)
+        return analysis_response_data(analysis, concerns_list)
+    finally:
+        db.close()
+
+
+def _event(event, data):
+    return {"event": event, "data": json.dumps(data, default=str)}
+
+
+async def stream_analysis(user_id, filepath, filepath_classify, image_bytes, image_url, classify_url, country=None, journals=None):
+    """
+    Generator event SSE untuk /analysis/analyze/stream:
+    prediction -> classification -> agent_progress... -> result (atau error).
+    Jika LLM tidak tersedia, agent_progress terakhir berstatus "provisional".
+
+    Jika client menutup koneksi, generator di-cancel: task agent ikut
+    dibatalkan dan file upload dihapus sehingga tidak ada kerja yang terbuang.
+    """
+    agent_task = None
+    completed = False
+    try:
+        yield _event("stage", {"stage": "classify", "status": "running"})
+        prediction = await predict(image_bytes)
+        yield _event("prediction", {
+            "predicted_class": prediction["predicted_class"],
+            "confidence": prediction["confidence"],
+            "top_5_predictions": prediction["top_5_predictions"],
+        })
+
+        await classify(filepath, filepath_classify, image_bytes=image_bytes, prediction=prediction)
+        agent_input = await prepare_agent_input(filepath, image_bytes=image_bytes, prediction=prediction)
+        yield _event("classification", {"image_url": classify_url, "agent_payload_bytes": agent_input["bytes"]})
+
+        started = time.monotonic()
+        agent_task = asyncio.create_task(analyze(country=country, journals=journals, agent_input=agent_input, user_id=user_id))
+        yield _event("agent_progress", {"stage": "agent", "status": "running", "elapsed": 0.0})
+        while True:
+            done, _ = await asyncio.wait({agent_task}, timeout=settings.ANALYSIS_STREAM_PROGRESS_SECONDS)
+            if done:
+                break
+            yield _event("agent_progress", {
+                "stage": "agent",
+                "status": "running",
+                "elapsed": round(time.monotonic() - started, 1),
+                "pipeline": stats()["agent"],
+            })
+        analysis_result = agent_task.result()
+        yield _event("agent_progress", {
+            "stage": "agent",
+            "status": "provisional" if analysis_result.get("provisional") else "succeeded",
+            "elapsed": round(time.monotonic() - started, 1),
+        })
+
+        yield _event("stage", {"stage": "saving", "status": "running"})
+        data = await asyncio.to_thread(save_analysis_in_new_session, user_id, image_url, analysis_result)
+        completed = True
+        yield _event("result", data)
+    except asyncio.CancelledError:
+        print(f"🔌 Client disconnected, cancelling analysis for {filepath}")
+        raise
+    except Exception as e:
+        yield _event("error", {"detail": f"Analysis failed: {str(e)}"})
+    finally:
+        if agent_task is not None and not agent_task.done():
+            agent_task.cancel()
+        if not completed:
+            # Clean up the uploaded file if analysis fails / dibatalkan
+            for path in (filepath, filepath_classify):
+                if os.path.exists(path):
+                    os.remove(path)
@@ -0,0 +1,137 @@
+"""
+Backend agent palsu (AGENT_BACKEND="fake") untuk load test tanpa kuota Gemini.
+
+FakeTeam meniru permukaan Team agno yang dipakai services/agent.py
+(run/arun + state run yang di-reset TeamPool) dan mengembalikan
+SkinAnalysisResponse / SkinAssessmentResponse (atau SkincareProductsResponse
+untuk agent produk refresher katalog) yang valid secara schema
+setelah latency acak. Distribusi latency dan rasio error diatur lewat
+AGENT_FAKE_* di config.
+"""
+import asyncio
+import random
+import threading
+import time
+
+from app.core.config import settings
+
+CONCERNS = ["Acne", "Blackheads", "Dark Spots", "Dry Skin", "Enlarged Pores", "Eyebags", "Oily Skin", "Skin Redness", "Wrinkles"]
+SKIN_TYPES = ["Oily", "Dry", "Combination", "Normal"]
+SEVERITIES = ["Mild", "Moderate", "Severe"]
+PRIORITIES = ["High", "Medium", "Low"]
+
+_rng = random.Random(settings.AGENT_FAKE_SEED)
+_rng_lock = threading.Lock()
+
+
+class FakeAgentError(RuntimeError):
+    pass
+
+
+class FakeRunResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+def sample_latency(rng) -> float:
+    base = settings.AGENT_FAKE_LATENCY_SECONDS
+    distribution = settings.AGENT_FAKE_LATENCY_DISTRIBUTION
+    if distribution == "fixed":
+        return base
+    if distribution == "uniform":
+        spread = base * settings.AGENT_FAKE_LATENCY_SIGMA
+        return max(0.0, rng.uniform(base - spread, base + spread))
+    if distribution == "lognormal":
+        # base = median
+        return rng.lognormvariate(0.0, settings.AGENT_FAKE_LATENCY_SIGMA) * base
+    raise ValueError(f"Unknown AGENT_FAKE_LATENCY_DISTRIBUTION: {distribution}")
+
+
+def fake_analysis(rng, include_products=True):
+    from app.services.agent import SkinAnalysisResponse, SkinAssessmentResponse
+
+    concerns = rng.sample(CONCERNS, rng.randint(1, 3))
+    data = {
+        "overall_health": rng.choice(["Good", "Fair", "Poor"]),
+        "skin_type": rng.choice(SKIN_TYPES),
+        "concerns": [
+            {"name": name, "severity": rng.choice(SEVERITIES), "type": None, "confidence": round(rng.uniform(0.5, 0.99), 2)}
+            for name in concerns
+        ],
+        "recommendations": [
+            {"title": f"Treat {name.lower()}", "description": f"Simulated recommendation for {name.lower()}.", "priority": rng.choice(PRIORITIES)}
+            for name in concerns
+        ],
+        "analysis_metrics": {
+            "skin_hydration": rng.randint(0, 100),
+            "texture_uniformity": rng.randint(0, 100),
+            "pore_visibility": rng.randint(0, 100),
+            "overall_score": rng.randint(0, 100),
+        },
+    }
+    if not include_products:
+        return SkinAssessmentResponse(**data)
+    data["skincare_products"] = fake_products(rng, concerns)
+    return SkinAnalysisResponse(**data)
+
+
+def fake_products(rng, concerns):
+    return [
+        {
+            "title": f"{name} Care {rng.randint(1, 5)}",
+            "description": f"Simulated product for {name.lower()}.",
+            "priority": rng.choice(PRIORITIES),
+            "price": f"${rng.randint(5, 60)}.00",
+            "how_to_use": "Apply to clean skin.",
+            "benefits": f"Helps with {name.lower()}.",
+            "side_effects": "None known.",
+            "dosage": "Once daily.",
+        }
+        for name in concerns
+    ]
+
+
+def fake_products_response(rng):
+    from app.services.agent import SkincareProductsResponse
+
+    return SkincareProductsResponse(skincare_products=fake_products(rng, rng.sample(CONCERNS, 3)))
+
+
+class FakeTeam:
+    def __init__(self, include_products=True, products_only=False):
+        self.include_products = include_products
+        self.products_only = products_only
+        self.members = []
+        self.memory = None
+        self.session_id = None
+        self.session_state = None
+        self.session_name = None
+        self.runs = 0
+
+    def _plan(self):
+        with _rng_lock:
+            latency = sample_latency(_rng)
+            failed = _rng.random() < settings.AGENT_FAKE_ERROR_RATE
+            if failed:
+                content = None
+            elif self.products_only:
+                content = fake_products_response(_rng)
+            else:
+                content = fake_analysis(_rng, self.include_products)
+        return latency, failed, content
+
+    def _respond(self, failed, content):
+        self.runs += 1
+        if failed:
+            raise FakeAgentError("Simulated Gemini error: 429 RESOURCE_EXHAUSTED")
+        return FakeRunResponse(content)
+
+    def run(self, message, images=None, session_id=None, **kwargs):
+        latency, failed, content = self._plan()
+        time.sleep(latency)
+        return self._respond(failed, content)
+
+    async def arun(self, message, images=None, session_id=None, **kwargs):
+        latency, failed, content = self._plan()
+        await asyncio.sleep(latency)
+        return self._respond(failed, content)
@@ -0,0 +1,378 @@
+"""
+Out-of-process inference pool.
+
+Satu proses server memiliki sejumlah worker process yang masing-masing memegang
+InferenceSession. Setiap worker uvicorn hanya menjadi client: tensor hasil
+preprocessing ditulis ke multiprocessing.shared_memory, worker pool menulis
+probability vector kembali ke blok yang sama. Model hanya dimuat sekali per pool.
+
+Jalankan server:
+    INFERENCE_POOL_AUTHKEY=<secret> python -m app.services.inference_pool --workers 2
+lalu set INFERENCE_POOL_ENABLED=true (dan authkey yang sama) untuk API.
+
+Shared memory hanya bisa dipakai di host yang sama, jadi manager selalu
+listen di loopback. Worker yang crash dijalankan ulang oleh supervisor;
+jika model gagal dimuat saat startup, server berhenti dengan error.
+"""
+import argparse
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import sys
+import threading
+import uuid
+from concurrent.futures import Future
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.managers import BaseManager, DictProxy
+from typing import Dict
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.load_model import (
+    METADATA_JSON,
+    ProductionONNXEnsembleModel,
+    model_variant_path,
+)
+
+
+POOL_HOST = "127.0.0.1"
+STARTUP_POLL_SECONDS = 1.0
+RESTART_MAX_BACKOFF_SECONDS = 60.0
+
+
+class PoolManager(BaseManager):
+    pass
+
+
+def _authkey() -> bytes:
+    if not settings.INFERENCE_POOL_AUTHKEY:
+        raise RuntimeError("INFERENCE_POOL_AUTHKEY must be set for the inference pool (server and API)")
+    return settings.INFERENCE_POOL_AUTHKEY.encode()
+
+
+def _attach(shm_name):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    # Blok dimiliki client; jangan biarkan resource tracker worker meng-unlink-nya
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _worker_main(index, task_queue, done_queue, model_path, metadata_path, session_profile):
+    try:
+        model = ProductionONNXEnsembleModel(model_path, metadata_path, session_profile=session_profile)
+    except Exception as e:
+        # Laporkan ke serve() agar tidak menunggu pesan "ready" selamanya
+        done_queue.put((index, None, {"error": f"{type(e).__name__}: {str(e)}", "pid": os.getpid()}))
+        return
+    num_classes = len(model.classes)
+    done_queue.put((index, None, {
+        "classes": list(model.classes),
+        "input_shape": list(model.input_shape),
+        "max_batch_size": model.max_batch_size(),
+        "model_version": model.model_version,
+    }))
+    print(f"🧵 Inference worker {os.getpid()} ready")
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            return
+        client_id, request_id, shm_name, shape = task
+        try:
+            shm = _attach(shm_name)
+            try:
+                n = shape[0]
+                in_bytes = int(np.prod(shape)) * 4
+                img_batch = np.ndarray(shape, dtype=np.float32, buffer=shm.buf[:in_bytes])
+                outputs = model.run_batch(img_batch)
+
+                # Probability vector: output ke-3 untuk model ensemble, selain itu output pertama
+                predictions = outputs[2] if len(outputs) >= 3 else outputs[0]
+                predictions = np.asarray(predictions, dtype=np.float32).reshape(n, -1)
+                if predictions.shape[1] != num_classes:
+                    raise ValueError(f"Model returned {predictions.shape[1]} scores, expected {num_classes}")
+
+                out = np.ndarray((n, num_classes), dtype=np.float32, buffer=shm.buf[in_bytes:])
+                out[:] = predictions
+                del img_batch, out
+            finally:
+                shm.close()
+            done_queue.put((index, client_id, (request_id, None)))
+        except Exception as e:
+            done_queue.put((index, client_id, (request_id, str(e))))
+
+
+def _wait_ready(done_queue, workers):
+    """Metadata model dari worker pertama yang siap; RuntimeError jika worker gagal memuat model"""
+    while True:
+        try:
+            _, _, info = done_queue.get(timeout=STARTUP_POLL_SECONDS)
+        except queue.Empty:
+            if not any(worker.is_alive() for worker in workers):
+                codes = [worker.exitcode for worker in workers]
+                raise RuntimeError(f"All inference workers exited before loading the model (exit codes {codes})")
+            continue
+        if "error" in info:
+            raise RuntimeError(f"Inference worker {info['pid']} failed to load the model: {info['error']}")
+        return info
+
+
+def serve(num_workers=None, port=None):
+    """
+    Jalankan server pool (blocking). RuntimeError jika model tidak bisa dimuat.
+
+    Setiap worker punya task queue sendiri dan thread dispatcher membagi task
+    ke worker dengan task berjalan paling sedikit: worker yang di-kill saat
+    menunggu di queue bersama akan meninggalkan lock queue itu terkunci.
+    """
+    num_workers = num_workers or settings.INFERENCE_POOL_WORKERS
+    port = port or settings.INFERENCE_POOL_PORT
+    authkey = _authkey()
+
+    ctx = mp.get_context("spawn")
+    task_queue: queue.Queue = queue.Queue()  # client -> dispatcher (lewat manager)
+    done_queue = ctx.Queue()
+    stopping = threading.Event()
+    lock = threading.Lock()
+    workers, worker_queues = [], []
+    in_flight = [set() for _ in range(num_workers)]  # (client_id, request_id) per worker
+
+    def start_worker(index):
+        worker_queue = ctx.Queue()
+        worker = ctx.Process(
+            target=_worker_main,
+            args=(index, worker_queue, done_queue, model_variant_path(), METADATA_JSON, settings.INFERENCE_POOL_SESSION_PROFILE),
+            name=f"inference-worker-{index}",
+            daemon=True,
+        )
+        worker.start()
+        return worker, worker_queue
+
+    for i in range(num_workers):
+        worker, worker_queue = start_worker(i)
+        workers.append(worker)
+        worker_queues.append(worker_queue)
+
+    def stop_workers():
+        stopping.set()
+        task_queue.put(None)
+        for worker_queue in worker_queues:
+            worker_queue.put(None)
+        for worker in workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+
+    try:
+        # Worker pertama yang siap mengirim metadata model untuk client
+        info = _wait_ready(done_queue, workers)
+    except BaseException:
+        stop_workers()
+        raise
+    info["workers"] = num_workers
+
+    result_queues: Dict[str, queue.Queue] = {}
+
+    def get_result_queue(client_id):
+        with lock:
+            if client_id not in result_queues:
+                result_queues[client_id] = queue.Queue()
+            return result_queues[client_id]
+
+    def release_client(client_id):
+        with lock:
+            result_queues.pop(client_id, None)
+
+    def deliver(client_id, payload):
+        with lock:
+            result_queue = result_queues.get(client_id)
+        if result_queue is not None:
+            result_queue.put(payload)
+
+    def dispatch():
+        while True:
+            task = task_queue.get()
+            if task is None:
+                return
+            with lock:
+                index = min(range(num_workers), key=lambda i: len(in_flight[i]))
+                in_flight[index].add((task[0], task[1]))
+                worker_queues[index].put(task)
+
+    def route_results():
+        while True:
+            index, client_id, payload = done_queue.get()
+            if client_id is None:
+                # Pesan "ready" (atau gagal load) dari worker lain / worker yang dijalankan ulang
+                if "error" in payload:
+                    print(f"❌ Inference worker {payload['pid']} failed to load the model: {payload['error']}")
+                continue
+            with lock:
+                in_flight[index].discard((client_id, payload[0]))
+            deliver(client_id, payload)
+
+    def supervise():
+        restarts = 0
+        while not stopping.wait(STARTUP_POLL_SECONDS):
+            crashed = [i for i, worker in enumerate(workers) if not worker.is_alive()]
+            if not crashed:
+                restarts = 0
+                continue
+            for i in crashed:
+                print(f"⚠️  Inference worker {workers[i].pid} exited with code {workers[i].exitcode}, restarting")
+                with lock:
+                    lost, in_flight[i] = in_flight[i], set()
+                    workers[i], worker_queues[i] = start_worker(i)
+                # Task yang dipegang worker crash langsung gagal, bukan menunggu INFERENCE_POOL_TIMEOUT
+                for client_id, request_id in lost:
+                    deliver(client_id, (request_id, "inference worker crashed"))
+            restarts += 1
+            # Worker yang terus crash (misalnya model rusak) tidak di-restart terus-menerus
+            stopping.wait(min(STARTUP_POLL_SECONDS * 2 ** (restarts - 1), RESTART_MAX_BACKOFF_SECONDS))
+
+    threading.Thread(target=dispatch, name="inference-pool-dispatcher", daemon=True).start()
+    threading.Thread(target=route_results, name="inference-pool-router", daemon=True).start()
+    threading.Thread(target=supervise, name="inference-pool-supervisor", daemon=True).start()
+
+    PoolManager.register("get_task_queue", callable=lambda: task_queue)
+    PoolManager.register("get_result_queue", callable=get_result_queue)
+    PoolManager.register("release_client", callable=release_client)
+    PoolManager.register("get_info", callable=lambda: info, proxytype=DictProxy)
+
+    manager = PoolManager(address=(POOL_HOST, port), authkey=authkey)
+    server = manager.get_server()
+    print(f"🚀 Inference pool listening on {POOL_HOST}:{port} with {num_workers} workers")
+    try:
+        server.serve_forever()
+    finally:
+        stop_workers()
+
+
+class InferencePoolClient:
+    """
+    Client per proses API: kirim tensor lewat shared memory, terima Future
+    """
+
+    def __init__(self, port=None):
+        PoolManager.register("get_task_queue")
+        PoolManager.register("get_result_queue")
+        PoolManager.register("release_client")
+        PoolManager.register("get_info", proxytype=DictProxy)
+
+        self._manager = PoolManager(
+            address=(POOL_HOST, port or settings.INFERENCE_POOL_PORT),
+            authkey=_authkey(),
+        )
+        self._manager.connect()
+        self.client_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.info = self._manager.get_info().copy()
+        self.num_classes = len(self.info["classes"])
+
+        self._task_queue = self._manager.get_task_queue()
+        self._result_queue = self._manager.get_result_queue(self.client_id)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._listener = threading.Thread(target=self._listen, name="inference-pool-client", daemon=True)
+        self._listener.start()
+
+    def submit(self, img_batch) -> Future:
+        """
+        Kirim batch [N, H, W, 3] float32, hasil Future berisi probability [N, C]
+        """
+        return self._submit(img_batch)[1]
+
+    def _submit(self, img_batch):
+        img_batch = np.ascontiguousarray(img_batch, dtype=np.float32)
+        n = img_batch.shape[0]
+        in_bytes = img_batch.nbytes
+        shm = shared_memory.SharedMemory(create=True, size=in_bytes + n * self.num_classes * 4)
+        np.ndarray(img_batch.shape, dtype=np.float32, buffer=shm.buf[:in_bytes])[:] = img_batch
+
+        future = Future()
+        request_id = next(self._ids)
+        with self._lock:
+            self._pending[request_id] = (future, shm, n, in_bytes)
+        try:
+            self._task_queue.put((self.client_id, request_id, shm.name, img_batch.shape))
+        except BaseException:
+            self._discard(request_id)
+            raise
+        return request_id, future
+
+    def run(self, img_batch):
+        request_id, future = self._submit(img_batch)
+        try:
+            return future.result(timeout=settings.INFERENCE_POOL_TIMEOUT)
+        finally:
+            # Timeout: hasil yang datang belakangan diabaikan _listen, blok dilepas di sini
+            self._discard(request_id)
+
+    def _discard(self, request_id):
+        with self._lock:
+            entry = self._pending.pop(request_id, None)
+        if entry is not None:
+            _, shm, _, _ = entry
+            shm.close()
+            shm.unlink()
+
+    def close(self):
+        self._manager.release_client(self.client_id)
+
+    def _listen(self):
+        while True:
+            request_id, error = self._result_queue.get()
+            with self._lock:
+                entry = self._pending.pop(request_id, None)
+            if entry is None:
+                continue
+            future, shm, n, in_bytes = entry
+            try:
+                if error is None:
+                    out = np.ndarray((n, self.num_classes), dtype=np.float32, buffer=shm.buf[in_bytes:])
+                    result = out.copy()
+                    del out
+                    future.set_result(result)
+                else:
+                    future.set_exception(RuntimeError(f"Inference pool error: {error}"))
+            finally:
+                shm.close()
+                shm.unlink()
+
+
+class PooledModel(ProductionONNXEnsembleModel):
+    """
+    Model proxy untuk mode pool: preprocessing dan post-processing di proses API,
+    session.run di worker pool
+    """
+
+    def __init__(self, client: InferencePoolClient):
+        self.client = client
+        self.onnx_model_path = model_variant_path()
+        self.session_profile = {"name": "pool"}
+        self.classes = client.info["classes"]
+        self.input_shape = client.info["input_shape"]
+        self._max_batch_size = client.info["max_batch_size"]
+        self.model_version = client.info["model_version"]
+        print(f"✅ Connected to inference pool ({client.info['workers']} workers, {len(self.classes)} classes)")
+
+    def max_batch_size(self):
+        return self._max_batch_size
+
+    def run_batch(self, img_batch):
+        # Satu output berisi probability sehingga postprocess_batch memakai jalur argmax
+        return [self.client.run(img_batch)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RonaAI ONNX inference pool")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--port", type=int, default=None)
+    args = parser.parse_args()
+    try:
+        serve(num_workers=args.workers, port=args.port)
+    except RuntimeError as e:
+        print(f"❌ {str(e)}", file=sys.stderr)
+        sys.exit(1)
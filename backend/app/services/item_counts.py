@@ -0,0 +1,104 @@
+"""
+Cache jumlah item per user (analisis, journal, produk) untuk `total` di
+endpoint list.
+
+Sebelumnya setiap halaman menjalankan count() sendiri. Sekarang total
+dihitung sekali lalu disimpan per (jenis, user) di LRU memori dengan TTL.
+Endpoint yang menambah/menghapus item memanggil invalidate() setelah commit,
+jadi di dalam satu proses total selalu tepat. Worker lain melihat perubahan
+paling lambat setelah ITEM_COUNT_CACHE_TTL_SECONDS.
+
+Generation per key mencegah count() yang berjalan bersamaan dengan tulis
+menyimpan angka lama: hasilnya hanya disimpan jika tidak ada invalidate()
+selama query berjalan.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from app.core.config import settings
+
+KINDS = ("analyses", "journals", "products")
+
+
+class ItemCountCache:
+    def __init__(self, ttl_seconds=300.0, max_entries=10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: "OrderedDict[Tuple[str, int], tuple]" = OrderedDict()
+        self._generations: Dict[Tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind, user_id) -> Tuple[Optional[int], int]:
+        """(total atau None, generation) -- generation diteruskan ke put()"""
+        key = (kind, user_id)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            generation = self._generations.get(key, 0)
+            if entry is None:
+                self.misses += 1
+                return None, generation
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], generation
+
+    def put(self, kind, user_id, total, generation):
+        key = (kind, user_id)
+        with self._lock:
+            if self._generations.get(key, 0) != generation:
+                # Ada tulis selama count() berjalan: angka ini mungkin sudah basi
+                return
+            self._entries[key] = (time.time() + self.ttl_seconds, total)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id, *kinds):
+        """Buang total user (semua jenis jika kinds kosong); panggil setelah commit"""
+        with self._lock:
+            for kind in kinds or KINDS:
+                key = (kind, user_id)
+                self._entries.pop(key, None)
+                # Generation hanya perlu bertahan selama ada count() yang berjalan
+                if len(self._generations) >= self.max_entries:
+                    self._generations.clear()
+                self._generations[key] = self._generations.get(key, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+item_counts = ItemCountCache(
+    ttl_seconds=settings.ITEM_COUNT_CACHE_TTL_SECONDS,
+    max_entries=settings.ITEM_COUNT_CACHE_MAX_ENTRIES,
+)
+
+
+def invalidate(user_id, *kinds):
+    item_counts.invalidate(user_id, *kinds)
+
+
+async def cached_total(db, model, user_id) -> int:
+    """Jumlah baris `model` milik user dari cache, count() lewat index (user_id, created_at) saat miss"""
+    kind = model.__tablename__
+    total, generation = item_counts.get(kind, user_id)
+    if total is None:
+        total = await db.scalar(select(func.count()).select_from(model).where(model.user_id == user_id))
+        item_counts.put(kind, user_id, total, generation)
+    return total
@@ -0,0 +1,384 @@
+"""
+Queue job analisis yang durable, disimpan di tabel analysis_jobs.
+
+POST /analysis/analyze?mode=job hanya menyimpan upload dan membuat job,
+lalu worker asyncio (dijalankan saat startup) mengambil job satu per satu:
+classify -> agent -> saving. Job yang gagal dicoba ulang dengan backoff
+eksponensial; setelah max_attempts job ditandai "dead" (dead letter) dan
+error terakhir disimpan. Job "running" yang heartbeat-nya lebih lama dari
+ANALYSIS_JOB_STALE_SECONDS (proses worker mati) dikembalikan ke queue.
+
+Job kind="upgrade" menjalankan ulang tahap agent untuk analysis provisional
+(mode degraded, lihat services/llm_guard.py) dan mengganti hasilnya in place.
+Selama circuit LLM terbuka, job ditunda tanpa menghitung percobaan.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models.analysis import Analysis
+from app.models.analysis_jobs import AnalysisJob
+from app.models.users import User
+from app.services import analysis_pipeline, llm_guard
+
+JOB_STAGES = ("classify", "agent", "saving")
+WORKER_MAX_BACKOFF_SECONDS = 60.0
+
+logger = logging.getLogger(__name__)
+
+_workers: List[asyncio.Task] = []
+_wakeup: Optional[asyncio.Event] = None
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def enqueue(db, user_id, image_path, classify_path, image_url=None) -> AnalysisJob:
+    job = AnalysisJob(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        status="queued",
+        stage=JOB_STAGES[0],
+        stages={stage: {"status": "pending"} for stage in JOB_STAGES},
+        max_attempts=settings.ANALYSIS_JOB_MAX_ATTEMPTS,
+        image_path=image_path,
+        classify_path=classify_path,
+        image_url=image_url,
+        available_at=time.time(),
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    if _wakeup is not None:
+        _wakeup.set()
+    return job
+
+
+def enqueue_upgrade(db, analysis) -> AnalysisJob:
+    """
+    Jadwalkan analisis LLM ulang untuk analysis provisional, mulai saat
+    circuit LLM boleh dicoba lagi. Gambar klasifikasi sudah ada, jadi tahap
+    classify langsung succeeded. Worker tidak dibangunkan (_wakeup bukan
+    thread-safe, dan job belum tersedia); job diambil pada polling berikutnya.
+    """
+    # Path upload diturunkan dari image_url, sama seperti delete-analysis
+    image_path = os.path.join("uploads", analysis.image_url.split("/uploads/", 1)[-1])
+    classify_path = os.path.join("uploads", "classify", os.path.basename(image_path).replace(".", "_classify."))
+    stages = {stage: {"status": "pending"} for stage in JOB_STAGES}
+    stages["classify"] = {"status": "succeeded", "finished_at": _now()}
+    job = AnalysisJob(
+        id=uuid.uuid4().hex,
+        user_id=analysis.user_id,
+        kind="upgrade",
+        status="queued",
+        stage="agent",
+        stages=stages,
+        max_attempts=settings.ANALYSIS_JOB_MAX_ATTEMPTS,
+        image_path=image_path,
+        classify_path=classify_path,
+        image_url=analysis.image_url,
+        analysis_id=analysis.id,
+        available_at=llm_guard.retry_at(),
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+
+def job_status(job: AnalysisJob) -> Dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "stage": job.stage,
+        "stages": job.stages,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "last_error": job.last_error,
+        "analysis_id": job.analysis_id,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+    }
+
+
+def claim_next_job() -> Optional[str]:
+    """
+    Ambil job queued tertua secara atomik (UPDATE bersyarat, aman untuk banyak worker/proses)
+    """
+    db = SessionLocal()
+    try:
+        candidates = db.query(AnalysisJob.id)\
+            .filter(AnalysisJob.status == "queued", AnalysisJob.available_at <= time.time())\
+            .order_by(AnalysisJob.available_at)\
+            .limit(5)\
+            .all()
+        for (job_id,) in candidates:
+            claimed = db.query(AnalysisJob)\
+                .filter(AnalysisJob.id == job_id, AnalysisJob.status == "queued")\
+                .update(
+                    {AnalysisJob.status: "running", AnalysisJob.attempts: AnalysisJob.attempts + 1, AnalysisJob.locked_at: time.time()},
+                    synchronize_session=False,
+                )
+            db.commit()
+            if claimed:
+                return job_id
+        return None
+    finally:
+        db.close()
+
+
+def _update_stage(job_id, stage, stage_status, error=None):
+    db = SessionLocal()
+    try:
+        job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+        stages = dict(job.stages or {})
+        entry = dict(stages.get(stage, {}))
+        entry["status"] = stage_status
+        entry["started_at" if stage_status == "running" else "finished_at"] = _now()
+        if error:
+            entry["error"] = error
+        stages[stage] = entry
+        # Kolom JSON harus diganti (bukan dimutasi) agar SQLAlchemy mendeteksi perubahan
+        job.stages = stages
+        job.stage = stage
+        job.locked_at = time.time()
+        db.commit()
+    finally:
+        db.close()
+
+
+def _finish(job_id, analysis_id):
+    db = SessionLocal()
+    try:
+        job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+        job.status = "succeeded"
+        job.stage = "done"
+        job.analysis_id = analysis_id
+        job.last_error = None
+        db.commit()
+    finally:
+        db.close()
+
+
+def _fail(job_id, stage, error):
+    """Retry dengan backoff eksponensial, atau dead letter setelah max_attempts"""
+    db = SessionLocal()
+    try:
+        job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+        job.last_error = error
+        stages = dict(job.stages or {})
+        stages[stage] = {**stages.get(stage, {}), "status": "failed", "error": error, "finished_at": _now()}
+        job.stages = stages
+        if job.attempts >= job.max_attempts:
+            job.status = "dead"
+            print(f"💀 Analysis job {job_id} moved to dead letter after {job.attempts} attempts: {error}")
+        else:
+            job.status = "queued"
+            job.available_at = time.time() + settings.ANALYSIS_JOB_RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+            print(f"🔁 Analysis job {job_id} failed at {stage} (attempt {job.attempts}), retrying: {error}")
+        db.commit()
+    finally:
+        db.close()
+
+
+def _defer(job_id, stage, error, available_at):
+    """LLM tidak tersedia: kembalikan ke queue tanpa menghitung percobaan"""
+    db = SessionLocal()
+    try:
+        job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+        stages = dict(job.stages or {})
+        stages[stage] = {**stages.get(stage, {}), "status": "deferred", "error": error}
+        job.stages = stages
+        job.status = "queued"
+        job.attempts -= 1
+        job.available_at = max(available_at or 0, time.time() + settings.ANALYSIS_JOB_POLL_SECONDS)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _load_job_context(job_id):
+    db = SessionLocal()
+    try:
+        job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+        user = db.query(User).filter(User.id == job.user_id).first()
+        analysis_id = job.analysis_id
+        if job.kind == "upgrade":
+            # SQLite tidak menjalankan ondelete=SET NULL tanpa PRAGMA foreign_keys, jadi cek langsung
+            analysis = db.query(Analysis.provisional).filter(Analysis.id == job.analysis_id).first()
+            if analysis is None or not analysis.provisional:
+                analysis_id = None
+        return {
+            "kind": job.kind,
+            "analysis_id": analysis_id,
+            "user_id": job.user_id,
+            "country": user.country if user else None,
+            "journals": analysis_pipeline.load_journals(db, job.user_id),
+            "image_path": job.image_path,
+            "classify_path": job.classify_path,
+            "image_url": job.image_url,
+            "stages": dict(job.stages or {}),
+        }
+    finally:
+        db.close()
+
+
+def _save_result(user_id, image_url, analysis_result):
+    db = SessionLocal()
+    try:
+        analysis, _ = analysis_pipeline.save_analysis(db, user_id, image_url, analysis_result)
+        return analysis.id
+    finally:
+        db.close()
+
+
+def _upgrade_result(analysis_id, analysis_result):
+    db = SessionLocal()
+    try:
+        analysis = analysis_pipeline.upgrade_analysis(db, analysis_id, analysis_result)
+        return analysis.id if analysis is not None else None
+    finally:
+        db.close()
+
+
+async def process_job(job_id):
+    stage = "classify"
+    try:
+        # Akses DB sync dijalankan di thread agar event loop tetap bebas.
+        # Gagal memuat konteks (mis. "database is locked") dihitung sebagai percobaan gagal
+        context = await asyncio.to_thread(_load_job_context, job_id)
+        upgrade = context["kind"] == "upgrade"
+        if upgrade and context["analysis_id"] is None:
+            # Analysis provisional sudah dihapus user atau sudah di-upgrade
+            await asyncio.to_thread(_finish, job_id, None)
+            return
+
+        # Retry tidak mengulang render jika gambar klasifikasi sudah ada
+        if context["stages"].get("classify", {}).get("status") != "succeeded":
+            await asyncio.to_thread(_update_stage, job_id, stage, "running")
+            await analysis_pipeline.classify(context["image_path"], context["classify_path"])
+            await asyncio.to_thread(_update_stage, job_id, stage, "succeeded")
+
+        stage = "agent"
+        await asyncio.to_thread(_update_stage, job_id, stage, "running")
+        agent_input = await analysis_pipeline.prepare_agent_input(context["image_path"])
+        # Job menunggu LLM pulih, bukan membuat hasil provisional
+        analysis_result = await analysis_pipeline.analyze(
+            country=context["country"], journals=context["journals"], agent_input=agent_input,
+            user_id=context["user_id"], allow_degraded=False,
+        )
+        await asyncio.to_thread(_update_stage, job_id, stage, "succeeded")
+
+        stage = "saving"
+        await asyncio.to_thread(_update_stage, job_id, stage, "running")
+        if upgrade:
+            analysis_id = await asyncio.to_thread(_upgrade_result, context["analysis_id"], analysis_result)
+            if analysis_id is not None:
+                print(f"⬆️  Provisional analysis {analysis_id} upgraded by job {job_id}")
+        else:
+            analysis_id = await asyncio.to_thread(_save_result, context["user_id"], context["image_url"], analysis_result)
+        await asyncio.to_thread(_update_stage, job_id, stage, "succeeded")
+        await asyncio.to_thread(_finish, job_id, analysis_id)
+    except asyncio.CancelledError:
+        # Shutdown: kembalikan ke queue tanpa menghitung sebagai percobaan gagal
+        await asyncio.to_thread(release_jobs, [job_id])
+        raise
+    except llm_guard.LLMUnavailable as e:
+        await asyncio.to_thread(_defer, job_id, stage, str(e), e.retry_at)
+    except Exception as e:
+        await asyncio.to_thread(_fail, job_id, stage, f"{type(e).__name__}: {str(e)}")
+
+
+async def _worker_loop(worker_id):
+    last_recovery = time.monotonic()
+    failures = 0
+    while True:
+        try:
+            if time.monotonic() - last_recovery > settings.ANALYSIS_JOB_STALE_SECONDS:
+                await asyncio.to_thread(recover_stale_jobs)
+                last_recovery = time.monotonic()
+            job_id = await asyncio.to_thread(claim_next_job)
+            if job_id is None:
+                _wakeup.clear()
+                try:
+                    await asyncio.wait_for(_wakeup.wait(), timeout=settings.ANALYSIS_JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await process_job(job_id)
+            failures = 0
+        except Exception:
+            # Error DB (mis. "database is locked") tidak boleh mematikan worker;
+            # job yang tertinggal "running" diambil lagi oleh recover_stale_jobs
+            failures += 1
+            backoff = min(settings.ANALYSIS_JOB_POLL_SECONDS * 2 ** (failures - 1), WORKER_MAX_BACKOFF_SECONDS)
+            logger.exception("Analysis job worker %s failed (%s in a row), retrying in %.1fs", worker_id, failures, backoff)
+            await asyncio.sleep(backoff)
+
+
+def release_jobs(job_ids):
+    """Kembalikan job yang sedang dikerjakan worker ini ke queue (shutdown)"""
+    db = SessionLocal()
+    try:
+        db.query(AnalysisJob)\
+            .filter(AnalysisJob.status == "running", AnalysisJob.id.in_(job_ids))\
+            .update(
+                {AnalysisJob.status: "queued", AnalysisJob.attempts: AnalysisJob.attempts - 1, AnalysisJob.available_at: time.time()},
+                synchronize_session=False,
+            )
+        db.commit()
+    finally:
+        db.close()
+
+
+def recover_stale_jobs():
+    """
+    Job running dengan heartbeat kedaluwarsa: queue ulang, atau dead letter jika
+    percobaan sudah habis (job yang terus membuat worker crash tidak diulang terus)
+    """
+    cutoff = time.time() - settings.ANALYSIS_JOB_STALE_SECONDS
+    db = SessionLocal()
+    try:
+        stale = db.query(AnalysisJob).filter(AnalysisJob.status == "running", AnalysisJob.locked_at < cutoff)
+        dead = stale.filter(AnalysisJob.attempts >= AnalysisJob.max_attempts).update(
+            {AnalysisJob.status: "dead", AnalysisJob.last_error: "Worker lost while processing job"},
+            synchronize_session=False,
+        )
+        requeued = stale.filter(AnalysisJob.attempts < AnalysisJob.max_attempts).update(
+            {AnalysisJob.status: "queued", AnalysisJob.available_at: time.time()},
+            synchronize_session=False,
+        )
+        db.commit()
+        return requeued, dead
+    finally:
+        db.close()
+
+
+def start_workers(num_workers=None):
+    global _wakeup
+    num_workers = settings.ANALYSIS_JOB_WORKERS if num_workers is None else num_workers
+    if _workers or num_workers <= 0:
+        return
+    requeued, dead = recover_stale_jobs()
+    if requeued or dead:
+        print(f"♻️  Recovered stale analysis jobs: {requeued} requeued, {dead} dead")
+    _wakeup = asyncio.Event()
+    for worker_id in range(num_workers):
+        _workers.append(asyncio.create_task(_worker_loop(worker_id), name=f"analysis-job-worker-{worker_id}"))
+    print(f"🧵 Started {num_workers} analysis job workers")
+
+
+async def stop_workers():
+    global _wakeup
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _wakeup = None
@@ -0,0 +1,209 @@
+"""
+Konteks journal untuk prompt analisis dengan ukuran terbatas.
+
+Hanya JOURNAL_CONTEXT_CANDIDATES journal terbaru yang dimuat dan dinilai
+(TF-IDF lokal terhadap profil kulit user + recency). Journal yang lebih
+lama dilipat secara incremental ke tabel journal_summaries (jumlah entry,
+rentang tanggal, topik yang sering muncul), jadi biaya query dan ukuran
+prompt tetap terbatas berapa pun banyaknya history user.
+
+Token diestimasi kasar sebagai jumlah karakter / 4.
+"""
+import math
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.models.journal_summaries import JournalSummary
+from app.models.journals import Journals
+from app.models.skin import Skin
+
+SUMMARY_MAX_TERMS = 200  # term_counts (term -> jumlah entry) yang disimpan per user
+SUMMARY_TOP_TERMS = 12  # term yang ditampilkan di teks ringkasan
+MIN_ENTRY_TOKENS = 24  # sisa budget di bawah ini tidak dipakai untuk entry terpotong
+
+_TOKEN_PATTERN = re.compile(r"[^\W\d_]{3,}", re.UNICODE)
+STOPWORDS = {
+    # English
+    "the", "and", "for", "with", "this", "that", "was", "were", "are", "have", "has", "had", "but", "not",
+    "you", "your", "from", "they", "them", "then", "than", "there", "their", "been", "into", "after",
+    "before", "again", "today", "yesterday", "very", "just", "also", "some", "more", "much", "what",
+    "when", "which", "will", "would", "could", "should", "about", "still", "feel", "felt", "like", "skin",
+    # Indonesia
+    "yang", "dan", "ini", "itu", "dengan", "untuk", "dari", "pada", "tidak", "sudah", "saya", "aku",
+    "juga", "lagi", "karena", "jadi", "akan", "masih", "bisa", "ada", "hari", "setelah", "sebelum",
+    "tapi", "agak", "sangat", "lebih", "kulit",
+}
+
+
+def estimate_tokens(text) -> int:
+    return math.ceil(len(text or "") / 4)
+
+
+def truncate_to_tokens(text, max_tokens) -> str:
+    text = (text or "").strip()
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars - 3].rsplit(" ", 1)[0]
+    return cut + "..."
+
+
+def tokenize(text) -> List[str]:
+    return [token for token in _TOKEN_PATTERN.findall((text or "").lower()) if token not in STOPWORDS]
+
+
+def _tfidf_vectors(documents: List[List[str]]):
+    """Vektor TF-IDF (dict term -> bobot, dinormalisasi L2) untuk setiap dokumen"""
+    doc_freq = Counter()
+    for tokens in documents:
+        doc_freq.update(set(tokens))
+    total = len(documents)
+    idf = {term: math.log((1 + total) / (1 + freq)) + 1 for term, freq in doc_freq.items()}
+
+    vectors = []
+    for tokens in documents:
+        counts = Counter(tokens)
+        vector = {term: (1 + math.log(count)) * idf[term] for term, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        vectors.append({term: weight / norm for term, weight in vector.items()})
+    return vectors, idf
+
+
+def score_journals(journals: List[Dict], query, now=None) -> List[float]:
+    """
+    Skor gabungan relevansi (cosine TF-IDF terhadap query) dan recency
+    (peluruhan eksponensial dengan half-life JOURNAL_CONTEXT_RECENCY_HALF_LIFE_DAYS)
+    """
+    now = now or datetime.utcnow()
+    documents = [tokenize(f"{journal['title']} {journal['content']}") for journal in journals]
+    vectors, idf = _tfidf_vectors(documents)
+
+    query_counts = Counter(term for term in tokenize(query) if term in idf)
+    query_vector = {term: (1 + math.log(count)) * idf[term] for term, count in query_counts.items()}
+    query_norm = math.sqrt(sum(weight * weight for weight in query_vector.values()))
+
+    weight = settings.JOURNAL_CONTEXT_RELEVANCE_WEIGHT if query_norm else 0.0
+    half_life = settings.JOURNAL_CONTEXT_RECENCY_HALF_LIFE_DAYS
+    scores = []
+    for journal, vector in zip(journals, vectors):
+        relevance = 0.0
+        if query_norm:
+            relevance = sum(vector.get(term, 0.0) * value for term, value in query_vector.items()) / query_norm
+        created_at = journal.get("created_at") or now
+        age_days = max((now - created_at).total_seconds() / 86400, 0.0)
+        recency = 0.5 ** (age_days / half_life)
+        scores.append(weight * relevance + (1 - weight) * recency)
+    return scores
+
+
+def _summary_text(summary: JournalSummary) -> str:
+    first = summary.first_entry_at.strftime("%Y-%m-%d") if summary.first_entry_at else "?"
+    last = summary.last_entry_at.strftime("%Y-%m-%d") if summary.last_entry_at else "?"
+    top_terms = Counter(summary.term_counts or {}).most_common(SUMMARY_TOP_TERMS)
+    topics = ", ".join(f"{term} ({count})" for term, count in top_terms)
+    return f"{summary.entry_count} older entries from {first} to {last}. Frequent topics (entries mentioning them): {topics or '-'}"
+
+
+def update_summary(db, user_id, before_id) -> Optional[JournalSummary]:
+    """
+    Lipat journal lama (id < before_id) yang belum tercakup ke ringkasan user.
+    Hanya entry baru sejak update terakhir yang dibaca (incremental).
+    """
+    summary = db.query(JournalSummary).filter(JournalSummary.user_id == user_id).first()
+    covered_until_id = summary.covered_until_id if summary else 0
+
+    rows = db.query(Journals.id, Journals.title, Journals.content, Journals.created_at)\
+        .filter(Journals.user_id == user_id, Journals.id > covered_until_id, Journals.id < before_id)\
+        .order_by(Journals.id)\
+        .yield_per(200)
+
+    term_counts = Counter(summary.term_counts or {}) if summary else Counter()
+    folded = 0
+    for row in rows:
+        if summary is None:
+            summary = JournalSummary(user_id=user_id, entry_count=0, covered_until_id=0)
+            db.add(summary)
+        # Hitung jumlah entry yang menyebut term, bukan frekuensi kata
+        term_counts.update(set(tokenize(f"{row.title} {row.content}")))
+        summary.entry_count += 1
+        summary.covered_until_id = row.id
+        if row.created_at is not None:
+            summary.first_entry_at = min(filter(None, [summary.first_entry_at, row.created_at]))
+            summary.last_entry_at = max(filter(None, [summary.last_entry_at, row.created_at]))
+        folded += 1
+
+    if folded:
+        summary.term_counts = dict(term_counts.most_common(SUMMARY_MAX_TERMS))
+        summary.summary = _summary_text(summary)
+        db.commit()
+    return summary
+
+
+def invalidate_summary(db, user_id, journal_id):
+    """
+    Journal yang sudah dilipat diubah/dihapus: buang ringkasan, dibangun ulang
+    saat analisis berikutnya
+    """
+    deleted = db.query(JournalSummary)\
+        .filter(JournalSummary.user_id == user_id, JournalSummary.covered_until_id >= journal_id)\
+        .delete(synchronize_session=False)
+    if deleted:
+        db.commit()
+
+
+def _default_query(db, user_id) -> str:
+    # Profil kulit dari analisis terakhir sebagai query relevansi
+    skin = db.query(Skin).filter(Skin.user_id == user_id).first()
+    return f"{skin.skin_type} {skin.concerns}" if skin else ""
+
+
+def build_journal_context(db, user_id, query=None, max_tokens=None, now=None) -> List[Dict]:
+    """
+    Journal untuk prompt agent, muat dalam max_tokens (default
+    JOURNAL_CONTEXT_MAX_TOKENS): ringkasan journal lama (kind="summary")
+    lalu entry paling relevan/baru, terbaru dulu, dengan isi dipotong.
+    """
+    max_tokens = settings.JOURNAL_CONTEXT_MAX_TOKENS if max_tokens is None else max_tokens
+    if max_tokens <= 0:
+        return []
+
+    candidates = db.query(Journals.id, Journals.title, Journals.content, Journals.created_at, Journals.updated_at)\
+        .filter(Journals.user_id == user_id)\
+        .order_by(Journals.created_at.desc(), Journals.id.desc())\
+        .limit(settings.JOURNAL_CONTEXT_CANDIDATES)\
+        .all()
+    if not candidates:
+        return []
+    journals = [row._asdict() for row in candidates]
+
+    context = []
+    remaining = max_tokens
+    summary = update_summary(db, user_id, before_id=min(journal["id"] for journal in journals))
+    if summary is not None and summary.summary:
+        summary_text = truncate_to_tokens(summary.summary, max_tokens // 4)
+        context.append({
+            "kind": "summary",
+            "title": "Summary of older entries",
+            "content": summary_text,
+            "created_at": summary.last_entry_at,
+            "updated_at": summary.updated_at,
+        })
+        remaining -= estimate_tokens(summary_text)
+
+    query = _default_query(db, user_id) if query is None else query
+    scores = score_journals(journals, query, now=now)
+    selected = []
+    for _, journal in sorted(zip(scores, journals), key=lambda pair: pair[0], reverse=True):
+        # Overhead format per baris (tanggal, judul) ~ 8 token
+        budget = min(settings.JOURNAL_CONTEXT_ENTRY_MAX_TOKENS, remaining - estimate_tokens(journal["title"]) - 8)
+        if budget < MIN_ENTRY_TOKENS:
+            break
+        content = truncate_to_tokens(journal["content"], budget)
+        remaining -= estimate_tokens(journal["title"]) + estimate_tokens(content) + 8
+        selected.append({**journal, "content": content})
+
+    selected.sort(key=lambda journal: (journal["created_at"] or datetime.min, journal["id"]), reverse=True)
+    return context + selected
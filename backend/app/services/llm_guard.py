@@ -0,0 +1,161 @@
+"""
+Guard untuk tahap LLM (Gemini): timeout per panggilan dan circuit breaker.
+
+Batas in-flight memakai slot tahap "agent" di analysis_pipeline
+(ANALYSIS_MAX_CONCURRENT_AGENT) dengan antrean terbatas (LLM_MAX_WAITING,
+LLM_QUEUE_TIMEOUT_SECONDS). Setelah LLM_CIRCUIT_FAILURE_THRESHOLD kegagalan
+berturut-turut (error atau timeout) circuit terbuka: panggilan langsung
+ditolak dengan LLMUnavailable selama LLM_CIRCUIT_RESET_SECONDS, lalu satu
+panggilan percobaan (half-open) menentukan circuit ditutup atau dibuka lagi.
+Pemanggil memakai LLMUnavailable untuk beralih ke analisis provisional
+(services/provisional_analysis.py).
+"""
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class LLMUnavailable(Exception):
+    """LLM tidak dipanggil: circuit terbuka atau antrean agent penuh"""
+
+    def __init__(self, reason, retry_at=None):
+        super().__init__(f"LLM unavailable ({reason})")
+        self.reason = reason
+        self.retry_at = retry_at
+
+
+class LLMTimeout(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=None, reset_seconds=None, clock=time.monotonic):
+        self.failure_threshold = failure_threshold or settings.LLM_CIRCUIT_FAILURE_THRESHOLD
+        self.reset_seconds = settings.LLM_CIRCUIT_RESET_SECONDS if reset_seconds is None else reset_seconds
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.totals = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True jika panggilan boleh jalan; di half-open hanya satu probe sekaligus"""
+        with self._lock:
+            if self.state == OPEN and self.clock() - self.opened_at >= self.reset_seconds:
+                self.state = HALF_OPEN
+            if self.state == CLOSED or (self.state == HALF_OPEN and not self.probing):
+                self.probing = self.state == HALF_OPEN
+                self.totals["calls"] += 1
+                return True
+            self.totals["rejected"] += 1
+            return False
+
+    def record_rejected(self):
+        """Panggilan ditolak sebelum allow() (check_available)"""
+        with self._lock:
+            self.totals["rejected"] += 1
+
+    def release(self):
+        """Panggilan yang diizinkan batal tanpa hasil (cancel / antrean penuh)"""
+        with self._lock:
+            self.probing = False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                print("🟢 LLM circuit closed")
+            self.state = CLOSED
+            self.failures = 0
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.totals["failures"] += 1
+            self.probing = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.totals["opened"] += 1
+                    print(f"🔴 LLM circuit opened after {self.failures} consecutive failures")
+                self.state = OPEN
+                self.opened_at = self.clock()
+
+    def retry_in(self) -> float:
+        """Detik sampai circuit boleh dicoba lagi (0 jika tertutup)"""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_seconds - (self.clock() - self.opened_at))
+
+    def snapshot(self) -> Dict:
+        retry_in = self.retry_in()
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "retry_in": round(retry_in, 1),
+                **self.totals,
+            }
+
+
+_breaker: Optional[CircuitBreaker] = None
+_breaker_lock = threading.Lock()
+
+
+def get_breaker() -> CircuitBreaker:
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker()
+    return _breaker
+
+
+def retry_at() -> float:
+    """Unix timestamp kapan LLM boleh dicoba lagi (untuk menjadwalkan job upgrade)"""
+    return time.time() + get_breaker().retry_in()
+
+
+def check_available():
+    """Tolak lebih awal (sebelum antre slot agent) jika circuit masih terbuka"""
+    breaker = get_breaker()
+    if settings.LLM_GUARD_ENABLED and breaker.retry_in() > 0:
+        breaker.record_rejected()
+        raise LLMUnavailable("circuit_open", retry_at=retry_at())
+
+
+async def guarded_call(fn, *args, timeout=None, **kwargs):
+    """
+    Jalankan coroutine LLM dengan circuit breaker + timeout.
+    Raise LLMUnavailable jika circuit terbuka, LLMTimeout jika melewati batas waktu.
+    """
+    if not settings.LLM_GUARD_ENABLED:
+        return await fn(*args, **kwargs)
+
+    breaker = get_breaker()
+    if not breaker.allow():
+        raise LLMUnavailable("circuit_open", retry_at=retry_at())
+
+    timeout = settings.LLM_CALL_TIMEOUT_SECONDS if timeout is None else timeout
+    try:
+        result = await asyncio.wait_for(fn(*args, **kwargs), timeout=timeout or None)
+    except asyncio.TimeoutError:
+        breaker.record_failure()
+        raise LLMTimeout(f"LLM call exceeded {timeout:.0f}s")
+    except asyncio.CancelledError:
+        breaker.release()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    return result
@@ -1,5 +1,11 @@
+import io
 import json 
 import os 
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from PIL import Image
 import matplotlib.pyplot as plt 
 import matplotlib.patches as patches
@@ -8,10 +14,146 @@ from typing import Dict, Optional
 from pathlib import Path
 import numpy as np
 import onnxruntime as ort
+from app.core.config import settings
+from app.services.prediction_cache import PredictionCache
+from app.services.renderer import render_prediction, render_warning
+
+# Buffer input yang dipakai ulang per thread (lihat ProductionONNXEnsembleModel.input_buffer)
+_thread_buffers = threading.local()
 
 BASE_DIR = Path(__file__).resolve().parent
 SAVED_MODELS_DIR = os.path.join(BASE_DIR, 'saved_models', 'skin_detection_ensemble.onnx')
 METADATA_JSON = os.path.join(BASE_DIR, 'saved_models', 'metadata.json')
+OPTIMIZED_MODELS_DIR = os.path.join(BASE_DIR, 'saved_models', 'optimized')
+
+# Varian presisi model (build dengan: python -m app.services.model_variants build)
+MODEL_VARIANTS = {
+    "fp32": "skin_detection_ensemble.onnx",
+    "int8": "skin_detection_ensemble.int8.onnx",
+    "fp16": "skin_detection_ensemble.fp16.onnx",
+}
+
+
+def model_variant_path(variant=None) -> str:
+    """
+    Path file ONNX untuk varian model (default: Settings.MODEL_VARIANT)
+    """
+    variant = variant or settings.MODEL_VARIANT
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Unknown model variant '{variant}'. Available: {list(MODEL_VARIANTS)}")
+    return os.path.join(BASE_DIR, 'saved_models', MODEL_VARIANTS[variant])
+
+# Preset SessionOptions; setiap nilai bisa dioverride lewat Settings.ONNX_*
+SESSION_PROFILES = {
+    # Satu request secepat mungkin: semua core untuk satu session.run
+    "latency": {
+        "intra_op_threads": 0,
+        "inter_op_threads": 1,
+        "execution_mode": "sequential",
+        "graph_optimization_level": "all",
+        "enable_mem_arena": True,
+        "enable_mem_pattern": True,
+    },
+    # Banyak worker uvicorn per node: sedikit thread per session agar tidak oversubscribe
+    "throughput": {
+        "intra_op_threads": 2,
+        "inter_op_threads": 1,
+        "execution_mode": "sequential",
+        "graph_optimization_level": "all",
+        "enable_mem_arena": True,
+        "enable_mem_pattern": True,
+    },
+    # Node kecil: tanpa arena agar memori dikembalikan setelah run
+    "low_memory": {
+        "intra_op_threads": 1,
+        "inter_op_threads": 1,
+        "execution_mode": "sequential",
+        "graph_optimization_level": "extended",
+        "enable_mem_arena": False,
+        "enable_mem_pattern": False,
+    },
+}
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disabled": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+
+
+def resolve_session_profile(profile_name=None) -> Dict:
+    """
+    Gabungkan preset profile dengan override dari Settings.
+
+    Dict yang sudah di-resolve (misalnya dari benchmark) dikembalikan apa adanya.
+    """
+    if isinstance(profile_name, dict):
+        return dict(profile_name)
+    profile_name = profile_name or settings.ONNX_SESSION_PROFILE
+    if profile_name not in SESSION_PROFILES:
+        raise ValueError(f"Unknown ONNX session profile '{profile_name}'. Available: {list(SESSION_PROFILES)}")
+
+    profile = dict(SESSION_PROFILES[profile_name], name=profile_name)
+    overrides = {
+        "intra_op_threads": settings.ONNX_INTRA_OP_THREADS,
+        "inter_op_threads": settings.ONNX_INTER_OP_THREADS,
+        "execution_mode": settings.ONNX_EXECUTION_MODE,
+        "graph_optimization_level": settings.ONNX_GRAPH_OPTIMIZATION_LEVEL,
+        "enable_mem_arena": settings.ONNX_ENABLE_MEM_ARENA,
+        "enable_mem_pattern": settings.ONNX_ENABLE_MEM_PATTERN,
+    }
+    profile.update({key: value for key, value in overrides.items() if value is not None})
+    return profile
+
+
+def build_session_options(profile: Dict) -> ort.SessionOptions:
+    """
+    Buat ort.SessionOptions dari profile hasil resolve_session_profile()
+    """
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = profile["intra_op_threads"]
+    options.inter_op_num_threads = profile["inter_op_threads"]
+    options.execution_mode = EXECUTION_MODES[profile["execution_mode"]]
+    options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[profile["graph_optimization_level"]]
+    options.enable_cpu_mem_arena = profile["enable_mem_arena"]
+    options.enable_mem_pattern = profile["enable_mem_pattern"]
+    return options
+
+
+def model_fingerprint(onnx_model_path) -> str:
+    """
+    Sidik jari murah untuk file model (ukuran + mtime)
+    """
+    stat = os.stat(onnx_model_path)
+    return f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+
+def model_version(onnx_model_path, metadata: Optional[Dict]) -> str:
+    """
+    Versi model dari metadata.json, digabung dengan sidik jari file model
+    """
+    metadata = metadata or {}
+    version = metadata.get('version') or metadata.get('created_at') or 'unversioned'
+    return f"{version}+{model_fingerprint(onnx_model_path)}"
+
+
+def optimized_model_path(onnx_model_path, profile: Dict) -> str:
+    """
+    Lokasi graph teroptimasi, terikat ke versi file model dan level optimasi
+    """
+    stem = Path(onnx_model_path).stem
+    fingerprint = model_fingerprint(onnx_model_path)
+    optimized_dir = settings.ONNX_OPTIMIZED_MODEL_DIR or OPTIMIZED_MODELS_DIR
+    return os.path.join(
+        optimized_dir,
+        f"{stem}.{profile['graph_optimization_level']}.{fingerprint}.ort.onnx"
+    )
 
 
 class DummyModel:
@@ -29,12 +171,13 @@ class ProductionONNXEnsembleModel:
     Production-ready wrapper untuk ONNX ensemble model
     """
 
-    def __init__(self, onnx_model_path, metadata_path=None):
+    def __init__(self, onnx_model_path, metadata_path=None, session_profile=None, warmup_batch_sizes=None):
         self.onnx_model_path = onnx_model_path
+        self.session_profile = resolve_session_profile(session_profile)
 
         # Load ONNX model
-        print(f"📂 Loading ONNX model from: {onnx_model_path}")
-        self.session = ort.InferenceSession(onnx_model_path)
+        print(f"📂 Loading ONNX model from: {onnx_model_path} (profile: {self.session_profile['name']})")
+        self.session = self._create_session()
 
         # Get input/output info
         self.input_name = self.session.get_inputs()[0].name
@@ -52,120 +195,625 @@ class ProductionONNXEnsembleModel:
             self.classes = self.metadata['classes']
         else:
             # Default classes jika metadata tidak ada
+            self.metadata = None
             self.classes = [
                 'Acne', 'Blackheads', 'Dark-Spots', 'Dry-Skin', 'Englarged-Pores', 'Eyebags', 'Oily-Skin', 'Skin-Redness', 'Whiteheads', 'Wrinkles'
             ]
+        self.model_version = model_version(onnx_model_path, self.metadata)
 
         print("✅ ONNX Model loaded successfully!")
         print(f"📊 Classes: {len(self.classes)}")
 
-    def preprocess_image(self, image_path):
+        if warmup_batch_sizes is None:
+            warmup_batch_sizes = settings.ONNX_WARMUP_BATCH_SIZES
+        if warmup_batch_sizes:
+            self.warmup(warmup_batch_sizes)
+
+    def _create_session(self):
+        """
+        Buat InferenceSession, pakai ulang graph teroptimasi dari boot sebelumnya jika ada
+        """
+        options = build_session_options(self.session_profile)
+        if not settings.ONNX_PERSIST_OPTIMIZED_MODEL or self.session_profile["graph_optimization_level"] == "disabled":
+            return ort.InferenceSession(self.onnx_model_path, sess_options=options)
+
+        optimized_path = optimized_model_path(self.onnx_model_path, self.session_profile)
+        if os.path.exists(optimized_path):
+            try:
+                # Graph sudah dioptimasi, jangan optimasi ulang
+                options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+                session = ort.InferenceSession(optimized_path, sess_options=options)
+                print(f"⚡ Using optimized graph: {optimized_path}")
+                return session
+            except Exception as e:
+                print(f"Warning: failed to load optimized graph {optimized_path}: {str(e)}. Rebuilding...")
+                options = build_session_options(self.session_profile)
+
+        # Simpan ke file sementara lalu rename agar worker lain tidak membaca file setengah jadi
+        tmp_path = f"{optimized_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(optimized_path), exist_ok=True)
+            options.optimized_model_filepath = tmp_path
+            session = ort.InferenceSession(self.onnx_model_path, sess_options=options)
+            os.replace(tmp_path, optimized_path)
+            print(f"💾 Saved optimized graph: {optimized_path}")
+            return session
+        except Exception as e:
+            print(f"Warning: could not persist optimized graph: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return ort.InferenceSession(self.onnx_model_path, sess_options=build_session_options(self.session_profile))
+
+    def warmup(self, batch_sizes):
+        """
+        Jalankan batch dummy agar alokasi memori terjadi sebelum request pertama
         """
-        Preprocess image untuk ONNX prediction
+        target_width, target_height = self.target_size()
+        model_limit = self.max_batch_size()
+        for batch_size in sorted(set(batch_sizes)):
+            if model_limit is not None and batch_size > model_limit:
+                continue
+            dummy = np.zeros((batch_size, target_height, target_width, 3), dtype=np.float32)
+            start = time.perf_counter()
+            self.run_batch(dummy)
+            print(f"🔥 Warmup batch={batch_size}: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def target_size(self):
+        """
+        Ukuran input model sebagai (width, height)
         """
         # Ambil input shape dari model (biasanya [batch, height, width, channels])
-        target_height = self.input_shape[1] if self.input_shape[1] != -1 else 224
-        target_width = self.input_shape[2] if self.input_shape[2] != -1 else 224
+        target_height = self.input_shape[1] if isinstance(self.input_shape[1], int) and self.input_shape[1] > 0 else 224
+        target_width = self.input_shape[2] if isinstance(self.input_shape[2], int) and self.input_shape[2] > 0 else 224
+        return target_width, target_height
+
+    def load_image(self, source):
+        """
+        Decode dan resize image ke ukuran input model (uint8 [H, W, 3]).
 
+        source boleh berupa path, bytes/bytearray/memoryview, atau file-like.
+        """
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        target_size = self.target_size()
+
+        img = Image.open(source)
+        if settings.PREPROCESS_JPEG_DRAFT and img.format == 'JPEG':
+            # Decoder JPEG langsung men-downscale (1/2, 1/4, 1/8) ke ukuran >= target,
+            # jadi foto 12MP tidak pernah di-decode pada resolusi penuh
+            img.draft('RGB', target_size)
+        img = img.convert('RGB')
+        # reducing_gap: reduce() cepat dulu, baru resampling halus ke ukuran akhir
+        img = img.resize(target_size, reducing_gap=settings.PREPROCESS_REDUCING_GAP or None)
+        return np.asarray(img, dtype=np.uint8)
+
+    def preprocess_image(self, source, out=None):
+        """
+        Preprocess image untuk ONNX prediction.
+
+        Hasil normalisasi ditulis langsung ke `out` ([1, H, W, 3] float32) jika diberikan.
+        """
         # Load dan resize image
-        img = Image.open(image_path).convert('RGB')
-        img = img.resize((target_width, target_height))
+        img = self.load_image(source)
 
-        # Convert ke numpy array dan normalize
-        img_array = np.array(img, dtype=np.float32) / 255.0
+        if out is None:
+            out = np.empty((1,) + img.shape, dtype=np.float32)
 
-        # Add batch dimension
-        img_array = np.expand_dims(img_array, axis=0)
+        # Normalize langsung ke buffer tujuan (tanpa array sementara / expand_dims)
+        np.multiply(img, 1.0 / 255.0, out=out.reshape(img.shape), dtype=np.float32)
 
-        return img_array
+        return out
 
-    def predict(self, image_path):
+    def input_buffer(self):
         """
-        Predict skin problem dari image path menggunakan ONNX
+        Buffer input [1, H, W, 3] per thread yang dipakai ulang antar request
         """
-        # Preprocess
-        img_array = self.preprocess_image(image_path)
+        target_width, target_height = self.target_size()
+        shape = (1, target_height, target_width, 3)
+        buffer = getattr(_thread_buffers, 'input', None)
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=np.float32)
+            _thread_buffers.input = buffer
+        return buffer
+
+    def run_batch(self, img_batch):
+        """
+        Jalankan satu session.run untuk batch [N, H, W, 3]
+        """
+        return self.session.run(self.output_names, {self.input_name: img_batch})
 
-        # Run inference
-        outputs = self.session.run(self.output_names, {self.input_name: img_array})
+    def max_batch_size(self):
+        """
+        Batas batch dari model (None jika dimensi batch dinamis)
+        """
+        batch_dim = self.input_shape[0]
+        if isinstance(batch_dim, int) and batch_dim > 0:
+            return batch_dim
+        return None
 
+    def postprocess_batch(self, outputs, top_k=5):
+        """
+        Parse output ONNX untuk seluruh batch sekaligus (vectorized)
+        """
         # Parse outputs berdasarkan nama output dari model Anda
         # Sesuaikan dengan output names yang sebenarnya
         if len(outputs) >= 3:
-            confidence = outputs[0][0] if len(outputs[0].shape) > 0 else outputs[0]
-            predicted_class_idx = int(outputs[1][0]) if len(outputs[1].shape) > 0 else int(outputs[1])
-            predictions = outputs[2][0] if len(outputs[2].shape) > 1 else outputs[2]
+            predictions = np.asarray(outputs[2], dtype=np.float32)
+            predictions = predictions.reshape(-1, predictions.shape[-1])
+            confidences = np.asarray(outputs[0], dtype=np.float32).reshape(-1)
+            predicted_idx = np.asarray(outputs[1]).reshape(-1).astype(np.int64)
         else:
             # Fallback jika struktur output berbeda
-            predictions = outputs[0][0]
-            predicted_class_idx = np.argmax(predictions)
-            confidence = float(predictions[predicted_class_idx])
-
-        # Ensure predicted_class_idx is within the bounds of self.classes
-        if predicted_class_idx < 0 or predicted_class_idx >= len(self.classes):
-            predicted_class = "Unknown"
-            print(f"Warning: Predicted class index {predicted_class_idx} out of range. Using 'Unknown'.")
-        else:
-            # Get class name
-            predicted_class = self.classes[predicted_class_idx]
-
-        # Top 5 predictions
-        # Ensure indices are within the bounds of self.classes
-        top_5_idx = np.argsort(predictions)[-5:][::-1]
-        top_5_predictions = []
-        for idx in top_5_idx:
-            if idx >= 0 and idx < len(self.classes):
-                top_5_predictions.append((self.classes[idx], float(predictions[idx])))
+            predictions = np.asarray(outputs[0], dtype=np.float32)
+            predictions = predictions.reshape(-1, predictions.shape[-1])
+            predicted_idx = np.argmax(predictions, axis=1)
+            confidences = predictions[np.arange(len(predictions)), predicted_idx]
+
+        # Top-k untuk seluruh batch: argpartition lalu urutkan k kandidat saja
+        k = min(top_k, predictions.shape[1])
+        top_idx = np.argpartition(-predictions, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(predictions, top_idx, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top_idx = np.take_along_axis(top_idx, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        num_classes = len(self.classes)
+        results = []
+        for row in range(len(predictions)):
+            predicted_class_idx = int(predicted_idx[row])
+
+            # Ensure predicted_class_idx is within the bounds of self.classes
+            if predicted_class_idx < 0 or predicted_class_idx >= num_classes:
+                predicted_class = "Unknown"
+                print(f"Warning: Predicted class index {predicted_class_idx} out of range. Using 'Unknown'.")
             else:
-                print(f"Warning: Top 5 prediction index {idx} out of range. Skipping.")
+                # Get class name
+                predicted_class = self.classes[predicted_class_idx]
 
+            # Ensure indices are within the bounds of self.classes
+            top_5_predictions = []
+            for idx, score in zip(top_idx[row].tolist(), top_scores[row].tolist()):
+                if 0 <= idx < num_classes:
+                    top_5_predictions.append((self.classes[idx], score))
+                else:
+                    print(f"Warning: Top 5 prediction index {idx} out of range. Skipping.")
 
-        return {
-            'predicted_class': predicted_class,
-            'confidence': float(confidence),
-            'top_5_predictions': top_5_predictions,
-            'all_predictions': predictions.tolist()
-        }
+            results.append({
+                'predicted_class': predicted_class,
+                'confidence': float(confidences[row]),
+                'top_5_predictions': top_5_predictions,
+                'all_predictions': predictions[row].tolist()
+            })
+        return results
 
-    def batch_predict(self, image_paths):
+    def predict(self, image_path):
+        """
+        Predict skin problem dari image path (atau bytes) menggunakan ONNX
+        """
+        # Preprocess
+        img_array = self.preprocess_image(image_path, out=self.input_buffer())
+
+        # Run inference
+        outputs = self.run_batch(img_array)
+
+        return self.postprocess_batch(outputs)[0]
+
+    def batch_predict(self, image_paths, max_workers=None):
         """
-        Batch prediction untuk multiple images
+        Batch prediction untuk multiple images.
+
+        Decode dan resize berjalan paralel di thread pool (Pillow melepas GIL),
+        hasilnya ditulis langsung ke satu tensor [N, H, W, 3] float32, lalu
+        dijalankan dengan satu session.run per chunk.
         """
+        image_paths = list(image_paths)
+        if not image_paths:
+            return []
+
+        target_width, target_height = self.target_size()
+        chunk_size = self.max_batch_size() or settings.BATCH_PREDICT_CHUNK_SIZE
+        max_workers = max_workers or settings.BATCH_PREDICT_DECODE_WORKERS or os.cpu_count()
+        batch = np.empty((min(chunk_size, len(image_paths)), target_height, target_width, 3), dtype=np.float32)
+
+        def fill(slot, image_path):
+            self.preprocess_image(image_path, out=batch[slot:slot + 1])
+
         results = []
-        for img_path in image_paths:
-            result = self.predict(img_path)
-            results.append({
-                'image_path': img_path,
-                'result': result
-            })
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for start in range(0, len(image_paths), chunk_size):
+                chunk = image_paths[start:start + chunk_size]
+                # list() agar exception decode muncul di sini
+                list(executor.map(fill, range(len(chunk)), chunk))
+
+                outputs = self.run_batch(batch[:len(chunk)])
+                for img_path, result in zip(chunk, self.postprocess_batch(outputs)):
+                    results.append({
+                        'image_path': img_path,
+                        'result': result
+                    })
         return results
 
 
+class MicroBatchScheduler:
+    """
+    Kumpulkan request prediksi yang datang bersamaan menjadi satu session.run.
+
+    Preprocessing tetap berjalan di thread pemanggil; hanya tensor hasil
+    preprocessing yang diantrikan. Thread batcher hanya menunggu request lain
+    selama masih ada pemanggil yang sedang preprocessing, sehingga saat trafik
+    sepi tidak ada tambahan latency.
+    """
+
+    def __init__(self, model, max_batch_size=8, max_wait_ms=5.0):
+        self.model = model
+        model_limit = model.max_batch_size()
+        self.max_batch_size = max(1, min(max_batch_size, model_limit or max_batch_size))
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._batch_buffer = None
+        self._queue = queue.Queue()
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, name="onnx-micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, image_path) -> Future:
+        """
+        Antrikan satu gambar (path atau bytes) dan kembalikan Future berisi hasil predict()
+        """
+        future = Future()
+        with self._pending_lock:
+            self._pending += 1
+        try:
+            img_array = self.model.preprocess_image(image_path)
+        except Exception as e:
+            with self._pending_lock:
+                self._pending -= 1
+            future.set_exception(e)
+            return future
+        self._queue.put((img_array, future))
+        return future
+
+    def predict(self, image_path):
+        return self.submit(image_path).result()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _collect(self, first):
+        batch = [first]
+        stop = False
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                # Ambil yang sudah ada di antrian tanpa menunggu
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                with self._pending_lock:
+                    waiting_for_more = self._pending > len(batch)
+                remaining = deadline - time.monotonic()
+                if not waiting_for_more or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if item is None:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _loop(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stop = self._collect(first)
+            with self._pending_lock:
+                self._pending -= len(batch)
+            self._run(batch)
+            if stop:
+                return
+
+    def _run(self, batch):
+        futures = [future for _, future in batch]
+        try:
+            first = batch[0][0]
+            if self._batch_buffer is None or self._batch_buffer.shape[1:] != first.shape[1:]:
+                self._batch_buffer = np.empty((self.max_batch_size,) + first.shape[1:], dtype=np.float32)
+            img_batch = np.concatenate(
+                [img_array for img_array, _ in batch], axis=0, out=self._batch_buffer[:len(batch)]
+            )
+            outputs = self.model.run_batch(img_batch)
+            for future, result in zip(futures, self.model.postprocess_batch(outputs)):
+                future.set_result(result)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+
+
+class ModelSlot:
+    """
+    Satu versi model yang sedang melayani request (model + micro-batcher).
+
+    Request memegang lease selama inference. Setelah slot diganti (hot reload),
+    slot lama ditutup ketika lease terakhir dilepas sehingga request yang
+    sedang berjalan tetap selesai di session lama.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.model_version = getattr(model, 'model_version', None)
+        self.batcher = None
+        if settings.INFERENCE_BATCHING_ENABLED:
+            self.batcher = MicroBatchScheduler(
+                model,
+                max_batch_size=settings.INFERENCE_MAX_BATCH_SIZE,
+                max_wait_ms=settings.INFERENCE_MAX_WAIT_MS,
+            )
+        self._leases = 0
+        self._retired = False
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            self._leases += 1
+
+    def release(self):
+        with self._lock:
+            self._leases -= 1
+            should_close = self._retired and self._leases == 0
+        if should_close:
+            self._close()
+
+    def retire(self):
+        with self._lock:
+            self._retired = True
+            should_close = self._leases == 0
+        if should_close:
+            self._close()
+
+    def predict(self, source):
+        if self.batcher is not None:
+            return self.batcher.predict(source)
+        return self.model.predict(source)
+
+    def _close(self):
+        if self.batcher is not None:
+            self.batcher.close()
+            self.batcher = None
+        client = getattr(self.model, 'client', None)
+        if client is not None:
+            client.close()
+        # Lepas referensi agar InferenceSession lama dibebaskan
+        self.model = None
+        print(f"♻️  Released model version {self.model_version}")
+
+
+def validate_smoke_set(model, smoke_set_dir=None) -> Dict:
+    """
+    Validasi model baru sebelum dipasang.
+
+    Tanpa smoke set, cukup satu batch dummy. Dengan smoke set, setiap gambar
+    harus menghasilkan skor yang valid; jika ada expected.json
+    ({"nama_file.jpg": "Acne", ...}) akurasinya harus >= MODEL_SMOKE_MIN_AGREEMENT.
+    """
+    smoke_set_dir = smoke_set_dir or settings.MODEL_SMOKE_SET_DIR
+    if not smoke_set_dir:
+        target_width, target_height = model.target_size()
+        outputs = model.run_batch(np.zeros((1, target_height, target_width, 3), dtype=np.float32))
+        result = model.postprocess_batch(outputs)[0]
+        if not np.all(np.isfinite(result['all_predictions'])):
+            raise ValueError("Model produced non-finite scores on dummy input")
+        return {"images": 0}
+
+    expected = {}
+    expected_path = os.path.join(smoke_set_dir, 'expected.json')
+    if os.path.exists(expected_path):
+        with open(expected_path, 'r') as f:
+            expected = json.load(f)
+
+    image_names = sorted(
+        name for name in os.listdir(smoke_set_dir)
+        if name.lower().endswith(('.jpg', '.jpeg', '.png', '.webp'))
+    )
+    if not image_names:
+        raise ValueError(f"Smoke set {smoke_set_dir} contains no images")
+
+    results = model.batch_predict([os.path.join(smoke_set_dir, name) for name in image_names])
+    matches = 0
+    for name, item in zip(image_names, results):
+        result = item['result']
+        scores = np.asarray(result['all_predictions'], dtype=np.float32)
+        if scores.shape != (len(model.classes),) or not np.all(np.isfinite(scores)):
+            raise ValueError(f"Invalid scores for smoke image {name}")
+        if expected.get(name) == result['predicted_class']:
+            matches += 1
+
+    report = {"images": len(image_names)}
+    if expected:
+        agreement = matches / len(expected)
+        report["agreement"] = agreement
+        if agreement < settings.MODEL_SMOKE_MIN_AGREEMENT:
+            raise ValueError(
+                f"Smoke set agreement {agreement:.2%} below {settings.MODEL_SMOKE_MIN_AGREEMENT:.2%}"
+            )
+    return report
+
+
 """
 Class Cache for ProductionEnsembleModel
 """
 class ModelCache:
     _instance = None
-    _model: Optional[ProductionONNXEnsembleModel] = None
+    _slot: Optional[ModelSlot] = None
+    _prediction_cache: Optional[PredictionCache] = None
+    _lock = threading.Lock()
+    _reload_lock = threading.Lock()
+    _watcher: Optional[threading.Thread] = None
+    reload_status: Dict = {"state": "idle"}
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(ModelCache, cls).__new__(cls)
         return cls._instance
 
+    def _current_slot(self) -> Optional[ModelSlot]:
+        if self._slot is None:
+            # Double-checked locking: request pertama yang bersamaan hanya memuat model sekali
+            with self._lock:
+                if self._slot is None:
+                    try:
+                        self._slot = ModelSlot(self._load_model())
+                    except Exception as e:
+                        print(f"Failed to load ONNX model: {str(e)}. Using DummyModel...")
+        return self._slot
+
     @property
     def model(self) -> ProductionONNXEnsembleModel:
-        if self._model is None:
+        slot = self._current_slot()
+        return slot.model if slot is not None else None
+
+    @property
+    def batcher(self) -> Optional[MicroBatchScheduler]:
+        slot = self._current_slot()
+        return slot.batcher if slot is not None else None
+
+    @property
+    def prediction_cache(self) -> Optional[PredictionCache]:
+        if self._prediction_cache is None and settings.PREDICTION_CACHE_ENABLED and self.model is not None:
+            with self._lock:
+                if self._prediction_cache is None:
+                    cache = PredictionCache(
+                        max_entries=settings.PREDICTION_CACHE_SIZE,
+                        db_path=settings.PREDICTION_CACHE_DB_PATH,
+                    )
+                    cache.set_model_version(self._slot.model_version)
+                    self._prediction_cache = cache
+        return self._prediction_cache
+
+    @contextmanager
+    def lease(self):
+        """
+        Pinjam slot model aktif; slot tidak ditutup selama lease masih dipegang
+        """
+        self._current_slot()
+        with self._lock:
+            slot = self._slot
+            if slot is not None:
+                slot.acquire()
+        try:
+            yield slot
+        finally:
+            if slot is not None:
+                slot.release()
+
+    def predict(self, image_path):
+        """Predict lewat prediction cache dan micro-batcher jika aktif"""
+        cache = self.prediction_cache
+        if cache is None:
+            with self.lease() as slot:
+                return slot.predict(image_path)
+
+        # Cache berbasis isi gambar, jadi path dibaca menjadi bytes dulu
+        if isinstance(image_path, (bytes, bytearray, memoryview)):
+            image_bytes = bytes(image_path)
+        else:
+            with open(image_path, 'rb') as f:
+                image_bytes = f.read()
+
+        result = cache.get(image_bytes)
+        if result is None:
+            with self.lease() as slot:
+                result = slot.predict(image_bytes)
+            # Jangan simpan hasil model lama jika swap terjadi saat inference
+            cache.put(image_bytes, result, model_version=slot.model_version)
+        return result
+
+    def _load_model(self, model_path=None) -> ProductionONNXEnsembleModel:
+        if settings.INFERENCE_POOL_ENABLED:
+            # Session dimiliki worker pool, proses ini hanya client
+            from app.services.inference_pool import InferencePoolClient, PooledModel
+            return PooledModel(InferencePoolClient())
+        return ProductionONNXEnsembleModel(model_path or model_variant_path(), METADATA_JSON)
+
+    def swap_model(self, new_model):
+        """
+        Pasang model baru secara atomik; slot lama ditutup setelah request terakhirnya selesai
+        """
+        new_slot = ModelSlot(new_model)
+        with self._lock:
+            old_slot, self._slot = self._slot, new_slot
+            if self._prediction_cache is not None:
+                # Hasil model lama tidak boleh dipakai lagi
+                self._prediction_cache.set_model_version(new_slot.model_version)
+                self._prediction_cache.clear()
+        if old_slot is not None:
+            old_slot.retire()
+        print(f"🔁 Model swapped to version {new_slot.model_version}")
+        return new_model
+
+    def reload_model(self, model_path=None, smoke_set_dir=None):
+        """Load, warmup dan validasi model baru, lalu swap (blocking)"""
+        with self._reload_lock:
+            self.reload_status = {"state": "loading", "started_at": time.time()}
             try:
-                self._model = ProductionONNXEnsembleModel(SAVED_MODELS_DIR, METADATA_JSON)
+                # Konstruktor sudah menjalankan warmup
+                new_model = self._load_model(model_path)
+                self.reload_status["state"] = "validating"
+                smoke_report = validate_smoke_set(new_model, smoke_set_dir)
+                self.swap_model(new_model)
             except Exception as e:
-                print(f"Failed to load ONNX model: {str(e)}. Using DummyModel...")
-        return self._model
-    
-    def reload_model(self):
-        """Force reload the model if needed"""
-        self._model = ProductionONNXEnsembleModel(SAVED_MODELS_DIR, METADATA_JSON)
-        return self._model
+                self.reload_status = {"state": "failed", "error": str(e), "finished_at": time.time()}
+                print(f"Model reload failed, keeping current model: {str(e)}")
+                raise
+            self.reload_status = {
+                "state": "ready",
+                "model_version": new_model.model_version,
+                "smoke_set": smoke_report,
+                "finished_at": time.time(),
+            }
+            return new_model
+
+    def hot_reload(self, model_path=None, smoke_set_dir=None) -> threading.Thread:
+        """Reload di background thread; request tetap dilayani model lama sampai swap"""
+        def run():
+            try:
+                self.reload_model(model_path, smoke_set_dir)
+            except Exception:
+                pass
+
+        thread = threading.Thread(target=run, name="model-hot-reload", daemon=True)
+        thread.start()
+        return thread
+
+    def start_watcher(self, poll_seconds=None):
+        """Pantau file model/metadata dan hot reload otomatis saat berubah"""
+        poll_seconds = poll_seconds or settings.MODEL_HOT_RELOAD_POLL_SECONDS
+        if not poll_seconds or self._watcher is not None:
+            return
+
+        def fingerprint():
+            parts = []
+            for path in (model_variant_path(), METADATA_JSON):
+                parts.append(model_fingerprint(path) if os.path.exists(path) else None)
+            return tuple(parts)
+
+        def watch():
+            last_seen = fingerprint()
+            while True:
+                time.sleep(poll_seconds)
+                current = fingerprint()
+                if current != last_seen and all(current):
+                    print("📦 Model files changed, starting hot reload...")
+                    last_seen = current
+                    self.hot_reload()
+
+        self._watcher = threading.Thread(target=watch, name="model-file-watcher", daemon=True)
+        self._watcher.start()
     
 
 @lru_cache
@@ -173,10 +821,16 @@ def get_model_cache() -> ModelCache:
     return ModelCache()
 
 
-def visualize_prediction(image_path, saved_path):
+def visualize_prediction(image_path, saved_path, image_bytes=None, renderer=None, prediction=None):
     """
-    Demo menggunakan ProductionEnsembleModel dengan visualisasi custom
+    Demo menggunakan ProductionEnsembleModel dengan visualisasi custom.
+
+    Jika image_bytes diberikan (isi upload yang sudah ada di memori),
+    file di image_path tidak dibaca ulang dari disk. renderer "pillow"
+    (default, cepat) atau "matplotlib" (export kualitas tinggi).
+    prediction: hasil predict() yang sudah ada, agar tidak diprediksi ulang.
     """
+    renderer = renderer or settings.VISUALIZATION_RENDERER
     try:
         # Load production model
         production_model = get_model_cache().model
@@ -185,11 +839,18 @@ def visualize_prediction(image_path, saved_path):
         is_dummy = isinstance(production_model, DummyModel)
         
         # Get prediction
-        result = production_model.predict(image_path)
+        source = image_bytes if image_bytes is not None else image_path
+        result = prediction if prediction is not None else get_model_cache().predict(source)
         
         # Load gambar
-        original_img = Image.open(image_path)
+        original_img = Image.open(io.BytesIO(image_bytes) if image_bytes is not None else image_path)
         original_width, original_height = original_img.size
+
+        if renderer == 'pillow':
+            if is_dummy:
+                return render_warning(original_img, saved_path, 'WARNING: Using Fallback Model',
+                                      'Model loading failed - using dummy predictions')
+            return render_prediction(original_img, result, saved_path)
         
         # Jika menggunakan dummy model, tambahkan peringatan
         if is_dummy:
@@ -291,6 +952,10 @@ def visualize_prediction(image_path, saved_path):
         try:
             # Simpan gambar asli sebagai fallback dengan pesan error
             original_img = Image.open(image_path)
+            if renderer == 'pillow':
+                render_warning(original_img, saved_path, 'ERROR: Visualization Failed', f"Error: {str(e)}")
+                print(f"Fallback: Saved error image to {saved_path}")
+                return saved_path
             plt.figure(figsize=(10, 8))
             plt.imshow(original_img)
             plt.title("ERROR: Visualization Failed", fontsize=16, color='red')
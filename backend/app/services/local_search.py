@@ -0,0 +1,152 @@
+"""
+Tool search lokal (offline) pengganti DuckDuckGo/Baidu/arXiv.
+
+Dipakai saat AGENT_SEARCH_BACKEND="local" (development tanpa internet,
+benchmark cache tool). Hasil deterministik dari korpus kecil di bawah,
+dengan latency buatan opsional agar efek cache bisa diukur.
+"""
+import json
+import re
+import time
+from typing import List
+
+from agno.tools import Toolkit
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+LOCAL_ARTICLES = [
+    {
+        "title": "Acne vulgaris: diagnosis and treatment",
+        "href": "https://local.ronaai/articles/acne-treatment",
+        "body": "Topical retinoids, benzoyl peroxide and salicylic acid are first line treatments for mild to moderate acne. Severe inflammatory acne may need oral antibiotics or isotretinoin.",
+    },
+    {
+        "title": "Treating acne scars",
+        "href": "https://local.ronaai/articles/acne-scars",
+        "body": "Chemical peels, microneedling and fractional laser improve atrophic acne scars. Daily sunscreen prevents post-inflammatory hyperpigmentation from darkening.",
+    },
+    {
+        "title": "Hyperpigmentation and dark spots",
+        "href": "https://local.ronaai/articles/hyperpigmentation",
+        "body": "Niacinamide, vitamin C, azelaic acid and tranexamic acid fade dark spots. Broad spectrum SPF 30+ is essential for melasma and hyperpigmentation.",
+    },
+    {
+        "title": "Dry skin and hydration",
+        "href": "https://local.ronaai/articles/dry-skin",
+        "body": "Ceramides, hyaluronic acid and glycerin restore the skin barrier. Avoid hot water and harsh cleansers on dry or dehydrated skin.",
+    },
+    {
+        "title": "Oily skin and enlarged pores",
+        "href": "https://local.ronaai/articles/oily-skin",
+        "body": "Gentle foaming cleansers, niacinamide and non-comedogenic moisturizers control sebum. Clay masks and BHA reduce visible pores.",
+    },
+    {
+        "title": "Wrinkles and anti-aging",
+        "href": "https://local.ronaai/articles/anti-aging",
+        "body": "Retinol, peptides and daily sun protection reduce fine lines and wrinkles. Professional options include botulinum toxin and fillers.",
+    },
+    {
+        "title": "Rosacea and redness",
+        "href": "https://local.ronaai/articles/rosacea",
+        "body": "Azelaic acid, metronidazole and ivermectin cream treat papulopustular rosacea. Identify triggers such as heat, spicy food and alcohol.",
+    },
+    {
+        "title": "Eczema (atopic dermatitis) skin care",
+        "href": "https://local.ronaai/articles/eczema",
+        "body": "Emollients, short lukewarm baths and topical corticosteroids control eczema flares. Fragrance free products reduce irritation.",
+    },
+]
+
+LOCAL_PAPERS = [
+    {
+        "title": "Efficacy of topical retinoids in inflammatory acne: a randomized trial",
+        "id": "local-0001",
+        "authors": ["A. Santoso", "L. Chen"],
+        "pdf_url": "https://local.ronaai/papers/local-0001.pdf",
+        "summary": "Adapalene 0.3% reduced inflammatory acne lesions by 58% over 12 weeks compared with vehicle.",
+    },
+    {
+        "title": "Tranexamic acid for melasma and hyperpigmentation: a meta-analysis",
+        "id": "local-0002",
+        "authors": ["R. Wijaya", "M. Rossi"],
+        "pdf_url": "https://local.ronaai/papers/local-0002.pdf",
+        "summary": "Oral and topical tranexamic acid significantly reduced melasma severity scores with few side effects.",
+    },
+    {
+        "title": "Microneedling versus fractional laser for atrophic acne scars",
+        "id": "local-0003",
+        "authors": ["K. Park", "S. Putri"],
+        "pdf_url": "https://local.ronaai/papers/local-0003.pdf",
+        "summary": "Both treatments improved acne scars; microneedling had shorter downtime and lower pigmentation risk.",
+    },
+    {
+        "title": "Ceramide moisturizers restore barrier function in dry skin",
+        "id": "local-0004",
+        "authors": ["J. Müller", "D. Lestari"],
+        "pdf_url": "https://local.ronaai/papers/local-0004.pdf",
+        "summary": "Ceramide-dominant emollients reduced transepidermal water loss and improved hydration in eczema and dry skin.",
+    },
+]
+
+
+def _tokens(text) -> set:
+    return set(_TOKEN_PATTERN.findall(str(text).lower()))
+
+
+def _rank(documents, query, fields, limit):
+    query_tokens = _tokens(query)
+    scored = []
+    for index, document in enumerate(documents):
+        score = len(query_tokens & _tokens(" ".join(str(document[field]) for field in fields)))
+        if score:
+            scored.append((-score, index, document))
+    return [document for _, _, document in sorted(scored)[:limit]]
+
+
+class LocalSearchTools(Toolkit):
+    def __init__(self, latency: float = 0.0, **kwargs):
+        self.latency = latency
+        super().__init__(name="local_search", tools=[self.local_search, self.local_papers], **kwargs)
+
+    def local_search(self, query: str, max_results: int = 5) -> str:
+        """Search local skin care articles for a query.
+
+        Args:
+            query (str): The query to search for.
+            max_results (int): The maximum number of results to return.
+
+        Returns:
+            str: JSON list of articles (title, href, body).
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        return json.dumps(_rank(LOCAL_ARTICLES, query, ("title", "body"), max_results), indent=2)
+
+    def local_papers(self, query: str, num_articles: int = 3) -> str:
+        """Search local dermatology research papers for a query.
+
+        Args:
+            query (str): The query to search for.
+            num_articles (int): The number of articles to return.
+
+        Returns:
+            str: JSON list of papers (title, id, authors, pdf_url, summary).
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        return json.dumps(_rank(LOCAL_PAPERS, query, ("title", "summary"), num_articles), indent=2)
+
+
+def search_toolkits(backend: str = "web", latency: float = 0.0) -> List[List[Toolkit]]:
+    """Toolkit untuk (search agent, research agent) sesuai AGENT_SEARCH_BACKEND"""
+    if backend == "local":
+        return [
+            [LocalSearchTools(latency=latency, include_tools=["local_search"])],
+            [LocalSearchTools(latency=latency, include_tools=["local_papers"])],
+        ]
+
+    from agno.tools.arxiv import ArxivTools
+    from agno.tools.baidusearch import BaiduSearchTools
+    from agno.tools.duckduckgo import DuckDuckGoTools
+
+    return [[DuckDuckGoTools(), BaiduSearchTools()], [ArxivTools()]]
@@ -0,0 +1,80 @@
+"""
+Build varian presisi dari skin_detection_ensemble.onnx.
+
+    python -m app.services.model_variants build
+    python -m app.services.model_variants build --variants int8
+
+Varian dipilih saat runtime lewat Settings.MODEL_VARIANT (fp32 | int8 | fp16).
+Gunakan benchmarks/compare_variants.py untuk melihat akurasi vs latency.
+"""
+import argparse
+import os
+
+from app.services.load_model import MODEL_VARIANTS, model_variant_path
+
+
+def build_int8(source_path, target_path, weight_type="QInt8", op_types=None):
+    """
+    Dynamic quantization: bobot disimpan INT8, aktivasi dikuantisasi saat runtime
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(
+        source_path,
+        target_path,
+        weight_type=getattr(QuantType, weight_type),
+        op_types_to_quantize=op_types,
+    )
+
+
+def build_fp16(source_path, target_path):
+    """
+    Konversi bobot dan komputasi ke FP16, input/output tetap float32
+    """
+    import onnx
+    from onnxruntime.transformers.float16 import convert_float_to_float16
+
+    model = onnx.load(source_path)
+    onnx.save(convert_float_to_float16(model, keep_io_types=True), target_path)
+
+
+BUILDERS = {
+    "int8": build_int8,
+    "fp16": build_fp16,
+}
+
+
+def build_variants(variants=None, source_path=None, force=False):
+    """
+    Build varian dari model fp32; kembalikan dict variant -> path
+    """
+    source_path = source_path or model_variant_path("fp32")
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(f"Source model not found: {source_path}")
+
+    built = {}
+    for variant in variants or list(BUILDERS):
+        if variant not in BUILDERS:
+            raise ValueError(f"Unknown variant '{variant}'. Available: {list(BUILDERS)}")
+        target_path = os.path.join(os.path.dirname(source_path), MODEL_VARIANTS[variant])
+        if os.path.exists(target_path) and not force:
+            print(f"⏭️  {variant}: {target_path} already exists")
+        else:
+            print(f"🔧 Building {variant} variant -> {target_path}")
+            BUILDERS[variant](source_path, target_path)
+            size_mb = os.path.getsize(target_path) / 1024 / 1024
+            print(f"✅ {variant}: {size_mb:.1f} MB")
+        built[variant] = target_path
+    return built
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build quantized / fp16 model variants")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build")
+    build_parser.add_argument("--variants", nargs="+", choices=list(BUILDERS), default=None)
+    build_parser.add_argument("--source", default=None, help="Path model fp32 (default: saved_models)")
+    build_parser.add_argument("--force", action="store_true", help="Rebuild walaupun file sudah ada")
+    args = parser.parse_args()
+
+    build_variants(args.variants, source_path=args.source, force=args.force)
@@ -0,0 +1,118 @@
+"""
+Cache hasil prediksi ONNX berbasis isi gambar.
+
+Key = sha256(bytes gambar), dipisah per versi model. Tier memori berupa LRU
+terbatas; tier disk (SQLite, opsional) bertahan setelah restart.
+"""
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class PredictionCache:
+    def __init__(self, max_entries=1024, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.model_version = None
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS prediction_cache (
+                    image_hash TEXT NOT NULL,
+                    model_version TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (image_hash, model_version)
+                )
+                """
+            )
+            self._db.commit()
+
+    @staticmethod
+    def image_hash(image_bytes) -> str:
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    def set_model_version(self, model_version):
+        """
+        Pasang versi model aktif; entry dari versi lain langsung tidak berlaku
+        """
+        with self._lock:
+            self.model_version = str(model_version)
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM prediction_cache WHERE model_version != ?", (self.model_version,))
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM prediction_cache")
+                self._db.commit()
+
+    def get(self, image_bytes) -> Optional[Dict]:
+        image_hash = self.image_hash(image_bytes)
+        with self._lock:
+            result = self._entries.get(image_hash)
+            if result is not None:
+                self._entries.move_to_end(image_hash)
+            elif self._db is not None:
+                row = self._db.execute(
+                    "SELECT result FROM prediction_cache WHERE image_hash = ? AND model_version = ?",
+                    (image_hash, self.model_version),
+                ).fetchone()
+                if row is not None:
+                    result = json.loads(row[0])
+                    self._remember(image_hash, result)
+
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return copy.deepcopy(result)
+
+    def put(self, image_bytes, result: Dict, model_version=None):
+        image_hash = self.image_hash(image_bytes)
+        payload = json.dumps(result)
+        with self._lock:
+            if model_version is not None and str(model_version) != self.model_version:
+                # Hasil dari model yang sudah diganti
+                return
+            # Simpan bentuk JSON di kedua tier agar hasil hit identik (tuple -> list)
+            self._remember(image_hash, json.loads(payload))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO prediction_cache (image_hash, model_version, result, created_at) VALUES (?, ?, ?, ?)",
+                    (image_hash, self.model_version, payload, time.time()),
+                )
+                self._db.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "model_version": self.model_version,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def _remember(self, image_hash, result):
+        self._entries[image_hash] = result
+        self._entries.move_to_end(image_hash)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
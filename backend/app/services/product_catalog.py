@@ -0,0 +1,325 @@
+"""
+Katalog rekomendasi produk lokal per (country, concern).
+
+Isi katalog berasal dari:
+- output skincare_products analisis sebelumnya (record_analysis), dikaitkan
+  ke semua concern di analisis tersebut
+- entry curated dari file JSON PRODUCT_CATALOG_SEED_PATH (list objek dengan
+  field SkincareProducts + "country" dan "concern"/"concerns")
+
+Jika katalog punya cukup produk segar (PRODUCT_CATALOG_MIN_PRODUCTS) untuk
+setiap concern hasil prediksi ONNX di country user, agent hanya diminta
+assessment dermatologis dan skincare_products diambil dari sini. Concern
+yang belum tercakup membuat analisis itu menghasilkan produk secara live,
+lalu produknya disimpan di bawah concern tersebut. Produk tidak pernah
+dilengkapi dengan produk concern lain.
+
+Entry hasil analisis yang tidak muncul lagi selama PRODUCT_CATALOG_MAX_AGE_DAYS
+dianggap basi dan tidak dipakai. Task background (start_refresher) membuat
+ulang produk untuk (country, concern) yang basi lewat agent produk
+(PRODUCT_CATALOG_REGENERATE_PER_REFRESH per putaran), memuat ulang file seed
+dan membuang entry yang sudah basi dua kali MAX_AGE.
+"""
+import asyncio
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models.product_catalog import CatalogProduct
+
+# Insert conflict-safe (ON CONFLICT DO NOTHING) per backend database yang didukung app/db/database.py
+INSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+PRODUCT_FIELDS = ("title", "description", "priority", "price", "how_to_use", "benefits", "side_effects", "dosage")
+
+_refresher: Optional[asyncio.Task] = None
+_seed_mtime: Optional[float] = None
+
+
+def normalize(value) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip().lower()
+
+
+def _fresh_cutoff(factor=1):
+    return datetime.now(timezone.utc) - timedelta(days=settings.PRODUCT_CATALOG_MAX_AGE_DAYS * factor)
+
+
+def _is_fresh():
+    # Entry curated selalu segar; entry hasil analisis kedaluwarsa
+    return or_(CatalogProduct.curated.is_(True), CatalogProduct.last_seen_at >= _fresh_cutoff())
+
+
+def _concern_keys(concerns: Iterable[str]) -> List[str]:
+    return list(dict.fromkeys(normalize(concern) for concern in concerns if normalize(concern)))
+
+
+def _fresh(query):
+    return query.filter(_is_fresh())
+
+
+def _insert_ignore(db, values: Dict) -> bool:
+    """
+    INSERT .. ON CONFLICT (country, concern, title_key) DO NOTHING;
+    True jika baris baru dibuat (False: sudah ada, termasuk dari request lain)
+    """
+    insert = INSERT_DIALECTS[db.bind.dialect.name]
+    statement = insert(CatalogProduct).values(**values).on_conflict_do_nothing(
+        index_elements=[CatalogProduct.country, CatalogProduct.concern, CatalogProduct.title_key]
+    )
+    return db.execute(statement).rowcount == 1
+
+
+def upsert_products(db, country, concerns: Iterable[str], products: Iterable[Dict], curated=False) -> int:
+    country = normalize(country)
+    concerns = {normalize(concern) for concern in concerns if normalize(concern)}
+    if not country or not concerns:
+        return 0
+
+    # Judul yang sama setelah normalisasi dihitung sekali per panggilan (yang pertama dipakai)
+    unique_products = {}
+    for product in products:
+        title_key = normalize(product.get("title"))
+        if title_key and title_key not in unique_products:
+            unique_products[title_key] = product
+
+    now = datetime.now(timezone.utc)
+    count = 0
+    for title_key, product in unique_products.items():
+        values = {field: str(product.get(field) or "") for field in PRODUCT_FIELDS}
+        for concern in concerns:
+            key = {"country": country, "concern": concern, "title_key": title_key}
+            if _insert_ignore(db, {**key, **values, "curated": curated, "times_recommended": 0 if curated else 1, "last_seen_at": now}):
+                count += 1
+                continue
+
+            # Sudah ada: skor dinaikkan di SQL agar analisis bersamaan tidak saling menimpa
+            entry = db.query(CatalogProduct).filter_by(**key)
+            fields = {getattr(CatalogProduct, field): value for field, value in values.items()}
+            if curated:
+                entry.update({**fields, CatalogProduct.curated: True, CatalogProduct.last_seen_at: now}, synchronize_session=False)
+            else:
+                score = {CatalogProduct.times_recommended: CatalogProduct.times_recommended + 1, CatalogProduct.last_seen_at: now}
+                entry.filter(CatalogProduct.curated.is_(False)).update({**fields, **score}, synchronize_session=False)
+                # Output LLM tidak menimpa deskripsi curated, hanya menambah skor
+                entry.filter(CatalogProduct.curated.is_(True)).update(score, synchronize_session=False)
+            count += 1
+    db.commit()
+    return count
+
+
+def _analysis_concerns(analysis_result: Dict, extra_concerns: Iterable[str] = ()) -> List[str]:
+    """Concern dari agent lalu concern prediksi ONNX yang belum disebut agent"""
+    names = [concern.get("name") for concern in analysis_result.get("concerns") or []]
+    return _concern_keys([*names, *extra_concerns])
+
+
+def _store_products(country, concerns, products) -> int:
+    db = SessionLocal()
+    try:
+        return upsert_products(db, country, concerns, products)
+    finally:
+        db.close()
+
+
+def record_analysis(country, analysis_result: Dict, extra_concerns: Iterable[str] = ()) -> int:
+    """
+    Simpan skincare_products dari analisis live ke katalog (session sendiri),
+    di bawah concern agent dan extra_concerns (concern prediksi ONNX yang
+    dipakai covers_concerns)
+    """
+    if not settings.PRODUCT_CATALOG_ENABLED:
+        return 0
+    return _store_products(country, _analysis_concerns(analysis_result, extra_concerns), analysis_result.get("skincare_products") or [])
+
+
+def covers_concerns(country, concerns: Iterable[str]) -> bool:
+    """
+    Cukup produk segar untuk setiap concern di country ini sehingga agent
+    tidak perlu membuat produk. Tanpa concern (prediksi tidak tersedia)
+    selalu False.
+    """
+    concerns = _concern_keys(concerns)
+    if not settings.PRODUCT_CATALOG_ENABLED or not normalize(country) or not concerns:
+        return False
+    db = SessionLocal()
+    try:
+        counts = dict(
+            _fresh(db.query(CatalogProduct.concern, func.count(func.distinct(CatalogProduct.title_key))))
+            .filter(CatalogProduct.country == normalize(country), CatalogProduct.concern.in_(concerns))
+            .group_by(CatalogProduct.concern)
+            .all()
+        )
+        return all(counts.get(concern, 0) >= settings.PRODUCT_CATALOG_MIN_PRODUCTS for concern in concerns)
+    finally:
+        db.close()
+
+
+def _as_product(entry: CatalogProduct) -> Dict:
+    return {field: getattr(entry, field) for field in PRODUCT_FIELDS}
+
+
+def top_products(db, country, concerns: Iterable[str], limit=None) -> List[Dict]:
+    """
+    Produk teratas untuk concern user, bergiliran per concern (urutan concern
+    dari agent). Tidak dilengkapi produk concern lain jika kurang dari limit.
+    """
+    limit = limit or settings.PRODUCT_CATALOG_TOP_K
+    country = normalize(country)
+    concerns = _concern_keys(concerns)
+    ranking = (CatalogProduct.curated.desc(), CatalogProduct.times_recommended.desc(), CatalogProduct.last_seen_at.desc())
+
+    per_concern = []
+    for concern in concerns:
+        entries = _fresh(db.query(CatalogProduct).filter(CatalogProduct.country == country, CatalogProduct.concern == concern))\
+            .order_by(*ranking)\
+            .limit(limit)\
+            .all()
+        per_concern.append(entries)
+
+    selected, seen = [], set()
+    for rank in range(limit):
+        for entries in per_concern:
+            if rank < len(entries) and entries[rank].title_key not in seen and len(selected) < limit:
+                seen.add(entries[rank].title_key)
+                selected.append(entries[rank])
+
+    return [_as_product(entry) for entry in selected]
+
+
+def products_for_analysis(country, analysis_result: Dict, extra_concerns: Iterable[str] = ()) -> List[Dict]:
+    db = SessionLocal()
+    try:
+        return top_products(db, country, _analysis_concerns(analysis_result, extra_concerns))
+    finally:
+        db.close()
+
+
+def load_seed_file(db, path) -> int:
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    count = 0
+    for entry in entries:
+        concerns = entry.get("concerns") or [entry.get("concern")]
+        count += upsert_products(db, entry.get("country"), concerns, [entry], curated=True)
+    return count
+
+
+def stale_concerns(limit) -> List[Tuple[str, str]]:
+    """
+    (country, concern) yang punya entry basi dan kurang dari MIN_PRODUCTS
+    produk segar, yang paling sering direkomendasikan lebih dulu
+    """
+    db = SessionLocal()
+    try:
+        fresh_count = func.count(func.distinct(case((_is_fresh(), CatalogProduct.title_key))))
+        stale = and_(CatalogProduct.curated.is_(False), CatalogProduct.last_seen_at < _fresh_cutoff())
+        rows = db.query(CatalogProduct.country, CatalogProduct.concern)\
+            .group_by(CatalogProduct.country, CatalogProduct.concern)\
+            .having(func.sum(case((stale, 1), else_=0)) > 0)\
+            .having(fresh_count < settings.PRODUCT_CATALOG_MIN_PRODUCTS)\
+            .order_by(func.sum(CatalogProduct.times_recommended).desc())\
+            .limit(limit)\
+            .all()
+        return [(country, concern) for country, concern in rows]
+    finally:
+        db.close()
+
+
+def refresh_catalog() -> Dict:
+    """Muat ulang file seed jika berubah, buang entry yang basi 2x MAX_AGE dan entry berlebih per concern"""
+    global _seed_mtime
+    db = SessionLocal()
+    try:
+        seeded = 0
+        path = settings.PRODUCT_CATALOG_SEED_PATH
+        if path and os.path.exists(path) and os.path.getmtime(path) != _seed_mtime:
+            seeded = load_seed_file(db, path)
+            _seed_mtime = os.path.getmtime(path)
+
+        # Entry basi disimpan satu periode lagi agar stale_concerns tahu concern mana yang perlu dibuat ulang
+        expired = db.query(CatalogProduct)\
+            .filter(CatalogProduct.curated.is_(False), CatalogProduct.last_seen_at < _fresh_cutoff(2))\
+            .delete(synchronize_session=False)
+
+        # Batasi jumlah entry hasil analisis per (country, concern)
+        trimmed = 0
+        max_per_concern = settings.PRODUCT_CATALOG_MAX_PER_CONCERN
+        groups = db.query(CatalogProduct.country, CatalogProduct.concern)\
+            .filter(CatalogProduct.curated.is_(False))\
+            .group_by(CatalogProduct.country, CatalogProduct.concern)\
+            .all()
+        for country, concern in groups:
+            keep = db.query(CatalogProduct.id)\
+                .filter(CatalogProduct.country == country, CatalogProduct.concern == concern, CatalogProduct.curated.is_(False))\
+                .order_by(_is_fresh().desc(), CatalogProduct.times_recommended.desc(), CatalogProduct.last_seen_at.desc())\
+                .limit(max_per_concern)
+            trimmed += db.query(CatalogProduct)\
+                .filter(
+                    CatalogProduct.country == country,
+                    CatalogProduct.concern == concern,
+                    CatalogProduct.curated.is_(False),
+                    CatalogProduct.id.notin_(keep.scalar_subquery()),
+                )\
+                .delete(synchronize_session=False)
+        db.commit()
+        return {"seeded": seeded, "expired": expired, "trimmed": trimmed}
+    finally:
+        db.close()
+
+
+async def regenerate_stale(limit=None) -> Dict:
+    """
+    Buat ulang produk untuk (country, concern) basi lewat agent produk.
+    Berhenti saat tahap LLM tidak tersedia; sisanya dicoba putaran berikutnya.
+    """
+    from app.services import analysis_pipeline, llm_guard
+
+    limit = settings.PRODUCT_CATALOG_REGENERATE_PER_REFRESH if limit is None else limit
+    if limit <= 0:
+        return {"regenerated": 0}
+    regenerated = 0
+    for country, concern in await asyncio.to_thread(stale_concerns, limit):
+        try:
+            products = await analysis_pipeline.run_products_agent(country, [concern])
+        except llm_guard.LLMUnavailable as e:
+            print(f"WARNING: Product catalog regeneration paused ({str(e)})")
+            break
+        except Exception as e:
+            print(f"WARNING: Failed to regenerate products for {country}/{concern}: {str(e)}")
+            continue
+        if await asyncio.to_thread(_store_products, country, [concern], products):
+            regenerated += 1
+    return {"regenerated": regenerated}
+
+
+async def _refresh_loop():
+    while True:
+        try:
+            result = await regenerate_stale()
+            result.update(await asyncio.to_thread(refresh_catalog))
+            if any(result.values()):
+                print(f"🛍️  Product catalog refreshed: {result}")
+        except Exception as e:
+            print(f"WARNING: Product catalog refresh failed: {str(e)}")
+        await asyncio.sleep(settings.PRODUCT_CATALOG_REFRESH_SECONDS)
+
+
+def start_refresher():
+    global _refresher
+    if not settings.PRODUCT_CATALOG_ENABLED or settings.PRODUCT_CATALOG_REFRESH_SECONDS <= 0 or _refresher is not None:
+        return
+    _refresher = asyncio.create_task(_refresh_loop(), name="product-catalog-refresher")
+
+
+async def stop_refresher():
+    global _refresher
+    if _refresher is not None:
+        _refresher.cancel()
+        await asyncio.gather(_refresher, return_exceptions=True)
+        _refresher = None
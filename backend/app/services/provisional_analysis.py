@@ -0,0 +1,146 @@
+"""
+Analisis provisional (mode degraded) saat LLM tidak tersedia.
+
+Dibangun cepat tanpa Gemini dari prediksi ProductionONNXEnsembleModel:
+concern dari top prediksi, metrik dari skor kelas, rekomendasi dari analisis
+LLM sebelumnya milik user yang sama dengan concern yang sama (rekomendasi LLM
+ditulis dari journal pribadi user, jadi tidak pernah dipakai untuk user
+lain; tanpa cache dipakai DEFAULT_RECOMMENDATIONS) dan produk dari katalog
+produk. Hasil ditandai provisional=True dan di-upgrade oleh job
+"upgrade" di job_queue setelah circuit LLM tertutup lagi.
+"""
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.models.analysis import Analysis
+from app.models.skin import Skin
+from app.services import product_catalog
+
+# Rekomendasi dasar per kelas model jika belum ada analisis LLM yang bisa dipakai ulang
+DEFAULT_RECOMMENDATIONS = {
+    "Acne": ("Use a gentle salicylic acid cleanser", "Cleanse twice daily with a non-comedogenic BHA cleanser and avoid picking blemishes."),
+    "Blackheads": ("Exfoliate with BHA", "Use a salicylic acid exfoliant 2-3 times a week to keep pores clear."),
+    "Dark Spots": ("Apply broad-spectrum sunscreen daily", "Use SPF 30+ every morning; niacinamide or vitamin C can help fade spots."),
+    "Dry Skin": ("Strengthen the moisture barrier", "Use a fragrance-free moisturizer with ceramides or hyaluronic acid after cleansing."),
+    "Enlarged Pores": ("Keep pores clean", "Use a gentle cleanser and a niacinamide serum; avoid heavy occlusive products."),
+    "Eyebags": ("Support the under-eye area", "Get regular sleep, limit salt before bed and use a caffeine eye cream."),
+    "Oily Skin": ("Balance oil production", "Use a lightweight oil-free moisturizer and a gentle foaming cleanser."),
+    "Skin Redness": ("Soothe and avoid irritants", "Use calming ingredients such as centella or azelaic acid and avoid harsh scrubs."),
+    "Whiteheads": ("Keep pores unclogged", "Use a gentle exfoliant and non-comedogenic products."),
+    "Wrinkles": ("Protect and renew", "Use daily sunscreen and introduce a retinoid at night gradually."),
+}
+PROVISIONAL_NOTE = (
+    "Provisional result",
+    "This result was generated by the on-device skin classifier while the full AI analysis is unavailable. It will be updated automatically.",
+)
+
+
+def concern_name(label) -> str:
+    """Nama kelas model -> nama concern (mis. "Dark-Spots" -> "Dark Spots")"""
+    return str(label).replace("-", " ").replace("Englarged", "Enlarged")
+
+
+def _scores(prediction) -> Dict[str, float]:
+    return {concern_name(name): float(score) for name, score in prediction.get("top_5_predictions") or []}
+
+
+def _clamp(value) -> int:
+    return int(max(0, min(100, round(value))))
+
+
+def _concerns(prediction) -> List[Dict]:
+    ranked = sorted(_scores(prediction).items(), key=lambda item: item[1], reverse=True)
+    selected = [
+        (name, score) for rank, (name, score) in enumerate(ranked)
+        if rank == 0 or score >= settings.LLM_DEGRADED_MIN_CONFIDENCE
+    ][:settings.LLM_DEGRADED_MAX_CONCERNS]
+    return [
+        # Model tidak mengukur severity; provisional tidak pernah menyatakan "Severe"
+        {"name": name, "severity": "Moderate" if score >= 0.6 else "Mild", "type": None, "confidence": round(score, 2)}
+        for name, score in selected
+    ]
+
+
+def predicted_concerns(prediction) -> List[str]:
+    """Nama concern dari prediksi ONNX (ambang sama dengan hasil provisional)"""
+    if not prediction or not prediction.get("top_5_predictions"):
+        return []
+    return [concern["name"] for concern in _concerns(prediction)]
+
+
+def _metrics(prediction) -> Dict:
+    scores = _scores(prediction)
+    hydration = _clamp(75 - 50 * scores.get("Dry Skin", 0) + 10 * scores.get("Oily Skin", 0))
+    texture = _clamp(85 - 60 * sum(scores.get(name, 0) for name in ("Acne", "Whiteheads", "Blackheads", "Wrinkles")))
+    pores = _clamp(30 + 60 * sum(scores.get(name, 0) for name in ("Enlarged Pores", "Blackheads", "Oily Skin")))
+    return {
+        "skin_hydration": hydration,
+        "texture_uniformity": texture,
+        "pore_visibility": pores,
+        "overall_score": _clamp((hydration + texture + (100 - pores)) / 3),
+    }
+
+
+def _skin_type(db, user_id, prediction) -> str:
+    scores = _scores(prediction)
+    if max(scores.get("Oily Skin", 0), scores.get("Dry Skin", 0)) >= settings.LLM_DEGRADED_MIN_CONFIDENCE:
+        return "Oily" if scores.get("Oily Skin", 0) >= scores.get("Dry Skin", 0) else "Dry"
+    skin = db.query(Skin).filter(Skin.user_id == user_id).first() if user_id else None
+    return skin.skin_type if skin and skin.skin_type else "Unknown"
+
+
+def cached_recommendations(db, user_id, concerns: List[str], limit=None) -> List[Dict]:
+    """Rekomendasi dari analisis LLM terbaru milik user yang punya concern sama"""
+    if not user_id:
+        return []
+    limit = limit or settings.LLM_DEGRADED_MAX_RECOMMENDATIONS
+    wanted = {product_catalog.normalize(concern) for concern in concerns}
+    rows = db.query(Analysis.concerns, Analysis.recommendations)\
+        .filter(Analysis.user_id == user_id, Analysis.provisional.is_(False))\
+        .order_by(Analysis.created_at.desc())\
+        .limit(settings.LLM_DEGRADED_RECOMMENDATION_SCAN)\
+        .all()
+
+    selected, seen = [], set()
+    for row in rows:
+        names = {product_catalog.normalize(concern.get("name")) for concern in row.concerns or [] if isinstance(concern, dict)}
+        if not names & wanted:
+            continue
+        for recommendation in row.recommendations or []:
+            key = product_catalog.normalize(recommendation.get("title"))
+            if key and key not in seen and len(selected) < limit:
+                seen.add(key)
+                selected.append(recommendation)
+        if len(selected) >= limit:
+            break
+    return selected
+
+
+def build_provisional_analysis(db, user_id, country, prediction: Optional[Dict]) -> Dict:
+    """Hasil analisis lengkap (field sama dengan SkinAnalysisResponse) + provisional=True"""
+    if not prediction or not prediction.get("top_5_predictions"):
+        raise ValueError("ONNX prediction required for provisional analysis")
+
+    concerns = _concerns(prediction)
+    names = [concern["name"] for concern in concerns]
+    metrics = _metrics(prediction)
+
+    recommendations = [{"title": PROVISIONAL_NOTE[0], "description": PROVISIONAL_NOTE[1], "priority": "High"}]
+    cached = cached_recommendations(db, user_id, names)
+    recommendations.extend(cached)
+    if not cached:
+        for name in names:
+            if name in DEFAULT_RECOMMENDATIONS:
+                title, description = DEFAULT_RECOMMENDATIONS[name]
+                recommendations.append({"title": title, "description": description, "priority": "Medium"})
+
+    score = metrics["overall_score"]
+    return {
+        "overall_health": "Good" if score >= 70 else "Fair" if score >= 40 else "Poor",
+        "skin_type": _skin_type(db, user_id, prediction),
+        "concerns": concerns,
+        "recommendations": recommendations,
+        "analysis_metrics": metrics,
+        "skincare_products": product_catalog.top_products(db, country, names) if country else [],
+        "provisional": True,
+    }
@@ -0,0 +1,186 @@
+"""
+Renderer cepat untuk gambar klasifikasi berbasis Pillow ImageDraw.
+
+Layout sama dengan versi matplotlib (original | prediksi + bounding box |
+detail top-5), tetapi langsung digambar pada ukuran target tanpa figure,
+tight_layout, atau dpi=300. Matplotlib tetap tersedia lewat
+Settings.VISUALIZATION_RENDERER = "matplotlib" untuk export kualitas tinggi.
+"""
+import os
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+from app.core.config import settings
+
+COLORS = {
+    'green': (0, 128, 0),
+    'orange': (255, 165, 0),
+    'red': (220, 20, 60),
+}
+PANEL_BACKGROUND = (255, 255, 255)
+INFO_BACKGROUND = (211, 211, 211)
+TEXT_COLOR = (0, 0, 0)
+PADDING = 12
+
+
+@lru_cache(maxsize=16)
+def load_font(size, bold=False, monospace=False):
+    """
+    Cari font TrueType (DejaVu dari sistem atau matplotlib), fallback ke font bawaan Pillow
+    """
+    name = 'DejaVuSansMono' if monospace else 'DejaVuSans'
+    if bold:
+        name += '-Bold'
+    candidates = [f'{name}.ttf']
+    try:
+        import matplotlib
+        candidates.append(os.path.join(os.path.dirname(matplotlib.__file__), 'mpl-data', 'fonts', 'ttf', f'{name}.ttf'))
+    except ImportError:
+        pass
+    for candidate in candidates:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1
+        return ImageFont.load_default()
+
+
+def confidence_status(confidence):
+    """Warna dan status, sama dengan ambang di versi matplotlib"""
+    if confidence > 0.8:
+        return 'green', 'High Confidence'
+    if confidence > 0.6:
+        return 'orange', 'Medium Confidence'
+    return 'red', 'Low Confidence'
+
+
+def _prepare(original_img, height):
+    if original_img.format == 'JPEG':
+        # Draft mode: JPEG besar di-decode langsung pada skala yang mendekati target
+        width = round(original_img.width * height / original_img.height)
+        original_img.draft('RGB', (width, height))
+    return ImageOps.exif_transpose(original_img).convert('RGB')
+
+
+def _fit(image, height):
+    width = max(1, round(image.width * height / image.height))
+    return image.resize((width, height), Image.Resampling.BILINEAR, reducing_gap=settings.PREPROCESS_REDUCING_GAP or None)
+
+
+def _draw_title(draw, x, width, text, font):
+    text_width = draw.textlength(text, font=font)
+    draw.text((x + max(0, (width - text_width) / 2), PADDING), text, fill=TEXT_COLOR, font=font)
+
+
+def render_prediction(original_img, result, saved_path, height=None, quality=None):
+    """
+    Gambar hasil prediksi ke saved_path; format mengikuti ekstensi file
+    """
+    height = height or settings.VISUALIZATION_HEIGHT
+    quality = quality or settings.VISUALIZATION_QUALITY
+    title_font = load_font(max(12, height // 28), bold=True)
+    label_font = load_font(max(10, height // 34), bold=True)
+    info_font = load_font(max(9, height // 40), monospace=True)
+
+    image = _fit(_prepare(original_img, height), height)
+    title_height = title_font.size + PADDING * 2
+    info_width = max(height * 3 // 4, 320)
+    canvas = Image.new('RGB', (image.width * 2 + info_width + PADDING * 4, height + title_height + PADDING), PANEL_BACKGROUND)
+    draw = ImageDraw.Draw(canvas)
+
+    confidence = result['confidence']
+    color_name, status = confidence_status(confidence)
+    color = COLORS[color_name]
+
+    # 1. Original image
+    left_x = PADDING
+    canvas.paste(image, (left_x, title_height))
+    _draw_title(draw, left_x, image.width, 'Original Image', title_font)
+
+    # 2. Prediction results: bounding box 70% di tengah gambar + label
+    pred_x = left_x + image.width + PADDING
+    canvas.paste(image, (pred_x, title_height))
+    box_width, box_height = image.width * 0.7, image.height * 0.7
+    box_x = pred_x + (image.width - box_width) / 2
+    box_y = title_height + (image.height - box_height) / 2
+    line_width = max(2, height // 120)
+    draw.rectangle((box_x, box_y, box_x + box_width, box_y + box_height), outline=color, width=line_width)
+
+    main_label = f"{result['predicted_class']}\nConfidence: {confidence:.2%}\n{status}"
+    label_box = draw.multiline_textbbox((0, 0), main_label, font=label_font)
+    label_width = label_box[2] - label_box[0] + PADDING
+    label_height = label_box[3] - label_box[1] + PADDING
+    label_x = min(box_x, pred_x + image.width - label_width)
+    label_y = max(title_height, box_y - label_height - line_width)
+    overlay = Image.new('RGBA', (int(label_width), int(label_height)), color + (204,))
+    canvas.paste(overlay, (int(label_x), int(label_y)), overlay)
+    draw.multiline_text((label_x + PADDING / 2, label_y + PADDING / 2 - label_box[1]), main_label, fill=(255, 255, 255), font=label_font)
+    _draw_title(draw, pred_x, image.width, f"Prediction: {result['predicted_class']} ({confidence:.2%})", title_font)
+
+    # 3. Detailed info
+    info_x = pred_x + image.width + PADDING
+    info_text = " ONNX ENSEMBLE MODEL\n"
+    info_text += "=" * 28 + "\n\n"
+    info_text += " PREDICTION RESULTS:\n"
+    info_text += f"   Class: {result['predicted_class']}\n"
+    info_text += f"   Confidence: {confidence:.2%}\n"
+    info_text += f"   Status: {status}\n\n"
+    info_text += " TOP 5 PREDICTIONS:\n"
+    for i, (cls, conf) in enumerate(result['top_5_predictions'][:5]):
+        info_text += f"   {i+1}. {cls}: {conf:.2%}\n"
+    info_box = draw.multiline_textbbox((0, 0), info_text, font=info_font)
+    draw.rectangle(
+        (info_x, title_height, info_x + info_width, title_height + min(height, info_box[3] + PADDING * 2)),
+        fill=INFO_BACKGROUND,
+    )
+    draw.multiline_text((info_x + PADDING, title_height + PADDING), info_text, fill=TEXT_COLOR, font=info_font)
+    _draw_title(draw, info_x, info_width, 'Detailed Results', title_font)
+
+    save_image(canvas, saved_path, quality)
+    return saved_path
+
+
+def render_warning(original_img, saved_path, title, message, height=None, quality=None):
+    """
+    Gambar asli dengan judul peringatan (fallback model / error visualisasi)
+    """
+    height = height or settings.VISUALIZATION_HEIGHT
+    title_font = load_font(max(12, height // 24), bold=True)
+    text_font = load_font(max(10, height // 34))
+
+    image = _fit(_prepare(original_img, height), height)
+    title_height = title_font.size + PADDING * 2
+    canvas = Image.new('RGB', (image.width + PADDING * 2, height + title_height + PADDING), PANEL_BACKGROUND)
+    canvas.paste(image, (PADDING, title_height))
+    draw = ImageDraw.Draw(canvas)
+    _draw_title(draw, PADDING, image.width, title, title_font)
+
+    text_box = draw.textbbox((0, 0), message, font=text_font)
+    draw.rectangle(
+        (PADDING * 2, title_height + PADDING, PADDING * 3 + text_box[2], title_height + PADDING * 2 + text_box[3]),
+        fill=(255, 255, 255),
+    )
+    draw.text((PADDING * 2.5, title_height + PADDING * 1.5), message, fill=COLORS['red'], font=text_font)
+
+    save_image(canvas, saved_path, quality)
+    return saved_path
+
+
+def save_image(image, saved_path, quality=None):
+    """
+    Encode sesuai ekstensi. PNG memakai compress_level rendah: level default (6)
+    ~4x lebih lambat untuk foto dengan penghematan ukuran yang kecil.
+    """
+    quality = quality or settings.VISUALIZATION_QUALITY
+    extension = os.path.splitext(saved_path)[1].lower()
+    if extension in ('.jpg', '.jpeg'):
+        image.save(saved_path, format='JPEG', quality=quality, optimize=True)
+    elif extension == '.webp':
+        image.save(saved_path, format='WEBP', quality=quality)
+    else:
+        image.save(saved_path, format='PNG', compress_level=settings.VISUALIZATION_PNG_COMPRESS_LEVEL)
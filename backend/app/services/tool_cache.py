@@ -0,0 +1,209 @@
+"""
+Cache hasil tool agent (DuckDuckGo, Baidu, arXiv) yang dipakai bersama antar analisis.
+
+Key = nama tool + query yang dinormalisasi + country user (+ argumen lain).
+Query "Acne treatment, Indonesia" dan "indonesia acne treatment" menjadi
+key yang sama. Tier memori berupa LRU terbatas dengan TTL; tier disk
+(SQLite, opsional) bertahan setelah restart.
+
+Country diambil dari ContextVar yang diisi analyze_skin sebelum Team
+berjalan (ContextVar ikut terbawa ke thread tool lewat asyncio.to_thread).
+"""
+import functools
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+current_country: ContextVar[Optional[str]] = ContextVar("current_country", default=None)
+
+_TOKEN_PATTERN = re.compile(r"[\w\-\+']+", re.UNICODE)
+
+
+@contextmanager
+def country_context(country):
+    token = current_country.set(country)
+    try:
+        yield
+    finally:
+        current_country.reset(token)
+
+
+def normalize_query(query) -> str:
+    """Lowercase, buang tanda baca, urutkan token unik (query search bersifat bag-of-words)"""
+    tokens = _TOKEN_PATTERN.findall(str(query).lower())
+    return " ".join(sorted(set(tokens)))
+
+
+class ToolCache:
+    def __init__(self, ttl_seconds=21600, max_entries=2048, db_path: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tool_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    tool TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS ix_tool_cache_expires_at ON tool_cache (expires_at)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(tool, args: Dict, country=None) -> str:
+        normalized = {
+            name: normalize_query(value) if name == "query" else value
+            for name, value in args.items()
+        }
+        payload = json.dumps(
+            {"tool": tool, "country": (country or "").strip().lower(), "args": normalized},
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, tool, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute(
+                    "SELECT result, expires_at FROM tool_cache WHERE cache_key = ? AND expires_at > ?",
+                    (key, now),
+                ).fetchone()
+                if row is not None:
+                    entry = (row[1], json.loads(row[0]))
+                    self._remember(key, entry)
+
+            if entry is None:
+                self._misses[tool] = self._misses.get(tool, 0) + 1
+                return None
+            self._hits[tool] = self._hits.get(tool, 0) + 1
+            return entry[1]
+
+    def put(self, tool, key, result):
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        payload = json.dumps(result)
+        with self._lock:
+            self._remember(key, (expires_at, result))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO tool_cache (cache_key, tool, result, created_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, tool, payload, now, expires_at),
+                )
+                # Batasi ukuran tier disk: hapus yang kedaluwarsa, lalu yang paling lama
+                self._db.execute("DELETE FROM tool_cache WHERE expires_at <= ?", (now,))
+                self._db.execute(
+                    "DELETE FROM tool_cache WHERE cache_key NOT IN "
+                    "(SELECT cache_key FROM tool_cache ORDER BY created_at DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM tool_cache")
+                self._db.commit()
+
+    def wrap(self, tool, entrypoint):
+        """
+        Bungkus entrypoint tool; functools.wraps menjaga signature/docstring
+        sehingga schema tool yang dikirim ke model tidak berubah
+        """
+        @functools.wraps(entrypoint)
+        def cached_entrypoint(*args, **kwargs):
+            key = self.make_key(tool, {**{str(i): arg for i, arg in enumerate(args)}, **kwargs}, current_country.get())
+            result = self.get(tool, key)
+            if result is not None:
+                return result
+            result = entrypoint(*args, **kwargs)
+            # Hasil kosong tidak di-cache (bisa jadi rate limit / error sementara)
+            if result not in (None, "", "[]", "{}"):
+                self.put(tool, key, result)
+            return result
+
+        return cached_entrypoint
+
+    def wrap_toolkit(self, toolkit):
+        for name, function in toolkit.functions.items():
+            if function.entrypoint is not None:
+                function.entrypoint = self.wrap(name, function.entrypoint)
+        return toolkit
+
+    def stats(self) -> Dict:
+        with self._lock:
+            tools = sorted(set(self._hits) | set(self._misses))
+            per_tool = {}
+            for tool in tools:
+                hits, misses = self._hits.get(tool, 0), self._misses.get(tool, 0)
+                per_tool[tool] = {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses)}
+            hits, misses = sum(self._hits.values()), sum(self._misses.values())
+            return {
+                "entries": len(self._entries),
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                "tools": per_tool,
+            }
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+_tool_cache: Optional[ToolCache] = None
+_tool_cache_lock = threading.Lock()
+
+
+def get_tool_cache() -> Optional[ToolCache]:
+    global _tool_cache
+    if not settings.TOOL_CACHE_ENABLED:
+        return None
+    if _tool_cache is None:
+        with _tool_cache_lock:
+            if _tool_cache is None:
+                _tool_cache = ToolCache(
+                    ttl_seconds=settings.TOOL_CACHE_TTL_SECONDS,
+                    max_entries=settings.TOOL_CACHE_MAX_ENTRIES,
+                    db_path=settings.TOOL_CACHE_DB_PATH,
+                )
+    return _tool_cache
+
+
+def cached_tools(*toolkits):
+    """List toolkit untuk Agent, dibungkus cache jika TOOL_CACHE_ENABLED"""
+    cache = get_tool_cache()
+    if cache is None:
+        return list(toolkits)
+    return [cache.wrap_toolkit(toolkit) for toolkit in toolkits]
@@ -0,0 +1,128 @@
+"""
+Bandingkan ukuran gambar yang dikirim ke Gemini: gambar klasifikasi
+(input agent sebelumnya) vs payload ringkas di memori (services/agent_payload.py).
+
+    python -m benchmarks.bench_agent_payload
+    python -m benchmarks.bench_agent_payload --images ./data/photos --max-sides 512 768 1024 --uplink-mbps 5
+
+Tanpa --images dipakai foto sintetis (gradient + noise, ukuran file lebih
+besar dari foto asli pada resolusi yang sama). Report berisi ukuran byte,
+resolusi, waktu encode, estimasi waktu upload pada --uplink-mbps, dan
+estimasi token gambar Gemini (tile 768x768 @ 258 token; gambar <= 384px = 1 tile).
+"""
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_inference import _parse_size
+from benchmarks.common import list_images, percentiles, write_report
+from benchmarks.synthetic_model import build_synthetic_model, synthetic_image_bytes
+
+
+def gemini_image_tokens(width, height) -> int:
+    """Estimasi kasar token gambar Gemini 2.0"""
+    if width <= 384 and height <= 384:
+        return 258
+    return math.ceil(width / 768) * math.ceil(height / 768) * 258
+
+
+def _entry(size_bytes, width, height, encode_ms, uplink_mbps):
+    return {
+        "bytes": size_bytes,
+        "size": f"{width}x{height}",
+        "encode_ms": encode_ms,
+        "upload_ms": round(size_bytes * 8 / (uplink_mbps * 1_000_000) * 1000, 1),
+        "approx_image_tokens": gemini_image_tokens(width, height),
+    }
+
+
+def run(samples, args, workdir):
+    from PIL import Image
+
+    from app.services.agent_payload import encode_agent_image
+    from app.services.load_model import METADATA_JSON, ProductionONNXEnsembleModel, get_model_cache, visualize_prediction
+
+    model_path = build_synthetic_model(os.path.join(workdir, "synthetic.onnx"))
+    get_model_cache().swap_model(ProductionONNXEnsembleModel(model_path, METADATA_JSON, warmup_batch_sizes=[]))
+
+    report = {"uplink_mbps": args.uplink_mbps, "images": {}}
+    reductions = []
+    for label, data in samples:
+        source_path = os.path.join(workdir, f"source_{label}.jpg")
+        with open(source_path, "wb") as f:
+            f.write(data)
+        get_model_cache().predict(data)
+
+        with Image.open(source_path) as original:
+            entry = {"upload": _entry(len(data), original.width, original.height, None, args.uplink_mbps)}
+
+        for renderer in args.renderers:
+            saved_path = os.path.join(workdir, f"classify_{label}_{renderer}.{args.classify_format}")
+            start = time.perf_counter()
+            visualize_prediction(source_path, saved_path, image_bytes=data, renderer=renderer)
+            render_ms = round((time.perf_counter() - start) * 1000, 2)
+            with Image.open(saved_path) as rendered:
+                entry[f"classify_{renderer}"] = _entry(
+                    os.path.getsize(saved_path), rendered.width, rendered.height, render_ms, args.uplink_mbps
+                )
+
+        for image_format in args.formats:
+            for max_side in args.max_sides:
+                timings = []
+                for _ in range(args.iterations):
+                    payload = encode_agent_image(data, max_side=max_side, image_format=image_format, quality=args.quality)
+                    timings.append(payload["encode_ms"])
+                compact = _entry(payload["bytes"], payload["width"], payload["height"], percentiles(timings)["p50"], args.uplink_mbps)
+                entry[f"payload_{image_format}_{max_side}"] = compact
+
+        baseline = entry.get(f"classify_{args.renderers[0]}") if args.renderers else entry["upload"]
+        default_payload = entry.get(f"payload_{args.formats[0]}_{args.max_sides[0]}")
+        if baseline and default_payload:
+            reductions.append(baseline["bytes"] / default_payload["bytes"])
+        report["images"][label] = entry
+
+    if reductions:
+        report["size_reduction_vs_baseline"] = {
+            "baseline": f"classify_{args.renderers[0]}" if args.renderers else "upload",
+            "payload": f"payload_{args.formats[0]}_{args.max_sides[0]}",
+            "median_factor": round(sorted(reductions)[len(reductions) // 2], 1),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the agent image payload size")
+    parser.add_argument("--images", default=None, help="Folder foto (default: foto sintetis)")
+    parser.add_argument("--image-sizes", nargs="+", default=["1280x960", "4032x3024"], help="Ukuran foto sintetis")
+    parser.add_argument("--max-sides", nargs="+", type=int, default=[768, 512, 1024])
+    parser.add_argument("--formats", nargs="+", choices=["jpeg", "webp"], default=["jpeg", "webp"])
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--renderers", nargs="+", choices=["pillow", "matplotlib"], default=["matplotlib", "pillow"])
+    parser.add_argument("--classify-format", default="png", choices=["png", "jpg"])
+    parser.add_argument("--uplink-mbps", type=float, default=10.0)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--output", default=None, help="Path file JSON (default: stdout)")
+    args = parser.parse_args()
+
+    # Log model ke stderr agar stdout hanya berisi report JSON
+    stdout, sys.stdout = sys.stdout, sys.stderr
+
+    if args.images:
+        samples = []
+        for path in list_images(args.images):
+            with open(path, "rb") as f:
+                samples.append((os.path.basename(path), f.read()))
+    else:
+        samples = [
+            (size, synthetic_image_bytes(*_parse_size(size), seed=i))
+            for i, size in enumerate(args.image_sizes)
+        ]
+
+    with tempfile.TemporaryDirectory(prefix="ronaai-bench-") as workdir:
+        report = run(samples, args, workdir)
+
+    sys.stdout = stdout
+    write_report(report, args.output)
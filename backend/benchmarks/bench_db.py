@@ -0,0 +1,216 @@
+"""
+Throughput endpoint CRUD di bawah beban read/write campuran bersamaan.
+
+    python -m benchmarks.bench_db --concurrency 50 --duration 20
+    python -m benchmarks.bench_db --base-url http://localhost:8066 --concurrency 100
+
+    # Sebelum vs sesudah: jalankan terhadap checkout lain dari backend
+    git worktree add /tmp/ronaai-before <commit>
+    python -m benchmarks.bench_db --app-dir /tmp/ronaai-before/backend --output reports/db_before.json
+    python -m benchmarks.bench_db --output reports/db_after.json
+
+Tanpa --base-url, app dijalankan in-process lewat httpx ASGITransport dengan
+database SQLite sementara (client dan app berbagi event loop, jadi query DB
+sync yang memblokir loop ikut terukur). --app-dir memuat package app dari
+folder backend lain. Setiap user mendapat skin profile, journal dan produk,
+lalu --concurrency client menjalankan operasi acak (--read-ratio baca vs tulis)
+selama --duration detik: list/get journal, list produk, history analisis,
+skin profile, profile/me, serta create/update journal, create/update produk
+dan update skin profile. Report berisi requests/sec, persentil latency per
+operasi, error dan lag event loop (in-process).
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+
+from benchmarks.common import dispose_app_engines, migrate_app_database, percentiles, write_report
+
+API = "/api/v1"
+
+READS = {
+    "GET /journals/get-journals": lambda u: ("GET", f"{API}/journals/get-journals", {}),
+    "GET /journals/get-journal/{id}": lambda u: ("GET", f"{API}/journals/get-journal/{random.choice(u['journals'])}", {}),
+    "GET /products/get-products": lambda u: ("GET", f"{API}/products/get-products", {}),
+    "GET /analysis/history": lambda u: ("GET", f"{API}/analysis/history", {}),
+    "GET /skin/get-profile-skin": lambda u: ("GET", f"{API}/skin/get-profile-skin", {}),
+    "GET /profile/me": lambda u: ("GET", f"{API}/profile/me", {}),
+}
+WRITES = {
+    "POST /journals/create-journal": lambda u: ("POST", f"{API}/journals/create-journal", {"json": {
+        "title": "Bench", "content": f"Skin felt {random.choice(['dry', 'oily', 'calm', 'irritated'])} today.",
+    }}),
+    "PUT /journals/update-journal/{id}": lambda u: ("PUT", f"{API}/journals/update-journal/{random.choice(u['journals'])}", {"json": {
+        "title": "Bench (edited)", "content": f"Updated note {uuid.uuid4().hex[:6]}.",
+    }}),
+    "POST /products/create-product": lambda u: ("POST", f"{API}/products/create-product", {"json": {
+        "product_name": f"Cleanser {uuid.uuid4().hex[:6]}", "product_category": "Cleanser", "ai_recommendation": False,
+    }}),
+    "PUT /products/update-product/{id}": lambda u: ("PUT", f"{API}/products/update-product/{random.choice(u['products'])}", {"json": {
+        "product_name": "Moisturizer", "product_category": "Moisturizer", "ai_recommendation": True,
+    }}),
+    "PUT /skin/update-skin-profile": lambda u: ("PUT", f"{API}/skin/update-skin-profile", {"json": {
+        "skin_type": random.choice(["Oily", "Dry", "Combination"]), "concerns": ["Acne", "Dark Spots"],
+    }}),
+}
+
+
+async def _setup_user(client, index, journals, products):
+    response = await client.post(f"{API}/auth/register", json={
+        "name": f"Bench {index}", "email": f"bench-{index}-{uuid.uuid4().hex[:8]}@example.com",
+        "country": "Indonesia", "password": "BenchPassw0rd",
+    })
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    user = {"headers": headers, "journals": [], "products": []}
+
+    response = await client.post(f"{API}/skin/create-profile-skin", headers=headers, json={"skin_type": "Combination", "concerns": ["Acne"]})
+    response.raise_for_status()
+    for i in range(journals):
+        response = await client.post(f"{API}/journals/create-journal", headers=headers, json={"title": f"Day {i}", "content": "Cheeks a bit dry."})
+        response.raise_for_status()
+        user["journals"].append(response.json()["data"]["id"])
+    for i in range(products):
+        response = await client.post(f"{API}/products/create-product", headers=headers, json={
+            "product_name": f"Serum {i}", "product_category": "Serum", "ai_recommendation": True,
+        })
+        response.raise_for_status()
+        user["products"].append(response.json()["data"]["id"])
+    return user
+
+
+async def _loop_lag(stop, interval=0.01):
+    lags = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - start - interval) * 1000)
+    return lags
+
+
+async def _client(client, users, args, deadline, latencies, statuses, errors):
+    while time.perf_counter() < deadline:
+        user = random.choice(users)
+        table = READS if random.random() < args.read_ratio else WRITES
+        name = random.choice(list(table))
+        method, url, kwargs = table[name](user)
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, headers=user["headers"], **kwargs)
+            status = str(response.status_code)
+            if response.status_code >= 400:
+                errors[name][f"{response.status_code}: {response.text[:120]}"] += 1
+        except Exception as e:
+            status = "exception"
+            errors[name][f"{type(e).__name__}: {str(e)[:120]}"] += 1
+        latencies[name].append((time.perf_counter() - started) * 1000)
+        statuses[name][status] += 1
+
+
+async def run(args):
+    import httpx
+
+    random.seed(args.seed)
+    if args.base_url:
+        transport, base_url = None, args.base_url
+    else:
+        from app.main import app
+
+        migrate_app_database()
+        transport, base_url = httpx.ASGITransport(app=app), "http://bench-db"
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        setup_started = time.perf_counter()
+        users = []
+        for start in range(0, args.users, 10):
+            users.extend(await asyncio.gather(*[
+                _setup_user(client, index, args.journals_per_user, args.products_per_user)
+                for index in range(start, min(start + 10, args.users))
+            ]))
+        setup_s = time.perf_counter() - setup_started
+
+        latencies, statuses, errors = defaultdict(list), defaultdict(Counter), defaultdict(Counter)
+        stop = asyncio.Event()
+        lag_task = asyncio.create_task(_loop_lag(stop)) if not args.base_url else None
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*[
+            _client(client, users, args, deadline, latencies, statuses, errors) for _ in range(args.concurrency)
+        ])
+        wall_s = time.perf_counter() - started
+        stop.set()
+        lags = await lag_task if lag_task else None
+    if not args.base_url:
+        await dispose_app_engines()
+
+    total = sum(len(values) for values in latencies.values())
+    failed = sum(count for counter in statuses.values() for status, count in counter.items() if not status.startswith("2"))
+    report = {
+        "config": {
+            "app_dir": args.app_dir,
+            "base_url": args.base_url,
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "read_ratio": args.read_ratio,
+        },
+        "setup_s": round(setup_s, 2),
+        "wall_time_s": round(wall_s, 2),
+        "requests": total,
+        "requests_per_second": round(total / wall_s, 1),
+        "error_rate": round(failed / total, 4) if total else None,
+        "latency_ms": percentiles(value for values in latencies.values() for value in values),
+        "event_loop_lag_ms": percentiles(lags) if lags else None,
+        "operations": {
+            name: {
+                "requests": len(values),
+                "latency_ms": percentiles(values),
+                "statuses": dict(statuses[name]),
+                "errors": dict(errors[name].most_common(5)),
+            }
+            for name, values in sorted(latencies.items())
+        },
+    }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mixed read/write throughput of the CRUD endpoints")
+    parser.add_argument("--concurrency", type=int, default=50, help="Client bersamaan")
+    parser.add_argument("--duration", type=float, default=20.0, help="Detik fase beban campuran")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--journals-per-user", type=int, default=10)
+    parser.add_argument("--products-per-user", type=int, default=5)
+    parser.add_argument("--read-ratio", type=float, default=0.8)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--app-dir", default=None, help="Folder backend lain (mis. git worktree commit lama)")
+    parser.add_argument("--base-url", default=None, help="Uji server yang sudah berjalan, bukan app in-process")
+    parser.add_argument("--output", default=None, help="Path file JSON (default: stdout)")
+    args = parser.parse_args()
+
+    # Log app ke stderr agar stdout hanya berisi report JSON
+    stdout, sys.stdout = sys.stdout, sys.stderr
+
+    with tempfile.TemporaryDirectory(prefix="ronaai-bench-db-") as workdir:
+        backend_dir = os.getcwd()
+        if not args.base_url:
+            # Settings dibaca saat import app, jadi environment diatur lebih dulu
+            os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+            os.environ["ONNX_PERSIST_OPTIMIZED_MODEL"] = "false"
+            os.environ["PREDICTION_CACHE_DB_PATH"] = ""
+            sys.path.insert(0, os.path.abspath(args.app_dir) if args.app_dir else backend_dir)
+            os.chdir(workdir)
+            os.makedirs("uploads", exist_ok=True)
+
+        report = asyncio.run(run(args))
+        os.chdir(backend_dir)
+
+    sys.stdout = stdout
+    write_report(report, args.output)
@@ -0,0 +1,176 @@
+"""
+Ukuran payload, data yang dibaca dari database dan latency per halaman
+GET /analysis/history per view (full vs summary vs summary + fields).
+
+    python -m benchmarks.bench_history_views
+    python -m benchmarks.bench_history_views --analyses 2000 --limit 20 --output reports/history_views.json
+
+App dijalankan in-process (SQLite sementara yang dimigrasi). Satu user diisi
+--analyses analisis dengan isi realistis: concerns/recommendations dari
+contoh respons Gemini (app/services/resultResponse.json) dan --products
+skincare_products dengan teks sepanjang contoh tersebut. Untuk setiap view
+diukur byte response JSON, byte nilai kolom yang dikembalikan database
+(SELECT halaman dijalankan ulang lewat engine sync) dan persentil latency.
+
+Keluar dengan status 1 jika payload view summary tidak minimal
+--min-reduction kali lebih kecil dari view full.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+from benchmarks.check_query_plans import QueryRecorder
+from benchmarks.common import dispose_app_engines, migrate_app_database, percentiles, write_report
+
+API = "/api/v1"
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app", "services", "resultResponse.json")
+VIEWS = {
+    "full": {"view": "full"},
+    "summary": {"view": "summary"},
+    "summary+recommendations": {"view": "summary", "fields": "recommendations"},
+}
+
+
+def sample_result(rng, sample, products):
+    recommendations = sample["recommendations"]
+    result = {**sample}
+    result["analysis_metrics"] = {**sample["analysis_metrics"], "overall_score": rng.randint(0, 100)}
+    result["skincare_products"] = [
+        {
+            "title": f"{recommendations[i % len(recommendations)]['title']} {i + 1}",
+            "description": recommendations[i % len(recommendations)]["description"],
+            "priority": recommendations[i % len(recommendations)]["priority"],
+            "price": f"Rp{rng.randint(50, 500)}.000",
+            "how_to_use": recommendations[(i + 1) % len(recommendations)]["description"],
+            "benefits": recommendations[(i + 2) % len(recommendations)]["description"],
+            "side_effects": "Mild dryness or irritation during the first weeks; reduce frequency if it persists.",
+            "dosage": "Once daily at night, a pea-sized amount for the whole face.",
+        }
+        for i in range(products)
+    ]
+    return result
+
+
+def seed_analyses(user_id, count, products, seed):
+    from app.db.database import SessionLocal
+    from app.models.analysis import Analysis
+
+    rng = random.Random(seed)
+    with open(SAMPLE_PATH, "r", encoding="utf-8") as f:
+        sample = json.load(f)
+    db = SessionLocal()
+    try:
+        for offset in range(0, count, 500):
+            db.add_all([
+                Analysis(user_id=user_id, image_url=f"http://bench/uploads/skin-images/{user_id}_{i}.jpg", **sample_result(rng, sample, products))
+                for i in range(offset, min(offset + 500, count))
+            ])
+            db.commit()
+        return len(json.dumps(sample_result(rng, sample, products)))
+    finally:
+        db.close()
+
+
+def db_bytes(engine, queries):
+    """Total byte nilai kolom yang dikembalikan SELECT halaman (teks JSON dihitung apa adanya)"""
+    total = 0
+    with engine.connect() as conn:
+        for query in queries:
+            for row in conn.exec_driver_sql(query["sql"], tuple(query["parameters"] or ())):
+                total += sum(len(value) if isinstance(value, (str, bytes)) else 8 for value in row if value is not None)
+    return total
+
+
+async def run(args):
+    import httpx
+
+    from app.db.database import async_engine, engine
+    from app.main import app
+
+    migrate_app_database()
+    recorder = QueryRecorder([async_engine.sync_engine])
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench-history", timeout=120) as client:
+        response = await client.post(f"{API}/auth/register", json={
+            "name": "History", "email": f"history-{uuid.uuid4().hex[:8]}@example.com",
+            "country": "Indonesia", "password": "HistPassw0rd",
+        })
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        user_id = (await client.get(f"{API}/profile/me", headers=headers)).json()["data"]["id"]
+        row_bytes = await asyncio.to_thread(seed_analyses, user_id, args.analyses, args.products, args.seed)
+
+        results = {}
+        for name, params in VIEWS.items():
+            params = {**params, "limit": args.limit, "include_total": "false"}
+            recorder.queries = []
+            recorder.label = name
+            response = await client.get(f"{API}/analysis/history", headers=headers, params=params)
+            recorder.label = None
+            response.raise_for_status()
+            page_queries = [query for query in recorder.queries if "FROM analyses" in query["sql"]]
+
+            latencies = []
+            for _ in range(args.requests):
+                started = time.perf_counter()
+                (await client.get(f"{API}/analysis/history", headers=headers, params=params)).raise_for_status()
+                latencies.append((time.perf_counter() - started) * 1000)
+            results[name] = {
+                "params": params,
+                "response_bytes": len(response.content),
+                "db_bytes": db_bytes(engine, page_queries),
+                "latency_ms": percentiles(latencies),
+            }
+    await dispose_app_engines()
+
+    full, summary = results["full"], results["summary"]
+    return {
+        "config": {"analyses": args.analyses, "products": args.products, "limit": args.limit, "requests": args.requests},
+        "analysis_json_bytes": row_bytes,
+        "views": results,
+        "summary_vs_full": {
+            "response_bytes_reduction": round(full["response_bytes"] / summary["response_bytes"], 1),
+            "db_bytes_reduction": round(full["db_bytes"] / summary["db_bytes"], 1) if summary["db_bytes"] else None,
+            "latency_p50_speedup": round(full["latency_ms"]["p50"] / summary["latency_ms"]["p50"], 2),
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Payload and DB bytes per /analysis/history page by view")
+    parser.add_argument("--analyses", type=int, default=500)
+    parser.add_argument("--products", type=int, default=5, help="skincare_products per analisis (PRODUCT_CATALOG_TOP_K)")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=50, help="Request per view untuk latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-reduction", type=float, default=5.0, help="Payload full / summary minimal")
+    parser.add_argument("--output", default=None, help="Path file JSON (default: stdout)")
+    args = parser.parse_args()
+
+    # Log app ke stderr agar stdout hanya berisi report JSON
+    stdout, sys.stdout = sys.stdout, sys.stderr
+
+    with tempfile.TemporaryDirectory(prefix="ronaai-bench-history-") as workdir:
+        backend_dir = os.getcwd()
+        # Settings dibaca saat import app, jadi environment diatur lebih dulu
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'history.db')}"
+        os.environ["ONNX_PERSIST_OPTIMIZED_MODEL"] = "false"
+        os.environ["PREDICTION_CACHE_DB_PATH"] = ""
+        sys.path.insert(0, backend_dir)
+        os.chdir(workdir)
+        os.makedirs("uploads", exist_ok=True)
+
+        report = asyncio.run(run(args))
+        os.chdir(backend_dir)
+
+    sys.stdout = stdout
+    write_report(report, args.output)
+    if report["summary_vs_full"]["response_bytes_reduction"] < args.min_reduction:
+        print("❌ Summary view is not much smaller than the full view", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,177 @@
+"""
+Benchmark pipeline klasifikasi di app/services/load_model.py.
+
+Setiap tahap diukur terpisah:
+  - preprocess            : decode + resize + normalize, per ukuran gambar
+  - session_run           : ONNX session.run, per jumlah thread x batch size
+  - postprocess           : postprocess_batch, per batch size
+  - visualize_prediction  : render gambar klasifikasi, per ukuran gambar
+
+    python -m benchmarks.bench_inference --output reports/inference.json
+    python -m benchmarks.bench_inference --synthetic --threads 1 2 4 --batch-sizes 1 8 32
+
+Jika saved_models/skin_detection_ensemble.onnx tidak ada, model sintetis
+dibuat otomatis (lihat benchmarks/synthetic_model.py).
+"""
+import argparse
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import percentiles, write_report
+from benchmarks.synthetic_model import build_synthetic_model, synthetic_image_bytes
+
+
+def _timed(fn, iterations, warmup):
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def _summary(latencies, items_per_call=1):
+    summary = {"latency_ms": percentiles(latencies)}
+    total_s = sum(latencies) / 1000
+    summary["images_per_sec"] = round(len(latencies) * items_per_call / total_s, 2) if total_s else None
+    return summary
+
+
+def _parse_size(value):
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def run(model_path, image_sizes, batch_sizes, thread_counts, iterations, warmup, workdir):
+    from app.core.config import settings
+    from app.services.load_model import (
+        METADATA_JSON,
+        ProductionONNXEnsembleModel,
+        get_model_cache,
+        resolve_session_profile,
+        visualize_prediction,
+    )
+
+    # Jangan menulis graph teroptimasi (model sintetis / per thread count) ke saved_models
+    settings.ONNX_PERSIST_OPTIMIZED_MODEL = False
+
+    images = {f"{w}x{h}": synthetic_image_bytes(w, h, seed=i) for i, (w, h) in enumerate(image_sizes)}
+    report = {
+        "model": {"path": model_path},
+        "environment": {
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "onnxruntime": __import__("onnxruntime").__version__,
+            "numpy": np.__version__,
+            "session_profile": settings.ONNX_SESSION_PROFILE,
+        },
+        "iterations": iterations,
+        "preprocess": {},
+        "session_run": {},
+        "postprocess": {},
+        "visualize_prediction": {},
+    }
+
+    base_model = ProductionONNXEnsembleModel(model_path, METADATA_JSON, warmup_batch_sizes=[])
+    report["model"].update({
+        "input_shape": base_model.input_shape,
+        "outputs": base_model.output_names,
+        "classes": len(base_model.classes),
+    })
+    target_width, target_height = base_model.target_size()
+
+    # 1. Preprocess per ukuran gambar
+    for label, data in images.items():
+        buffer = base_model.input_buffer()
+        report["preprocess"][label] = _summary(
+            _timed(lambda: base_model.preprocess_image(data, out=buffer), iterations, warmup)
+        )
+
+    # 2. session.run per thread count x batch size
+    model_limit = base_model.max_batch_size()
+    usable_batches = [b for b in batch_sizes if model_limit is None or b <= model_limit]
+    outputs_by_batch = {}
+    for threads in thread_counts:
+        profile = resolve_session_profile()
+        profile.update(intra_op_threads=threads, name=f"{profile['name']}-t{threads}")
+        model = ProductionONNXEnsembleModel(model_path, METADATA_JSON, session_profile=profile, warmup_batch_sizes=[])
+        results = {}
+        for batch_size in usable_batches:
+            batch = np.random.rand(batch_size, target_height, target_width, 3).astype(np.float32)
+            results[f"batch={batch_size}"] = _summary(
+                _timed(lambda: model.run_batch(batch), iterations, warmup), items_per_call=batch_size
+            )
+            outputs_by_batch[batch_size] = model.run_batch(batch)
+        report["session_run"][f"threads={threads}"] = results
+        del model
+
+    # 3. Post-processing per batch size
+    for batch_size, outputs in outputs_by_batch.items():
+        report["postprocess"][f"batch={batch_size}"] = _summary(
+            _timed(lambda: base_model.postprocess_batch(outputs), iterations, warmup), items_per_call=batch_size
+        )
+
+    # 4. visualize_prediction memakai ModelCache; arahkan ke model benchmark tanpa cache/batcher
+    settings.PREDICTION_CACHE_ENABLED = False
+    settings.INFERENCE_BATCHING_ENABLED = False
+    get_model_cache().swap_model(base_model)
+    for label, data in images.items():
+        source_path = os.path.join(workdir, f"source_{label}.jpg")
+        with open(source_path, "wb") as f:
+            f.write(data)
+        saved_path = os.path.join(workdir, f"classify_{label}.png")
+        latencies = _timed(
+            lambda: visualize_prediction(source_path, saved_path, image_bytes=data),
+            max(1, iterations // 4), min(warmup, 1),
+        )
+        entry = _summary(latencies)
+        entry["output_bytes"] = os.path.getsize(saved_path) if os.path.exists(saved_path) else None
+        report["visualize_prediction"][label] = entry
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ONNX skin classifier pipeline")
+    parser.add_argument("--model", default=None, help="Path model ONNX (default: varian dari Settings)")
+    parser.add_argument("--synthetic", action="store_true", help="Selalu pakai model sintetis")
+    parser.add_argument("--image-sizes", nargs="+", default=["640x480", "1920x1080", "4032x3024"])
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 4, 8, 16])
+    parser.add_argument("--threads", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--output", default=None, help="Path file JSON (default: stdout)")
+    args = parser.parse_args()
+
+    # Log model ke stderr agar stdout hanya berisi report JSON
+    stdout, sys.stdout = sys.stdout, sys.stderr
+
+    from app.services.load_model import model_variant_path
+
+    with tempfile.TemporaryDirectory(prefix="ronaai-bench-") as workdir:
+        model_path = args.model or model_variant_path()
+        synthetic = args.synthetic or not os.path.exists(model_path)
+        if synthetic:
+            model_path = build_synthetic_model(os.path.join(workdir, "synthetic.onnx"))
+            print(f"🧪 Using synthetic model: {model_path}")
+
+        report = run(
+            model_path,
+            [_parse_size(size) for size in args.image_sizes],
+            args.batch_sizes,
+            args.threads,
+            args.iterations,
+            args.warmup,
+            workdir,
+        )
+        report["model"]["synthetic"] = synthetic
+
+    sys.stdout = stdout
+    write_report(report, args.output)
@@ -0,0 +1,188 @@
+"""
+Latency halaman list per kedalaman: offset (?skip=N) vs cursor (?cursor=..).
+
+    python -m benchmarks.bench_pagination
+    python -m benchmarks.bench_pagination --items 20000 --depths 0,1000,10000,19000 --output reports/pagination.json
+
+App dijalankan in-process (SQLite sementara yang dimigrasi). Satu user diisi
+--items analisis, journal dan produk langsung lewat ORM, lalu untuk setiap
+kedalaman halaman diambil --requests kali dengan kedua mode. Cursor untuk
+kedalaman N diambil dari next_cursor halaman offset tepat sebelumnya, jadi
+kedua mode mengembalikan item yang sama. Selain itu diukur biaya
+include_total dengan cache counter (hit) dan tanpa cache (count() per
+halaman, seperti sebelum paginasi cursor).
+
+Keluar dengan status 1 jika p50 cursor di kedalaman terdalam lebih dari
+--max-depth-ratio kali p50 halaman pertama.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from benchmarks.common import dispose_app_engines, migrate_app_database, percentiles, write_report
+
+API = "/api/v1"
+LISTS = {
+    "analyses": "/analysis/history",
+    "journals": "/journals/get-journals",
+    "products": "/products/get-products",
+}
+
+
+def seed_items(user_id, items, seed):
+    """Isi tabel langsung (bulk) dengan created_at berurutan, beberapa di detik yang sama"""
+    from app.db.database import SessionLocal
+    from app.models.analysis import Analysis
+    from app.models.journals import Journals
+    from app.models.products import Products
+    from app.services.fake_agent import fake_analysis
+
+    rng = random.Random(seed)
+    start = datetime.utcnow() - timedelta(seconds=items)
+    db = SessionLocal()
+    try:
+        for offset in range(0, items, 1000):
+            batch = range(offset, min(offset + 1000, items))
+            result = fake_analysis(rng).model_dump()
+            db.add_all([
+                Analysis(
+                    user_id=user_id, image_url=f"http://bench/uploads/skin-images/{user_id}_{i}.jpg",
+                    **{field: result[field] for field in ("overall_health", "skin_type", "concerns", "recommendations", "analysis_metrics", "skincare_products")},
+                    created_at=start + timedelta(seconds=i // 3),
+                )
+                for i in batch
+            ])
+            db.add_all([
+                Journals(user_id=user_id, title=f"Day {i}", content="Cheeks dry, forehead oily.", created_at=start + timedelta(seconds=i // 3))
+                for i in batch
+            ])
+            db.add_all([
+                Products(user_id=user_id, product_name=f"Serum {i}", product_category="Serum", ai_recommendation=False, created_at=start + timedelta(seconds=i // 3))
+                for i in batch
+            ])
+            db.commit()
+    finally:
+        db.close()
+
+
+async def _measure(client, headers, url, params, requests, before=None):
+    latencies = []
+    items = None
+    for _ in range(requests):
+        if before:
+            before()
+        started = time.perf_counter()
+        response = await client.get(url, headers=headers, params=params)
+        latencies.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+        items = [item["id"] for item in response.json()["data"]["items"]]
+    return percentiles(latencies), items
+
+
+async def run(args):
+    import httpx
+
+    from app.main import app
+    from app.services.item_counts import item_counts
+
+    migrate_app_database()
+    depths = [int(depth) for depth in args.depths.split(",")]
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench-pagination", timeout=120) as client:
+        response = await client.post(f"{API}/auth/register", json={
+            "name": "Pagination", "email": f"pagination-{uuid.uuid4().hex[:8]}@example.com",
+            "country": "Indonesia", "password": "PagePassw0rd",
+        })
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        user_id = (await client.get(f"{API}/profile/me", headers=headers)).json()["data"]["id"]
+
+        seed_started = time.perf_counter()
+        await asyncio.to_thread(seed_items, user_id, args.items, args.seed)
+        seed_s = time.perf_counter() - seed_started
+
+        results = {}
+        for kind, path in LISTS.items():
+            url = f"{API}{path}"
+            rows = []
+            for depth in depths:
+                offset_latency, offset_items = await _measure(
+                    client, headers, url, {"skip": depth, "limit": args.limit, "include_total": "false"}, args.requests,
+                )
+                if depth:
+                    # next_cursor halaman sebelumnya menunjuk tepat ke kedalaman ini
+                    previous = (await client.get(url, headers=headers, params={"skip": depth - args.limit, "limit": args.limit, "include_total": "false"})).json()["data"]
+                    cursor_params = {"cursor": previous["next_cursor"], "limit": args.limit}
+                else:
+                    cursor_params = {"limit": args.limit, "include_total": "false"}
+                cursor_latency, cursor_items = await _measure(client, headers, url, cursor_params, args.requests)
+                rows.append({
+                    "depth": depth,
+                    "offset_ms": offset_latency,
+                    "cursor_ms": cursor_latency,
+                    "same_items": offset_items == cursor_items,
+                })
+
+            total_cached, _ = await _measure(client, headers, url, {"limit": args.limit, "include_total": "true"}, args.requests)
+            total_uncached, _ = await _measure(
+                client, headers, url, {"limit": args.limit, "include_total": "true"}, args.requests, before=item_counts.clear,
+            )
+            first, deepest = rows[0]["cursor_ms"]["p50"], rows[-1]["cursor_ms"]["p50"]
+            results[kind] = {
+                "pages": rows,
+                "include_total_ms": {"cached": total_cached, "uncached": total_uncached},
+                "cursor_depth_ratio": round(deepest / first, 2) if first else None,
+                "offset_depth_ratio": round(rows[-1]["offset_ms"]["p50"] / rows[0]["offset_ms"]["p50"], 2) if rows[0]["offset_ms"]["p50"] else None,
+            }
+    await dispose_app_engines()
+
+    return {
+        "config": {"items": args.items, "depths": depths, "limit": args.limit, "requests": args.requests},
+        "seed_s": round(seed_s, 2),
+        "lists": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Page latency by depth: offset vs cursor pagination")
+    parser.add_argument("--items", type=int, default=5000, help="Analisis, journal dan produk untuk satu user")
+    parser.add_argument("--depths", default="0,100,1000,4900", help="Kedalaman halaman (jumlah item yang dilewati)")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=30, help="Request per titik pengukuran")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-depth-ratio", type=float, default=2.0, help="Batas p50 cursor terdalam / halaman pertama")
+    parser.add_argument("--output", default=None, help="Path file JSON (default: stdout)")
+    args = parser.parse_args()
+
+    # Log app ke stderr agar stdout hanya berisi report JSON
+    stdout, sys.stdout = sys.stdout, sys.stderr
+
+    with tempfile.TemporaryDirectory(prefix="ronaai-bench-pagination-") as workdir:
+        backend_dir = os.getcwd()
+        # Settings dibaca saat import app, jadi environment diatur lebih dulu
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'pagination.db')}"
+        os.environ["ONNX_PERSIST_OPTIMIZED_MODEL"] = "false"
+        os.environ["PREDICTION_CACHE_DB_PATH"] = ""
+        sys.path.insert(0, backend_dir)
+        os.chdir(workdir)
+        os.makedirs("uploads", exist_ok=True)
+
+        report = asyncio.run(run(args))
+        os.chdir(backend_dir)
+
+    sys.stdout = stdout
+    write_report(report, args.output)
+    failed = [
+        kind for kind, result in report["lists"].items()
+        if not all(page["same_items"] for page in result["pages"])
+        or (result["cursor_depth_ratio"] or 0) > args.max_depth_ratio
+    ]
+    if failed:
+        print(f"❌ Cursor pagination slower at depth or inconsistent with offset: {failed}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,98 @@
+"""
+Bandingkan renderer gambar klasifikasi: Pillow (default) vs matplotlib.
+
+    python -m benchmarks.bench_renderer
+    python -m benchmarks.bench_renderer --image-sizes 1920x1080 4032x3024 --format jpg --output reports/renderer.json
+
+Prediksi di-cache (PredictionCache) setelah panggilan pertama, sehingga yang
+terukur hanya decode + render + encode. Report berisi persentil latency,
+ukuran file output, dan dimensi gambar per renderer.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from PIL import Image
+
+from benchmarks.bench_inference import _parse_size, _summary, _timed
+from benchmarks.common import write_report
+from benchmarks.synthetic_model import build_synthetic_model, synthetic_image_bytes
+
+
+def run(model_path, image_sizes, renderers, output_format, iterations, warmup, workdir):
+    from app.core.config import settings
+    from app.services.load_model import METADATA_JSON, ProductionONNXEnsembleModel, get_model_cache, visualize_prediction
+
+    settings.ONNX_PERSIST_OPTIMIZED_MODEL = False
+    settings.INFERENCE_BATCHING_ENABLED = False
+    settings.PREDICTION_CACHE_ENABLED = True
+    settings.PREDICTION_CACHE_DB_PATH = None
+    get_model_cache().swap_model(ProductionONNXEnsembleModel(model_path, METADATA_JSON, warmup_batch_sizes=[]))
+
+    report = {
+        "format": output_format,
+        "visualization_height": settings.VISUALIZATION_HEIGHT,
+        "iterations": iterations,
+        "renderers": {renderer: {} for renderer in renderers},
+    }
+    for i, (width, height) in enumerate(image_sizes):
+        label = f"{width}x{height}"
+        data = synthetic_image_bytes(width, height, seed=i)
+        source_path = os.path.join(workdir, f"source_{label}.jpg")
+        with open(source_path, "wb") as f:
+            f.write(data)
+        # Isi cache prediksi dulu agar hanya render yang terukur
+        get_model_cache().predict(data)
+
+        for renderer in renderers:
+            saved_path = os.path.join(workdir, f"classify_{label}_{renderer}.{output_format}")
+            latencies = _timed(
+                lambda: visualize_prediction(source_path, saved_path, image_bytes=data, renderer=renderer),
+                iterations, warmup,
+            )
+            entry = _summary(latencies)
+            entry["output_bytes"] = os.path.getsize(saved_path)
+            with Image.open(saved_path) as rendered:
+                entry["output_size"] = f"{rendered.width}x{rendered.height}"
+            report["renderers"][renderer][label] = entry
+
+    if {"pillow", "matplotlib"} <= set(renderers):
+        report["speedup"] = {
+            label: round(
+                report["renderers"]["matplotlib"][label]["latency_ms"]["p50"]
+                / report["renderers"]["pillow"][label]["latency_ms"]["p50"], 1
+            )
+            for label in report["renderers"]["pillow"]
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Pillow vs matplotlib classification renderer")
+    parser.add_argument("--image-sizes", nargs="+", default=["640x480", "1920x1080", "4032x3024"])
+    parser.add_argument("--renderers", nargs="+", choices=["pillow", "matplotlib"], default=["pillow", "matplotlib"])
+    parser.add_argument("--format", default="png", choices=["png", "jpg", "webp"])
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--output", default=None, help="Path file JSON (default: stdout)")
+    args = parser.parse_args()
+
+    # Log model ke stderr agar stdout hanya berisi report JSON
+    stdout, sys.stdout = sys.stdout, sys.stderr
+
+    with tempfile.TemporaryDirectory(prefix="ronaai-bench-") as workdir:
+        # Renderer tidak bergantung pada bobot model; model sintetis cukup
+        model_path = build_synthetic_model(os.path.join(workdir, "synthetic.onnx"))
+        report = run(
+            model_path,
+            [_parse_size(size) for size in args.image_sizes],
+            args.renderers,
+            args.format,
+            args.iterations,
+            args.warmup,
+            workdir,
+        )
+
+    sys.stdout = stdout
+    write_report(report, args.output)
@@ -0,0 +1,107 @@
+"""
+Ukur efek cache hasil tool agent (services/tool_cache.py) tanpa internet.
+
+    python -m benchmarks.bench_tool_cache
+    python -m benchmarks.bench_tool_cache --analyses 200 --tool-latency 0.3 --output reports/tool_cache.json
+
+Tool web diganti LocalSearchTools dengan latency buatan (--tool-latency).
+Setiap "analisis" simulasi memanggil search + papers untuk concern yang
+dipilih dengan distribusi Zipf (concern umum seperti acne paling sering),
+dengan variasi penulisan query (urutan kata, huruf besar, tanda baca) yang
+terjadi pada query buatan LLM. Report berisi latency tool per analisis
+tanpa cache, dengan cache, dan setelah "restart" (cache SQLite saja),
+serta hit rate per tool.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.common import percentiles, write_report
+
+CONCERNS = [
+    "acne treatment", "acne scars", "hyperpigmentation dark spots", "dry skin hydration",
+    "oily skin pores", "wrinkles anti aging", "rosacea redness", "eczema skin care",
+]
+COUNTRIES = ["Indonesia", "Malaysia", "Singapore"]
+
+
+def _query_variant(rng, query, country):
+    words = f"{query} {country}".split()
+    variant = rng.choice([
+        lambda: " ".join(words),
+        lambda: " ".join(reversed(words)),
+        lambda: ", ".join(words).title(),
+        lambda: " ".join(words).upper() + "?",
+    ])
+    return variant()
+
+
+def _workload(analyses, seed):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(CONCERNS))]
+    workload = []
+    for _ in range(analyses):
+        country = rng.choice(COUNTRIES)
+        concerns = set(rng.choices(CONCERNS, weights=weights, k=2))
+        workload.append((country, [_query_variant(rng, concern, country) for concern in concerns]))
+    return workload
+
+
+def _run(workload, toolkits, cache=None):
+    from app.services.tool_cache import country_context
+
+    search, papers = (toolkit.functions[name].entrypoint for toolkit, name in zip(toolkits, ("local_search", "local_papers")))
+    latencies = []
+    for country, queries in workload:
+        start = time.perf_counter()
+        with country_context(country):
+            for query in queries:
+                search(query=query, max_results=5)
+                papers(query=query, num_articles=3)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "analysis_tool_latency_ms": percentiles(latencies),
+        "total_s": round(sum(latencies) / 1000, 2),
+        "cache": cache.stats() if cache is not None else None,
+    }
+
+
+def run(args, workdir):
+    from app.services.local_search import search_toolkits
+    from app.services.tool_cache import ToolCache
+
+    workload = _workload(args.analyses, args.seed)
+    db_path = os.path.join(workdir, "tool_cache.db")
+
+    def toolkits():
+        return [toolkit for group in search_toolkits("local", args.tool_latency) for toolkit in group]
+
+    report = {"analyses": args.analyses, "tool_latency_s": args.tool_latency, "ttl_seconds": args.ttl}
+    report["no_cache"] = _run(workload, toolkits())
+
+    cache = ToolCache(ttl_seconds=args.ttl, max_entries=args.max_entries, db_path=db_path)
+    report["cached"] = _run(workload, [cache.wrap_toolkit(toolkit) for toolkit in toolkits()], cache)
+
+    # Proses baru: tier memori kosong, hasil diambil dari SQLite
+    restarted = ToolCache(ttl_seconds=args.ttl, max_entries=args.max_entries, db_path=db_path)
+    report["after_restart"] = _run(workload, [restarted.wrap_toolkit(toolkit) for toolkit in toolkits()], restarted)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark agent tool result cache")
+    parser.add_argument("--analyses", type=int, default=100)
+    parser.add_argument("--tool-latency", type=float, default=0.2, help="Latency buatan per panggilan tool (detik)")
+    parser.add_argument("--ttl", type=float, default=3600.0)
+    parser.add_argument("--max-entries", type=int, default=2048)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Path file JSON (default: stdout)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.getcwd())
+    with tempfile.TemporaryDirectory(prefix="ronaai-bench-") as workdir:
+        report = run(args, workdir)
+    write_report(report, args.output)
@@ -0,0 +1,318 @@
+"""
+Stress test SQLite: apakah penulisan analisis memblokir pembacaan history?
+
+    python -m benchmarks.check_db_concurrency
+    python -m benchmarks.check_db_concurrency --profile tuned --writers 16 --write-rate 200 --duration 30
+
+App dijalankan in-process (SQLite sementara). Writer thread menyimpan hasil
+analisis dengan laju tetap (--write-rate) lewat save_analysis (jalur yang sama dengan job queue
+dan SSE: insert Analysis + update skin profile + commit), sementara reader
+memanggil GET /analysis/history bersamaan. Profil:
+
+- default : pragma bawaan SQLite (journal_mode=delete, synchronous=full,
+            cache 2 MB, tanpa mmap)
+- tuned   : pragma dari Settings (SQLITE_JOURNAL_MODE=wal, dst.)
+- both    : jalankan keduanya di subprocess terpisah lalu bandingkan
+
+Profil lolos jika tidak ada error baca/tulis, p95 history tidak melebihi
+--max-read-p95-ms dan writer mampu mengikuti --write-rate (minimal
+--min-write-ratio dari target). Default workload (100 commit/detik) sengaja
+di atas kemampuan profil default: setiap commit journal_mode=delete +
+synchronous=full menunggu beberapa fsync, jadi writer tertinggal.
+
+Keluar dengan status 1 jika profil tuned gagal. Dengan --profile both juga
+jika profil default lolos (workload terlalu ringan untuk membedakan profil)
+atau commit/detik tuned kurang dari --min-improvement kali default.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+
+from benchmarks.common import dispose_app_engines, migrate_app_database, percentiles, write_report
+
+API = "/api/v1"
+
+# Pragma bawaan SQLite; busy_timeout sama dengan timeout default sqlite3 (5 detik)
+DEFAULT_PROFILE_ENV = {
+    "SQLITE_JOURNAL_MODE": "delete",
+    "SQLITE_SYNCHRONOUS": "full",
+    "SQLITE_BUSY_TIMEOUT_MS": "5000",
+    "SQLITE_CACHE_SIZE_KB": "2000",
+    "SQLITE_MMAP_SIZE_MB": "0",
+}
+
+
+def _fake_result(rng):
+    from app.services.fake_agent import fake_analysis
+
+    return fake_analysis(rng).model_dump()
+
+
+def _save(user_id, rng):
+    from app.services.analysis_pipeline import save_analysis_in_new_session
+
+    save_analysis_in_new_session(user_id, f"http://bench/uploads/skin-images/{user_id}_{uuid.uuid4().hex}.jpg", _fake_result(rng))
+
+
+def _writer(user_ids, stop, seed, interval, latencies, errors):
+    """Simpan analisis tiap `interval` detik (laju tetap: kedua profil melakukan kerja yang sama)"""
+    rng = random.Random(seed)
+    next_at = time.perf_counter()
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            _save(rng.choice(user_ids), rng)
+        except Exception as e:
+            errors[f"{type(e).__name__}: {str(e)[:120]}"] += 1
+        latencies.append((time.perf_counter() - started) * 1000)
+        next_at += interval
+        stop.wait(max(0.0, next_at - time.perf_counter()))
+
+
+async def _reader(client, users, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        headers = random.choice(users)["headers"]
+        started = time.perf_counter()
+        try:
+            response = await client.get(f"{API}/analysis/history", headers=headers)
+            if response.status_code != 200:
+                errors[f"{response.status_code}: {response.text[:120]}"] += 1
+        except Exception as e:
+            errors[f"{type(e).__name__}: {str(e)[:120]}"] += 1
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def _loop_lag(stop, interval=0.01):
+    lags = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - start - interval) * 1000)
+    return lags
+
+
+async def run(args):
+    import httpx
+    from sqlalchemy import text
+
+    from app.db.database import engine
+    from app.main import app
+
+    migrate_app_database()
+
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://db-check", timeout=120) as client:
+        users = []
+        for index in range(args.users):
+            response = await client.post(f"{API}/auth/register", json={
+                "name": f"Stress {index}", "email": f"stress-{index}-{uuid.uuid4().hex[:8]}@example.com",
+                "country": "Indonesia", "password": "StressPassw0rd",
+            })
+            response.raise_for_status()
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            me = (await client.get(f"{API}/profile/me", headers=headers)).json()["data"]
+            users.append({"id": me["id"], "headers": headers})
+        user_ids = [user["id"] for user in users]
+        for _ in range(args.users * args.analyses_per_user):
+            await asyncio.to_thread(_save, rng.choice(user_ids), rng)
+
+        with engine.connect() as conn:
+            pragmas = {
+                name: conn.execute(text(f"PRAGMA {name}")).scalar()
+                for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size")
+            }
+
+        # Baseline baca tanpa writer
+        idle_latencies, idle_errors = [], Counter()
+        await asyncio.gather(*[
+            _reader(client, users, time.perf_counter() + args.idle_seconds, idle_latencies, idle_errors)
+            for _ in range(args.readers)
+        ])
+
+        read_latencies, read_errors = [], Counter()
+        write_latencies, write_errors = [], Counter()
+        stop_writers = threading.Event()
+        writers = [
+            threading.Thread(
+                target=_writer,
+                args=(user_ids, stop_writers, args.seed + i, args.writers / args.write_rate, write_latencies, write_errors),
+                daemon=True,
+            )
+            for i in range(args.writers)
+        ]
+        stop_lag = asyncio.Event()
+        lag_task = asyncio.create_task(_loop_lag(stop_lag))
+        for writer in writers:
+            writer.start()
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            _reader(client, users, started + args.duration, read_latencies, read_errors) for _ in range(args.readers)
+        ])
+        wall_s = time.perf_counter() - started
+        stop_writers.set()
+        for writer in writers:
+            await asyncio.to_thread(writer.join)
+        stop_lag.set()
+        lags = await lag_task
+    await dispose_app_engines()
+
+    return {
+        "profile": args.profile,
+        "pragmas": pragmas,
+        "config": {
+            "users": args.users,
+            "analyses_per_user": args.analyses_per_user,
+            "readers": args.readers,
+            "writers": args.writers,
+            "write_rate": args.write_rate,
+            "duration_s": args.duration,
+        },
+        "reads_idle": {
+            "requests": len(idle_latencies),
+            "errors": sum(idle_errors.values()),
+            "latency_ms": percentiles(idle_latencies),
+        },
+        "reads_during_writes": {
+            "requests": len(read_latencies),
+            "requests_per_second": round(len(read_latencies) / wall_s, 1),
+            "errors": sum(read_errors.values()),
+            "error_samples": dict(read_errors.most_common(5)),
+            "latency_ms": percentiles(read_latencies),
+        },
+        "writes": {
+            "commits": len(write_latencies) - sum(write_errors.values()),
+            "commits_per_second": round((len(write_latencies) - sum(write_errors.values())) / wall_s, 1),
+            "errors": sum(write_errors.values()),
+            "error_samples": dict(write_errors.most_common(5)),
+            "latency_ms": percentiles(write_latencies),
+        },
+        "event_loop_lag_ms": percentiles(lags),
+    }
+
+
+def run_profile(args):
+    """Jalankan satu profil in-process (environment diatur sebelum import app)"""
+    with tempfile.TemporaryDirectory(prefix="ronaai-db-check-") as workdir:
+        backend_dir = os.getcwd()
+        # Settings dibaca saat import app, jadi environment diatur lebih dulu
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'stress.db')}"
+        os.environ["ONNX_PERSIST_OPTIMIZED_MODEL"] = "false"
+        os.environ["PREDICTION_CACHE_DB_PATH"] = ""
+        if args.profile == "default":
+            os.environ.update(DEFAULT_PROFILE_ENV)
+        sys.path.insert(0, backend_dir)
+        os.chdir(workdir)
+        os.makedirs("uploads", exist_ok=True)
+
+        report = asyncio.run(run(args))
+        os.chdir(backend_dir)
+    return report
+
+
+def run_both(args):
+    """Setiap profil di subprocess sendiri: engine dan Settings dibuat sekali per proses"""
+    reports = {}
+    with tempfile.TemporaryDirectory(prefix="ronaai-db-check-") as workdir:
+        for profile in ("default", "tuned"):
+            output = os.path.join(workdir, f"{profile}.json")
+            command = [sys.executable, "-m", "benchmarks.check_db_concurrency", "--profile", profile, "--output", output]
+            for name in ("users", "analyses_per_user", "readers", "writers", "write_rate", "duration", "idle_seconds", "seed"):
+                command += [f"--{name.replace('_', '-')}", str(getattr(args, name))]
+            # Status keluar diabaikan: ambang dicek di proses induk
+            subprocess.run(command)
+            if not os.path.exists(output):
+                raise RuntimeError(f"Profile {profile} failed without a report")
+            with open(output) as f:
+                reports[profile] = json.load(f)
+
+    reports["comparison"] = {
+        profile: {
+            # p95 baca saat ada writer dibanding tanpa writer: 1.0 = tidak terganggu
+            "read_p95_inflation": _ratio(
+                reports[profile]["reads_during_writes"]["latency_ms"]["p95"], reports[profile]["reads_idle"]["latency_ms"]["p95"],
+            ),
+            "read_errors": reports[profile]["reads_during_writes"]["errors"],
+            "write_p95_ms": reports[profile]["writes"]["latency_ms"]["p95"],
+            "commits_per_second": reports[profile]["writes"]["commits_per_second"],
+            "failures": profile_failures(reports[profile], args),
+        }
+        for profile in ("default", "tuned")
+    }
+    reports["comparison"]["tuned_vs_default"] = {
+        "commits_per_second": _ratio(reports["tuned"]["writes"]["commits_per_second"], reports["default"]["writes"]["commits_per_second"]),
+        # > 1: write p95 tuned lebih rendah
+        "write_p95_speedup": _ratio(reports["default"]["writes"]["latency_ms"]["p95"], reports["tuned"]["writes"]["latency_ms"]["p95"]),
+    }
+    return reports
+
+
+def profile_failures(report, args):
+    """Alasan profil gagal pada workload ini (list kosong = lolos)"""
+    reads, writes = report["reads_during_writes"], report["writes"]
+    failures = []
+    if reads["errors"]:
+        failures.append(f"{reads['errors']} history read errors")
+    if reads["latency_ms"]["p95"] is not None and reads["latency_ms"]["p95"] > args.max_read_p95_ms:
+        failures.append(f"history read p95 {reads['latency_ms']['p95']} ms > {args.max_read_p95_ms} ms")
+    if writes["errors"]:
+        failures.append(f"{writes['errors']} analysis write errors")
+    if writes["commits_per_second"] < args.min_write_ratio * args.write_rate:
+        failures.append(f"writers reached {writes['commits_per_second']} commits/s of the {args.write_rate} target")
+    return failures
+
+
+def _ratio(value, baseline):
+    return round(value / baseline, 2) if value is not None and baseline else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that analysis writes do not stall history reads on SQLite")
+    parser.add_argument("--profile", choices=["default", "tuned", "both"], default="both")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--analyses-per-user", type=int, default=10, help="Analisis awal per user sebelum pengukuran")
+    parser.add_argument("--readers", type=int, default=5, help="Client GET /analysis/history bersamaan")
+    parser.add_argument("--writers", type=int, default=8, help="Thread yang menyimpan analisis terus-menerus")
+    parser.add_argument("--write-rate", type=float, default=100.0, help="Target commit analisis/detik (total semua writer)")
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--idle-seconds", type=float, default=3.0, help="Durasi baseline baca tanpa writer")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-read-p95-ms", type=float, default=500.0)
+    parser.add_argument("--min-write-ratio", type=float, default=0.9, help="Commit/detik minimal sebagai fraksi --write-rate")
+    parser.add_argument("--min-improvement", type=float, default=1.3, help="Commit/detik tuned / default minimal (--profile both)")
+    parser.add_argument("--output", default=None, help="Path file JSON (default: stdout)")
+    args = parser.parse_args()
+
+    if args.profile == "both":
+        report = run_both(args)
+        tuned = report["tuned"]
+    else:
+        # Log app ke stderr agar stdout hanya berisi report JSON
+        stdout, sys.stdout = sys.stdout, sys.stderr
+        report = tuned = run_profile(args)
+        sys.stdout = stdout
+
+    write_report(report, args.output)
+    if args.profile == "default":
+        sys.exit(0)
+    failures = profile_failures(tuned, args)
+    if failures:
+        print(f"❌ Tuned profile failed the workload: {'; '.join(failures)}", file=sys.stderr)
+        sys.exit(1)
+    if args.profile == "both":
+        comparison = report["comparison"]
+        if not comparison["default"]["failures"]:
+            print("❌ Default profile also passed: workload too light to compare profiles (raise --write-rate)", file=sys.stderr)
+            sys.exit(1)
+        if (comparison["tuned_vs_default"]["commits_per_second"] or 0) < args.min_improvement:
+            print(f"❌ Tuned profile is not clearly better than default: {comparison['tuned_vs_default']}", file=sys.stderr)
+            sys.exit(1)
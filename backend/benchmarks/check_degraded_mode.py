@@ -0,0 +1,177 @@
+"""
+Cek guard tahap LLM dan mode degraded end-to-end (in-process, agent palsu).
+
+    python -m benchmarks.check_degraded_mode
+    python -m benchmarks.check_degraded_mode --users 20 --outage timeout --agent-latency 1
+
+Tiga fase, masing-masing satu POST /analysis/analyze per user secara bersamaan:
+1. healthy  : agent normal, semua hasil non-provisional
+2. outage   : agent selalu error (--outage error) atau melewati
+              LLM_CALL_TIMEOUT_SECONDS (--outage timeout); circuit harus
+              terbuka dan semua request tetap 200 dengan hasil provisional.
+              Gelombang kedua (outage_open_circuit) ditolak circuit tanpa
+              memanggil agent
+3. recovery : agent normal lagi; job "upgrade" harus mengganti semua hasil
+              provisional sebelum --upgrade-timeout
+
+Report JSON berisi latency per fase, state circuit breaker dan waktu sampai
+semua analysis ter-upgrade. Keluar dengan status 1 jika ada request gagal
+saat outage atau ada analysis yang belum ter-upgrade.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+from benchmarks.common import dispose_app_engines, migrate_app_database, percentiles, write_report
+from benchmarks.synthetic_model import build_synthetic_model, synthetic_image_bytes
+
+API = "/api/v1"
+
+
+async def _register(client, index):
+    response = await client.post(f"{API}/auth/register", json={
+        "name": f"Degraded {index}", "email": f"degraded-{index}-{uuid.uuid4().hex[:8]}@example.com",
+        "country": "Indonesia", "password": "DegradedPassw0rd",
+    })
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def _analyze(client, headers, image, name):
+    started = time.perf_counter()
+    response = await client.post(f"{API}/analysis/analyze", headers=headers, files={"image": (name, image, "image/jpeg")})
+    latency_ms = (time.perf_counter() - started) * 1000
+    provisional = response.status_code == 200 and response.json()["data"]["analysis"]["provisional"]
+    return {"status": response.status_code, "latency_ms": latency_ms, "provisional": provisional}
+
+
+async def _phase(client, users, image, phase):
+    results = await asyncio.gather(*[
+        _analyze(client, headers, image, f"{phase}_{index}.jpg") for index, headers in enumerate(users)
+    ])
+    provisional = [r["latency_ms"] for r in results if r["provisional"]]
+    full = [r["latency_ms"] for r in results if r["status"] == 200 and not r["provisional"]]
+    return {
+        "requests": len(results),
+        "failed": sum(1 for r in results if r["status"] != 200),
+        "provisional": len(provisional),
+        "latency_ms": percentiles([r["latency_ms"] for r in results]),
+        "provisional_latency_ms": percentiles(provisional) if provisional else None,
+        "full_latency_ms": percentiles(full) if full else None,
+    }
+
+
+def _provisional_count():
+    from app.db.database import SessionLocal
+    from app.models.analysis import Analysis
+
+    db = SessionLocal()
+    try:
+        return db.query(Analysis).filter(Analysis.provisional.is_(True)).count()
+    finally:
+        db.close()
+
+
+async def run(args):
+    import httpx
+
+    from app.core.config import settings
+    from app.main import app
+    from app.services import analysis_pipeline, job_queue
+
+    image = synthetic_image_bytes(args.image_width, args.image_height)
+    report = {"config": vars(args).copy()}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://degraded-check", timeout=300) as client:
+        users = [await _register(client, index) for index in range(args.users)]
+
+        report["healthy"] = await _phase(client, users, image, "healthy")
+        # Nama file upload berbasis timestamp per detik
+        await asyncio.sleep(1.1)
+
+        if args.outage == "error":
+            settings.AGENT_FAKE_ERROR_RATE = 1.0
+        else:
+            settings.AGENT_FAKE_LATENCY_SECONDS = settings.LLM_CALL_TIMEOUT_SECONDS * 2
+        report["outage"] = await _phase(client, users, image, "outage")
+        await asyncio.sleep(1.1)
+        report["outage_open_circuit"] = await _phase(client, users, image, "open")
+        report["circuit_after_outage"] = analysis_pipeline.llm_stats()
+        await asyncio.sleep(1.1)
+
+        settings.AGENT_FAKE_ERROR_RATE = 0.0
+        settings.AGENT_FAKE_LATENCY_SECONDS = args.agent_latency
+        pending = await asyncio.to_thread(_provisional_count)
+        recovery_started = time.perf_counter()
+        # ASGITransport tidak menjalankan event startup: worker job dijalankan di sini
+        job_queue.start_workers()
+        try:
+            while pending and time.perf_counter() - recovery_started < args.upgrade_timeout:
+                await asyncio.sleep(0.5)
+                pending = await asyncio.to_thread(_provisional_count)
+        finally:
+            await job_queue.stop_workers()
+        report["recovery"] = {
+            "upgrade_s": round(time.perf_counter() - recovery_started, 2),
+            "still_provisional": pending,
+            "circuit": analysis_pipeline.llm_stats(),
+        }
+    await dispose_app_engines()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check LLM guard, degraded mode and provisional upgrades")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--outage", choices=["error", "timeout"], default="error")
+    parser.add_argument("--agent-latency", type=float, default=0.5)
+    parser.add_argument("--call-timeout", type=float, default=2.0, help="LLM_CALL_TIMEOUT_SECONDS")
+    parser.add_argument("--failure-threshold", type=int, default=3, help="LLM_CIRCUIT_FAILURE_THRESHOLD")
+    parser.add_argument("--reset-seconds", type=float, default=3.0, help="LLM_CIRCUIT_RESET_SECONDS")
+    parser.add_argument("--upgrade-timeout", type=float, default=120.0)
+    parser.add_argument("--image-width", type=int, default=1280)
+    parser.add_argument("--image-height", type=int, default=960)
+    parser.add_argument("--output", default=None, help="Path file JSON (default: stdout)")
+    args = parser.parse_args()
+
+    # Log app ke stderr agar stdout hanya berisi report JSON
+    stdout, sys.stdout = sys.stdout, sys.stderr
+
+    with tempfile.TemporaryDirectory(prefix="ronaai-degraded-") as workdir:
+        backend_dir = os.getcwd()
+        # Settings dibaca saat import app, jadi environment diatur lebih dulu
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'degraded.db')}"
+        os.environ["ONNX_PERSIST_OPTIMIZED_MODEL"] = "false"
+        os.environ["PREDICTION_CACHE_DB_PATH"] = ""
+        os.environ["AGENT_BACKEND"] = "fake"
+        os.environ["AGENT_FAKE_LATENCY_DISTRIBUTION"] = "fixed"
+        os.environ["AGENT_FAKE_LATENCY_SECONDS"] = str(args.agent_latency)
+        os.environ["LLM_CALL_TIMEOUT_SECONDS"] = str(args.call_timeout)
+        os.environ["LLM_CIRCUIT_FAILURE_THRESHOLD"] = str(args.failure_threshold)
+        os.environ["LLM_CIRCUIT_RESET_SECONDS"] = str(args.reset_seconds)
+        os.environ["ANALYSIS_JOB_POLL_SECONDS"] = "0.5"
+        os.environ["ANALYSIS_JOB_WORKERS"] = "2"
+        sys.path.insert(0, backend_dir)
+        os.chdir(workdir)
+        os.makedirs("uploads", exist_ok=True)
+
+        import app.main  # noqa: F401 (import app dulu: urutan import models/database)
+        migrate_app_database()
+        from app.services.load_model import METADATA_JSON, ProductionONNXEnsembleModel, get_model_cache
+
+        model_path = build_synthetic_model(os.path.join(workdir, "synthetic.onnx"))
+        get_model_cache().swap_model(ProductionONNXEnsembleModel(model_path, METADATA_JSON, warmup_batch_sizes=[1]))
+
+        report = asyncio.run(run(args))
+        os.chdir(backend_dir)
+
+    sys.stdout = stdout
+    write_report(report, args.output)
+    outage = [report["outage"], report["outage_open_circuit"]]
+    failed = any(phase["failed"] or not phase["provisional"] for phase in outage) or report["recovery"]["still_provisional"]
+    if failed:
+        print("❌ Degraded mode check failed", file=sys.stderr)
+        sys.exit(1)
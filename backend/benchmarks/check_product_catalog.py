@@ -0,0 +1,177 @@
+"""
+Cek penulisan katalog produk (services/product_catalog.py) pada SQLite sementara.
+
+    python -m benchmarks.check_product_catalog
+    python -m benchmarks.check_product_catalog --threads 16 --rounds 50
+
+Kasus:
+- duplicates : satu skincare_products berisi judul yang sama setelah
+               normalisasi ("CeraVe Cleanser", "cerave cleanser ") -> satu
+               entry per concern, skor naik sekali
+- seed       : file seed curated dengan judul duplikat dimuat refresh_catalog
+- curated    : output analisis tidak menimpa deskripsi curated, hanya skor;
+               reload seed tetap memperbarui deskripsi curated
+- concurrent : --threads thread merekam produk yang sama --rounds kali
+               bersamaan -> tanpa error dan times_recommended = jumlah rekaman
+
+Keluar dengan status 1 jika ada kasus yang gagal.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+
+from benchmarks.common import migrate_app_database, write_report
+
+
+def _entries(country, concern):
+    from app.db.database import SessionLocal
+    from app.models.product_catalog import CatalogProduct
+
+    db = SessionLocal()
+    try:
+        return [
+            {"title_key": entry.title_key, "title": entry.title, "description": entry.description,
+             "curated": entry.curated, "times_recommended": entry.times_recommended}
+            for entry in db.query(CatalogProduct).filter_by(country=country, concern=concern).order_by(CatalogProduct.title_key)
+        ]
+    finally:
+        db.close()
+
+
+def check_duplicates():
+    from app.services.product_catalog import record_analysis
+
+    result = {
+        "concerns": [{"name": "Acne"}, {"name": "acne "}],
+        "skincare_products": [
+            {"title": "CeraVe Cleanser", "description": "first"},
+            {"title": "cerave cleanser ", "description": "second"},
+            {"title": "CERAVE  CLEANSER", "description": "third"},
+            {"title": "Niacinamide Serum"},
+        ],
+    }
+    record_analysis("Indonesia", result)
+    record_analysis("indonesia", result)
+    entries = _entries("indonesia", "acne")
+    passed = [(entry["title_key"], entry["description"], entry["times_recommended"]) for entry in entries] == [
+        ("cerave cleanser", "first", 2),
+        ("niacinamide serum", "", 2),
+    ]
+    return {"passed": passed, "entries": entries}
+
+
+def check_seed(workdir):
+    from app.core.config import settings
+    from app.services.product_catalog import refresh_catalog
+
+    path = os.path.join(workdir, "seed.json")
+    seed = [
+        {"country": "Malaysia", "concern": "Dry Skin", "title": "Hydrating Toner", "description": "curated"},
+        {"country": "Malaysia", "concerns": ["dry skin"], "title": "hydrating toner", "description": "duplicate"},
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(seed, f)
+    settings.PRODUCT_CATALOG_SEED_PATH = path
+    try:
+        refreshed = refresh_catalog()
+    finally:
+        settings.PRODUCT_CATALOG_SEED_PATH = None
+    entries = _entries("malaysia", "dry skin")
+    passed = [(entry["title_key"], entry["description"], entry["curated"]) for entry in entries] == [("hydrating toner", "duplicate", True)]
+    return {"passed": passed, "refresh": refreshed, "entries": entries}
+
+
+def check_curated():
+    from app.db.database import SessionLocal
+    from app.services.product_catalog import record_analysis, upsert_products
+
+    record_analysis("Malaysia", {"concerns": [{"name": "Dry Skin"}], "skincare_products": [{"title": "Hydrating Toner", "description": "llm"}]})
+    after_llm = _entries("malaysia", "dry skin")
+    db = SessionLocal()
+    try:
+        upsert_products(db, "Malaysia", ["Dry Skin"], [{"title": "Hydrating Toner", "description": "curated v2"}], curated=True)
+    finally:
+        db.close()
+    after_reload = _entries("malaysia", "dry skin")
+    passed = (
+        [(entry["description"], entry["times_recommended"]) for entry in after_llm] == [("duplicate", 1)]
+        and [(entry["description"], entry["times_recommended"]) for entry in after_reload] == [("curated v2", 1)]
+    )
+    return {"passed": passed, "after_llm": after_llm, "after_reload": after_reload}
+
+
+def check_concurrent(threads, rounds):
+    from app.services.product_catalog import record_analysis
+
+    result = {"concerns": [{"name": "Oily Skin"}, {"name": "Enlarged Pores"}], "skincare_products": [{"title": "Clay Mask"}, {"title": "clay mask"}]}
+    errors = []
+    barrier = threading.Barrier(threads)
+
+    def record():
+        barrier.wait()
+        for _ in range(rounds):
+            try:
+                record_analysis("Thailand", result)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {str(e)[:120]}")
+
+    workers = [threading.Thread(target=record) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    entries = {concern: _entries("thailand", concern) for concern in ("oily skin", "enlarged pores")}
+    expected = threads * rounds - len(errors)
+    passed = not errors and all(
+        [(entry["title_key"], entry["times_recommended"]) for entry in concern_entries] == [("clay mask", expected)]
+        for concern_entries in entries.values()
+    )
+    return {"passed": passed, "records": threads * rounds, "errors": len(errors), "error_samples": errors[:5], "entries": entries}
+
+
+def _run_check(check, *args):
+    try:
+        return check(*args)
+    except Exception as e:
+        return {"passed": False, "error": f"{type(e).__name__}: {str(e)[:200]}"}
+
+
+def run(args, workdir):
+    migrate_app_database()
+    checks = {
+        "duplicates": _run_check(check_duplicates),
+        "seed": _run_check(check_seed, workdir),
+        "curated": _run_check(check_curated),
+        "concurrent": _run_check(check_concurrent, args.threads, args.rounds),
+    }
+    return {"config": {"threads": args.threads, "rounds": args.rounds}, "checks": checks}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check product catalog upserts with duplicate titles and concurrent writers")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=20, help="Rekaman per thread pada kasus concurrent")
+    parser.add_argument("--output", default=None, help="Path file JSON (default: stdout)")
+    args = parser.parse_args()
+
+    # Log app ke stderr agar stdout hanya berisi report JSON
+    stdout, sys.stdout = sys.stdout, sys.stderr
+
+    with tempfile.TemporaryDirectory(prefix="ronaai-catalog-check-") as workdir:
+        backend_dir = os.getcwd()
+        # Settings dibaca saat import app, jadi environment diatur lebih dulu
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'catalog.db')}"
+        os.environ["PRODUCT_CATALOG_SEED_PATH"] = ""
+        sys.path.insert(0, backend_dir)
+
+        report = run(args, workdir)
+
+    sys.stdout = stdout
+    write_report(report, args.output)
+    failed = [name for name, check in report["checks"].items() if not check["passed"]]
+    if failed:
+        print(f"❌ Product catalog checks failed: {failed}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,202 @@
+"""
+Regresi query plan: query per user tidak boleh full table scan.
+
+    python -m benchmarks.check_query_plans
+    python -m benchmarks.check_query_plans --journals 500 --output reports/query_plans.json
+
+App dijalankan in-process dengan database SQLite sementara yang dimigrasi
+(app/db/migrations). Setelah data contoh dibuat, semua SELECT yang
+dijalankan endpoint dan service berikut direkam lewat event engine (sync dan
+async), lalu diperiksa dengan EXPLAIN QUERY PLAN:
+
+- GET /analysis/history (juga view=summary), /analysis/get-analysis/{id}, /progress/metrics/{id}
+- GET /journals/get-journals, /journals/get-journal/{id}
+- GET /products/get-products, /skin/get-profile-skin
+- ketiga list di mode cursor (halaman kedua, dengan include_total)
+- konteks journal agent (build_journal_context), rekomendasi mode degraded
+  (cached_recommendations), save_analysis
+
+Keluar dengan status 1 jika ada "SCAN" pada tabel analyses, journals,
+products atau skin. Sort dengan temp B-tree dilaporkan sebagai peringatan.
+Tanpa ANALYZE (seperti database app), kecuali --analyze.
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import sys
+import tempfile
+import uuid
+
+from benchmarks.common import dispose_app_engines, migrate_app_database, write_report
+
+API = "/api/v1"
+TRACKED_TABLES = ("analyses", "journals", "products", "skin")
+FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(%s)\b" % "|".join(TRACKED_TABLES))
+TEMP_SORT = re.compile(r"USE TEMP B-TREE FOR (?:ORDER|GROUP) BY")
+
+
+class QueryRecorder:
+    """Rekam SELECT dari engine sync dan async (async_engine.sync_engine) per label operasi"""
+
+    def __init__(self, engines):
+        from sqlalchemy import event
+
+        self.label = None
+        self.queries = []
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if self.label and statement.lstrip().upper().startswith("SELECT"):
+            self.queries.append({"operation": self.label, "sql": statement, "parameters": parameters})
+
+
+def explain(engine, statement, parameters):
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", tuple(parameters or ())).all()
+    return [row[-1] for row in rows]
+
+
+async def run(args):
+    import httpx
+
+    from app.db.database import SessionLocal, async_engine, engine
+    from app.main import app
+    from app.services.analysis_pipeline import save_analysis, save_analysis_in_new_session
+    from app.services.fake_agent import fake_analysis
+    from app.services.journal_context import build_journal_context
+    from app.services.provisional_analysis import cached_recommendations
+
+    migrate_app_database()
+    rng = random.Random(args.seed)
+    recorder = QueryRecorder([engine, async_engine.sync_engine])
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://query-plans", timeout=60) as client:
+        users = []
+        for index in range(args.users):
+            response = await client.post(f"{API}/auth/register", json={
+                "name": f"Plan {index}", "email": f"plan-{index}-{uuid.uuid4().hex[:8]}@example.com",
+                "country": "Indonesia", "password": "PlanPassw0rd",
+            })
+            response.raise_for_status()
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            user_id = (await client.get(f"{API}/profile/me", headers=headers)).json()["data"]["id"]
+            await client.post(f"{API}/skin/create-profile-skin", headers=headers, json={"skin_type": "Oily", "concerns": ["Acne"]})
+            for i in range(args.journals):
+                await client.post(f"{API}/journals/create-journal", headers=headers, json={"title": f"Day {i}", "content": "Cheeks dry, forehead oily."})
+            for i in range(args.products):
+                await client.post(f"{API}/products/create-product", headers=headers, json={
+                    "product_name": f"Serum {i}", "product_category": "Serum", "ai_recommendation": False,
+                })
+            for i in range(args.analyses):
+                await asyncio.to_thread(save_analysis_in_new_session, user_id, f"http://plans/uploads/skin-images/{user_id}_{i}.jpg", fake_analysis(rng).model_dump())
+            users.append({"id": user_id, "headers": headers})
+
+        if args.analyze:
+            with engine.begin() as conn:
+                conn.exec_driver_sql("ANALYZE")
+
+        user = users[-1]
+        headers = user["headers"]
+        history = (await client.get(f"{API}/analysis/history", headers=headers)).json()["data"]
+        journals = (await client.get(f"{API}/journals/get-journals", headers=headers)).json()["data"]
+        latest_analysis = history["items"][0]["id"]
+        journal_id = journals["items"][0]["id"]
+        cursors = {
+            path: (await client.get(f"{API}{path}", headers=headers, params={"limit": 2})).json()["data"]["next_cursor"]
+            for path in ("/analysis/history", "/journals/get-journals", "/products/get-products")
+        }
+
+        operations = [
+            ("GET /analysis/history", "GET", f"{API}/analysis/history"),
+            ("GET /analysis/history?view=summary", "GET", f"{API}/analysis/history?view=summary"),
+            ("GET /analysis/get-analysis/{id}", "GET", f"{API}/analysis/get-analysis/{latest_analysis}"),
+            ("GET /progress/metrics/{id}", "GET", f"{API}/progress/metrics/{latest_analysis}"),
+            ("GET /journals/get-journals", "GET", f"{API}/journals/get-journals"),
+            ("GET /journals/get-journal/{id}", "GET", f"{API}/journals/get-journal/{journal_id}"),
+            ("GET /products/get-products", "GET", f"{API}/products/get-products"),
+            ("GET /skin/get-profile-skin", "GET", f"{API}/skin/get-profile-skin"),
+        ] + [
+            (f"GET {path}?cursor", "GET", f"{API}{path}?limit=2&include_total=true&cursor={cursor}")
+            for path, cursor in cursors.items()
+        ]
+        for label, method, url in operations:
+            recorder.label = label
+            response = await client.request(method, url, headers=headers)
+            response.raise_for_status()
+
+        def service_calls():
+            db = SessionLocal()
+            try:
+                recorder.label = "build_journal_context"
+                build_journal_context(db, user["id"])
+                recorder.label = "cached_recommendations"
+                cached_recommendations(db, user["id"], ["Acne", "Dark Spots"])
+                recorder.label = "save_analysis"
+                save_analysis(db, user["id"], "http://plans/uploads/skin-images/extra.jpg", fake_analysis(rng).model_dump())
+            finally:
+                recorder.label = None
+                db.close()
+
+        await asyncio.to_thread(service_calls)
+
+    checks = []
+    for query in recorder.queries:
+        if not any(re.search(rf"\b{table}\b", query["sql"]) for table in TRACKED_TABLES):
+            continue
+        plan = explain(engine, query["sql"], query["parameters"])
+        full_scans = [detail for detail in plan if FULL_SCAN.search(detail)]
+        checks.append({
+            "operation": query["operation"],
+            "sql": " ".join(query["sql"].split())[:300],
+            "plan": plan,
+            "status": "full_scan" if full_scans else "temp_sort" if any(TEMP_SORT.search(detail) for detail in plan) else "ok",
+        })
+    await dispose_app_engines()
+
+    failures = [check for check in checks if check["status"] == "full_scan"]
+    return {
+        "config": {"users": args.users, "journals": args.journals, "products": args.products, "analyses": args.analyses, "analyze": args.analyze},
+        "queries": len(checks),
+        "full_scans": len(failures),
+        "temp_sorts": sum(1 for check in checks if check["status"] == "temp_sort"),
+        "failures": failures,
+        "checks": checks,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail if per-user queries fall back to full table scans")
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--journals", type=int, default=20, help="Journal per user")
+    parser.add_argument("--products", type=int, default=10, help="Produk per user")
+    parser.add_argument("--analyses", type=int, default=10, help="Analisis per user")
+    parser.add_argument("--analyze", action="store_true", help="Jalankan ANALYZE sebelum EXPLAIN (statistik tabel)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Path file JSON (default: stdout)")
+    args = parser.parse_args()
+
+    # Log app ke stderr agar stdout hanya berisi report JSON
+    stdout, sys.stdout = sys.stdout, sys.stderr
+
+    with tempfile.TemporaryDirectory(prefix="ronaai-query-plans-") as workdir:
+        backend_dir = os.getcwd()
+        # Settings dibaca saat import app, jadi environment diatur lebih dulu
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'plans.db')}"
+        os.environ["ONNX_PERSIST_OPTIMIZED_MODEL"] = "false"
+        os.environ["PREDICTION_CACHE_DB_PATH"] = ""
+        sys.path.insert(0, backend_dir)
+        os.chdir(workdir)
+        os.makedirs("uploads", exist_ok=True)
+
+        report = asyncio.run(run(args))
+        os.chdir(backend_dir)
+
+    sys.stdout = stdout
+    write_report(report, args.output)
+    if report["failures"]:
+        for failure in report["failures"]:
+            print(f"❌ Full table scan in {failure['operation']}: {failure['plan']}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,159 @@
+"""
+Cek bahwa endpoint lain tetap responsif selama /analysis/analyze berjalan.
+
+    python -m benchmarks.check_responsiveness
+    python -m benchmarks.check_responsiveness --analyses 16 --agent-latency 5
+    python -m benchmarks.check_responsiveness --agent-mode blocking   # perilaku lama (agent.run sync)
+
+App dijalankan in-process lewat httpx ASGITransport dengan database SQLite
+sementara dan model ONNX sintetis. Gemini diganti stand-in yang hanya
+menunggu --agent-latency detik lalu mengembalikan respons contoh, sehingga
+yang terukur murni perilaku event loop. Selama analisis berjalan,
+GET /analysis/history di-probe berulang kali; script keluar dengan status 1
+jika p95 latency probe melebihi --max-probe-p95-ms.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.common import dispose_app_engines, migrate_app_database, percentiles, write_report
+from benchmarks.synthetic_model import build_synthetic_model, synthetic_image_bytes
+
+
+def _install_agent_stand_in(latency, mode):
+    from app.services import analysis_pipeline
+    from app.services.agent import SkinAnalysisResponse
+
+    example = SkinAnalysisResponse.model_config["json_schema_extra"]["example"]
+    response_json = SkinAnalysisResponse(**example).model_dump_json(indent=2)
+
+    async def analyze_skin_async(image_url, country=None, journals=None, **kwargs):
+        if mode == "blocking":
+            # Simulasi agent.run sync di dalam handler async
+            time.sleep(latency)
+        else:
+            await asyncio.sleep(latency)
+        return response_json
+
+    analysis_pipeline.analyze_skin_async = analyze_skin_async
+
+
+async def _probe(client, headers, stop, interval):
+    """
+    Latency = keterlambatan bangun dari sleep + durasi request, sehingga event
+    loop yang terblokir ikut terukur walau tidak ada request yang sedang jalan
+    """
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        response = await client.get("/api/v1/analysis/history", headers=headers)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start - interval) * 1000)
+    return latencies
+
+
+async def run(args, workdir):
+    import httpx
+
+    from app.main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        response = await client.post("/api/v1/auth/register", json={
+            "name": "Bench", "email": "bench@example.com", "country": "Indonesia", "password": "BenchPassw0rd",
+        })
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        # Baseline: latency probe tanpa analisis berjalan
+        idle_stop = asyncio.Event()
+        idle_task = asyncio.create_task(_probe(client, headers, idle_stop, args.probe_interval))
+        await asyncio.sleep(1.0)
+        idle_stop.set()
+        idle_latencies = await idle_task
+
+        image = synthetic_image_bytes(1280, 960)
+
+        async def analyze(i):
+            start = time.perf_counter()
+            response = await client.post(
+                "/api/v1/analysis/analyze",
+                headers=headers,
+                files={"image": (f"bench_{i}.jpg", image, "image/jpeg")},
+            )
+            return response.status_code, (time.perf_counter() - start) * 1000
+
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(_probe(client, headers, stop, args.probe_interval))
+        start = time.perf_counter()
+        # Upload dengan jeda kecil agar filename berbasis timestamp tidak bentrok
+        analyses = []
+        for i in range(args.analyses):
+            analyses.append(asyncio.create_task(analyze(i)))
+            await asyncio.sleep(1.05)
+        results = await asyncio.gather(*analyses)
+        wall_s = time.perf_counter() - start
+        stop.set()
+        busy_latencies = await probe_task
+    await dispose_app_engines()
+
+    statuses = {}
+    for status_code, _ in results:
+        statuses[str(status_code)] = statuses.get(str(status_code), 0) + 1
+    return {
+        "agent_mode": args.agent_mode,
+        "agent_latency_s": args.agent_latency,
+        "analyses": args.analyses,
+        "analysis_statuses": statuses,
+        "analysis_latency_ms": percentiles([latency for _, latency in results]),
+        "wall_time_s": round(wall_s, 2),
+        "probe_idle_ms": percentiles(idle_latencies),
+        "probe_during_analysis_ms": percentiles(busy_latencies),
+        "probe_samples": len(busy_latencies),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check event loop responsiveness during analyses")
+    parser.add_argument("--analyses", type=int, default=4)
+    parser.add_argument("--agent-latency", type=float, default=3.0, help="Latency stand-in Gemini (detik)")
+    parser.add_argument("--agent-mode", choices=["async", "blocking"], default="async")
+    parser.add_argument("--probe-interval", type=float, default=0.05)
+    parser.add_argument("--max-probe-p95-ms", type=float, default=500.0)
+    parser.add_argument("--output", default=None, help="Path file JSON (default: stdout)")
+    args = parser.parse_args()
+
+    # Log app ke stderr agar stdout hanya berisi report JSON
+    stdout, sys.stdout = sys.stdout, sys.stderr
+
+    with tempfile.TemporaryDirectory(prefix="ronaai-bench-") as workdir:
+        # Settings dibaca saat import app, jadi environment diatur lebih dulu
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        os.environ["ONNX_PERSIST_OPTIMIZED_MODEL"] = "false"
+        os.environ["PREDICTION_CACHE_DB_PATH"] = ""
+        backend_dir = os.getcwd()
+        sys.path.insert(0, backend_dir)
+        os.chdir(workdir)
+        os.makedirs("uploads", exist_ok=True)
+
+        import app.main  # noqa: F401 (import app dulu: urutan import models/database)
+        migrate_app_database()
+        from app.services.load_model import METADATA_JSON, ProductionONNXEnsembleModel, get_model_cache
+
+        model_path = build_synthetic_model(os.path.join(workdir, "synthetic.onnx"))
+        get_model_cache().swap_model(ProductionONNXEnsembleModel(model_path, METADATA_JSON, warmup_batch_sizes=[1]))
+        _install_agent_stand_in(args.agent_latency, args.agent_mode)
+
+        report = asyncio.run(run(args, workdir))
+        os.chdir(backend_dir)
+
+    sys.stdout = stdout
+    write_report(report, args.output)
+    p95 = report["probe_during_analysis_ms"]["p95"]
+    if p95 is None or p95 > args.max_probe_p95_ms:
+        print(f"❌ Probe p95 {p95} ms exceeds {args.max_probe_p95_ms} ms", file=sys.stderr)
+        sys.exit(1)
+    print(f"✅ Probe p95 {p95} ms during {args.analyses} analyses", file=sys.stderr)
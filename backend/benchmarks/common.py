@@ -0,0 +1,85 @@
+"""
+Helper bersama untuk script benchmark.
+
+Jalankan semua script dari folder backend/, contoh:
+    python -m benchmarks.compare_variants --images ./data/labelled
+"""
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+
+
+def percentiles(values: Iterable[float], points=(50, 95, 99)) -> Dict[str, float]:
+    """
+    Ringkasan latency (ms) dalam bentuk {"p50": .., "p95": .., "p99": .., "mean": ..}
+    """
+    values = np.asarray(list(values), dtype=np.float64)
+    if values.size == 0:
+        return {**{f"p{p}": None for p in points}, "mean": None}
+    summary = {f"p{p}": round(float(np.percentile(values, p)), 3) for p in points}
+    summary["mean"] = round(float(values.mean()), 3)
+    return summary
+
+
+def list_images(folder) -> List[str]:
+    return sorted(
+        str(path) for path in Path(folder).rglob("*")
+        if path.suffix.lower() in IMAGE_EXTENSIONS
+    )
+
+
+def load_labelled_folder(folder) -> List[Tuple[str, Optional[str]]]:
+    """
+    Folder berlabel dengan layout <folder>/<NamaKelas>/<gambar>.
+    Gambar langsung di root folder dianggap tanpa label.
+    """
+    folder = Path(folder)
+    samples = []
+    for path in list_images(folder):
+        relative = Path(path).relative_to(folder)
+        label = relative.parts[0] if len(relative.parts) > 1 else None
+        samples.append((path, label))
+    return samples
+
+
+def migrate_app_database():
+    """
+    Jalankan migrasi schema app (event startup tidak dijalankan ASGITransport).
+    Checkout lama tanpa app/db/migrations membuat schema saat import
+    """
+    try:
+        from app.db.migrations import run_migrations
+    except ImportError:
+        return
+    run_migrations()
+
+
+async def dispose_app_engines():
+    """
+    Tutup pool engine async app (koneksi aiosqlite memakai thread yang
+    menahan proses keluar). ASGITransport tidak menjalankan event shutdown
+    """
+    from app.db import database
+
+    if hasattr(database, "async_engine"):
+        await database.async_engine.dispose()
+
+
+def write_report(report: Dict, output: Optional[str] = None):
+    """
+    Tulis report JSON ke file (jika output diberikan) atau stdout
+    """
+    payload = json.dumps(report, indent=2, default=str)
+    if output:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as f:
+            f.write(payload)
+        print(f"📄 Report written to {output}", file=sys.stderr)
+    else:
+        print(payload)
@@ -0,0 +1,145 @@
+"""
+Bandingkan varian model (fp32 / int8 / fp16) pada folder gambar berlabel.
+
+    python -m app.services.model_variants build
+    python -m benchmarks.compare_variants --images ./data/labelled --output reports/variants.json
+
+Setiap varian dijalankan di proses terpisah agar peak memory terukur sendiri.
+Report berisi top-1/top-5 agreement terhadap varian referensi, akurasi per
+kelas beserta selisihnya, persentil latency, dan peak RSS.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import load_labelled_folder, percentiles, write_report
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: KB, macOS: bytes
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def _run_variant(model_path, image_paths, session_profile):
+    from app.services.load_model import METADATA_JSON, ProductionONNXEnsembleModel
+
+    # Log model ke stderr agar stdout hanya berisi report JSON
+    sys.stdout = sys.stderr
+    rss_before_load = _peak_rss_mb()
+    model = ProductionONNXEnsembleModel(
+        model_path, METADATA_JSON, session_profile=session_profile, warmup_batch_sizes=[1]
+    )
+
+    latencies = []
+    scores = []
+    for image_path in image_paths:
+        img_array = model.preprocess_image(image_path)
+        start = time.perf_counter()
+        outputs = model.run_batch(img_array)
+        latencies.append((time.perf_counter() - start) * 1000)
+        scores.append(model.postprocess_batch(outputs)[0]["all_predictions"])
+
+    return {
+        "classes": list(model.classes),
+        "scores": scores,
+        "latencies_ms": latencies,
+        "rss_before_load_mb": round(rss_before_load, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def _accuracy_by_class(top1, labels, classes):
+    per_class = {}
+    for class_idx, class_name in enumerate(classes):
+        mask = labels == class_idx
+        if mask.any():
+            per_class[class_name] = round(float((top1[mask] == class_idx).mean()), 4)
+    return per_class
+
+
+def compare(samples, variants, reference="fp32", session_profile=None):
+    from app.services.load_model import model_variant_path
+
+    image_paths = [path for path, _ in samples]
+    ctx = mp.get_context("spawn")
+    raw = {}
+    for variant in variants:
+        model_path = model_variant_path(variant)
+        if not os.path.exists(model_path):
+            print(f"⏭️  Skipping {variant}: {model_path} not found", file=sys.stderr)
+            continue
+        print(f"⏱️  Running {variant} on {len(image_paths)} images...", file=sys.stderr)
+        with ctx.Pool(1) as pool:
+            raw[variant] = pool.apply(_run_variant, (model_path, image_paths, session_profile))
+        raw[variant]["model_size_mb"] = round(os.path.getsize(model_path) / 1024 / 1024, 2)
+
+    if reference not in raw:
+        raise SystemExit(f"Reference variant '{reference}' could not be run")
+
+    classes = raw[reference]["classes"]
+    class_index = {name: idx for idx, name in enumerate(classes)}
+    labels = np.array([class_index.get(label, -1) for _, label in samples])
+    has_labels = bool((labels >= 0).any())
+
+    ref_scores = np.asarray(raw[reference]["scores"], dtype=np.float32)
+    ref_top1 = ref_scores.argmax(axis=1)
+    ref_top5 = np.argsort(-ref_scores, axis=1)[:, :5]
+    ref_per_class = _accuracy_by_class(ref_top1[labels >= 0], labels[labels >= 0], classes) if has_labels else {}
+
+    report = {
+        "images": len(image_paths),
+        "labelled_images": int((labels >= 0).sum()),
+        "reference": reference,
+        "session_profile": session_profile,
+        "variants": {},
+    }
+    for variant, data in raw.items():
+        scores = np.asarray(data["scores"], dtype=np.float32)
+        top1 = scores.argmax(axis=1)
+        top5 = np.argsort(-scores, axis=1)[:, :5]
+        top5_overlap = [len(set(a) & set(b)) / top5.shape[1] for a, b in zip(top5.tolist(), ref_top5.tolist())]
+        latency_total_s = sum(data["latencies_ms"]) / 1000
+
+        entry = {
+            "model_size_mb": data["model_size_mb"],
+            "top1_agreement": round(float((top1 == ref_top1).mean()), 4),
+            "top5_agreement": round(float(np.mean(top5_overlap)), 4),
+            "reference_top1_in_top5": round(float((top5 == ref_top1[:, None]).any(axis=1).mean()), 4),
+            "max_abs_score_diff": round(float(np.abs(scores - ref_scores).max()), 6),
+            "latency_ms": percentiles(data["latencies_ms"]),
+            "images_per_sec": round(len(image_paths) / latency_total_s, 2) if latency_total_s else None,
+            "rss_before_load_mb": data["rss_before_load_mb"],
+            "peak_rss_mb": data["peak_rss_mb"],
+        }
+        if has_labels:
+            mask = labels >= 0
+            per_class = _accuracy_by_class(top1[mask], labels[mask], classes)
+            entry["top1_accuracy"] = round(float((top1[mask] == labels[mask]).mean()), 4)
+            entry["per_class_accuracy"] = per_class
+            entry["per_class_accuracy_delta"] = {
+                name: round(acc - ref_per_class.get(name, 0.0), 4) for name, acc in per_class.items()
+            }
+        report["variants"][variant] = entry
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare fp32 / int8 / fp16 model variants")
+    parser.add_argument("--images", required=True, help="Folder berlabel: <folder>/<NamaKelas>/*.jpg")
+    parser.add_argument("--variants", nargs="+", default=["fp32", "int8", "fp16"])
+    parser.add_argument("--reference", default="fp32")
+    parser.add_argument("--profile", default=None, help="ONNX session profile (default: Settings)")
+    parser.add_argument("--limit", type=int, default=None, help="Batasi jumlah gambar")
+    parser.add_argument("--output", default=None, help="Path file JSON (default: stdout)")
+    args = parser.parse_args()
+
+    samples = load_labelled_folder(args.images)[:args.limit]
+    if not samples:
+        raise SystemExit(f"No images found in {args.images}")
+    write_report(compare(samples, args.variants, reference=args.reference, session_profile=args.profile), args.output)
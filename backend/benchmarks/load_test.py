@@ -0,0 +1,283 @@
+"""
+Load test end-to-end pipeline analisis dengan virtual user bersamaan.
+
+    python -m benchmarks.load_test --users 50 --iterations 2
+    python -m benchmarks.load_test --users 20 --mode job --agent-latency 5 --agent-error-rate 0.05 --output reports/load.json
+    python -m benchmarks.load_test --base-url http://localhost:8066 --users 10   # server yang sudah berjalan
+
+Tanpa --base-url, app dijalankan in-process lewat httpx ASGITransport dengan
+database SQLite sementara, model ONNX sintetis dan AGENT_BACKEND=fake
+(services/fake_agent.py), sehingga upload, klasifikasi, render, agent dan
+DB ikut terukur tanpa memakai kuota Gemini. Dengan --base-url, server harus
+dijalankan sendiri (mis. AGENT_BACKEND=fake uvicorn app.main:app).
+
+Setiap virtual user: register, buat journal, lalu --iterations kali
+analyze (mode sync / job / stream) + GET /analysis/history. Report JSON
+berisi throughput, persentil latency per endpoint, dan breakdown error
+(status code / exception + detail).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+
+from benchmarks.common import dispose_app_engines, migrate_app_database, percentiles, write_report
+from benchmarks.synthetic_model import build_synthetic_model, synthetic_image_bytes
+
+API = "/api/v1"
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = defaultdict(Counter)
+
+    def record(self, endpoint, started, status=None, error=None):
+        self.latencies[endpoint].append((time.perf_counter() - started) * 1000)
+        self.statuses[endpoint][str(status) if status is not None else "exception"] += 1
+        if error:
+            self.errors[endpoint][error[:200]] += 1
+
+    async def request(self, client, endpoint, method, url, ok=(200,), **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except Exception as e:
+            self.record(endpoint, started, error=f"{type(e).__name__}: {str(e)}")
+            return None
+        error = None
+        if response.status_code not in ok:
+            try:
+                error = f"{response.status_code}: {response.json().get('detail')}"
+            except Exception:
+                error = f"{response.status_code}: {response.text[:200]}"
+        self.record(endpoint, started, response.status_code, error)
+        return response if error is None else None
+
+    def report(self, wall_s):
+        endpoints = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            total = len(latencies)
+            failed = total - sum(count for status, count in self.statuses[endpoint].items() if status.startswith("2"))
+            endpoints[endpoint] = {
+                "requests": total,
+                "throughput_rps": round(total / wall_s, 3),
+                "error_rate": round(failed / total, 4),
+                "latency_ms": percentiles(latencies),
+                "statuses": dict(self.statuses[endpoint]),
+                "errors": dict(self.errors[endpoint].most_common(10)),
+            }
+        return endpoints
+
+
+async def _analyze_sync(client, recorder, headers, image, name):
+    return await recorder.request(
+        client, "POST /analysis/analyze", "POST", f"{API}/analysis/analyze",
+        headers=headers, files={"image": (name, image, "image/jpeg")},
+    )
+
+
+async def _analyze_job(client, recorder, headers, image, name, poll_interval):
+    started = time.perf_counter()
+    response = await recorder.request(
+        client, "POST /analysis/analyze?mode=job", "POST", f"{API}/analysis/analyze",
+        ok=(202,), params={"mode": "job"}, headers=headers, files={"image": (name, image, "image/jpeg")},
+    )
+    if response is None:
+        return None
+    job_id = response.json()["data"]["job"]["id"]
+    while True:
+        await asyncio.sleep(poll_interval)
+        status = await recorder.request(client, "GET /analysis/jobs/{id}", "GET", f"{API}/analysis/jobs/{job_id}", headers=headers)
+        if status is None:
+            return None
+        job = status.json()["data"]["job"]
+        if job["status"] in ("succeeded", "dead"):
+            recorder.record(
+                "job end-to-end", started, job["status"] == "succeeded" and 200 or 500,
+                None if job["status"] == "succeeded" else f"dead: {job['last_error']}",
+            )
+            return status
+
+
+async def _analyze_stream(client, recorder, headers, image, name, record_first_event):
+    started = time.perf_counter()
+    try:
+        async with client.stream(
+            "POST", f"{API}/analysis/analyze/stream", headers=headers, files={"image": (name, image, "image/jpeg")},
+        ) as response:
+            event = None
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event = line.split(":", 1)[1].strip()
+                    if event == "prediction" and record_first_event:
+                        recorder.record("stream first prediction", started, response.status_code)
+                elif line.startswith("data:") and event in ("result", "error"):
+                    error = None if event == "result" else json.loads(line.split(":", 1)[1]).get("detail")
+                    recorder.record("POST /analysis/analyze/stream", started, 200 if event == "result" else 500, error)
+                    return response
+    except Exception as e:
+        recorder.record("POST /analysis/analyze/stream", started, error=f"{type(e).__name__}: {str(e)}")
+    return None
+
+
+async def virtual_user(client, recorder, args, user_index, image):
+    email = f"load-{user_index}-{uuid.uuid4().hex[:8]}@example.com"
+    response = await recorder.request(client, "POST /auth/register", "POST", f"{API}/auth/register", ok=(201,), json={
+        "name": f"Load {user_index}", "email": email, "country": "Indonesia", "password": "LoadTestPassw0rd",
+    })
+    if response is None:
+        return
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    await recorder.request(client, "POST /journals/create-journal", "POST", f"{API}/journals/create-journal", headers=headers, json={
+        "title": "Load test", "content": "Some acne on the chin and dry cheeks after a new moisturizer.",
+    })
+
+    for iteration in range(args.iterations):
+        name = f"load_{user_index}_{iteration}.jpg"
+        if args.mode == "job":
+            await _analyze_job(client, recorder, headers, image, name, args.poll_interval)
+        elif args.mode == "stream":
+            # ASGITransport membaca seluruh body dulu: waktu event pertama hanya berarti dengan --base-url
+            await _analyze_stream(client, recorder, headers, image, name, record_first_event=bool(args.base_url))
+        else:
+            await _analyze_sync(client, recorder, headers, image, name)
+        await recorder.request(client, "GET /analysis/history", "GET", f"{API}/analysis/history", headers=headers)
+        # Nama file upload berbasis timestamp per detik: jeda agar upload user yang sama tidak bentrok
+        await asyncio.sleep(args.think_time)
+
+
+async def run(args):
+    import httpx
+
+    if args.base_url:
+        transport, base_url = None, args.base_url
+    else:
+        from app.main import app
+
+        transport, base_url = httpx.ASGITransport(app=app), "http://load-test"
+
+    image = synthetic_image_bytes(args.image_width, args.image_height)
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.users * 2, max_keepalive_connections=args.users * 2)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        users = []
+        for user_index in range(args.users):
+            users.append(asyncio.create_task(virtual_user(client, recorder, args, user_index, image)))
+            if args.ramp_up:
+                await asyncio.sleep(args.ramp_up / args.users)
+        await asyncio.gather(*users)
+        wall_s = time.perf_counter() - started
+
+    analyses_endpoint = {
+        "sync": "POST /analysis/analyze",
+        "job": "job end-to-end",
+        "stream": "POST /analysis/analyze/stream",
+    }[args.mode]
+    analysis_statuses = recorder.statuses.get(analyses_endpoint, Counter())
+    completed = sum(count for status, count in analysis_statuses.items() if status.startswith("2"))
+
+    report = {
+        "config": {
+            "users": args.users,
+            "iterations": args.iterations,
+            "mode": args.mode,
+            "base_url": args.base_url,
+            "agent_latency_s": args.agent_latency,
+            "agent_latency_distribution": args.agent_latency_distribution,
+            "agent_error_rate": args.agent_error_rate,
+            "image_size": f"{args.image_width}x{args.image_height}",
+        },
+        "wall_time_s": round(wall_s, 2),
+        "analyses_completed": completed,
+        "analyses_per_second": round(completed / wall_s, 3),
+        "endpoints": recorder.report(wall_s),
+    }
+    if not args.base_url:
+        from app.services import analysis_pipeline
+
+        report["pipeline_stats"] = analysis_pipeline.stats()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end load test for the analysis pipeline")
+    parser.add_argument("--users", type=int, default=10, help="Virtual user bersamaan")
+    parser.add_argument("--iterations", type=int, default=2, help="Analisis per virtual user")
+    parser.add_argument("--mode", choices=["sync", "job", "stream"], default="sync")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Detik untuk memulai semua user")
+    parser.add_argument("--think-time", type=float, default=1.0)
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Interval polling status job (mode job)")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--image-width", type=int, default=1280)
+    parser.add_argument("--image-height", type=int, default=960)
+    parser.add_argument("--agent-latency", type=float, default=3.0, help="AGENT_FAKE_LATENCY_SECONDS (in-process)")
+    parser.add_argument("--agent-latency-distribution", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--agent-latency-sigma", type=float, default=0.5)
+    parser.add_argument("--agent-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--base-url", default=None, help="Uji server yang sudah berjalan, bukan app in-process")
+    parser.add_argument("--max-error-rate", type=float, default=None, help="Keluar dengan status 1 jika error rate analisis melebihi ini")
+    parser.add_argument("--output", default=None, help="Path file JSON (default: stdout)")
+    args = parser.parse_args()
+
+    # Log app ke stderr agar stdout hanya berisi report JSON
+    stdout, sys.stdout = sys.stdout, sys.stderr
+
+    with tempfile.TemporaryDirectory(prefix="ronaai-load-") as workdir:
+        backend_dir = os.getcwd()
+        if not args.base_url:
+            # Settings dibaca saat import app, jadi environment diatur lebih dulu
+            os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+            os.environ["ONNX_PERSIST_OPTIMIZED_MODEL"] = "false"
+            os.environ["PREDICTION_CACHE_DB_PATH"] = ""
+            os.environ["AGENT_BACKEND"] = "fake"
+            os.environ["AGENT_FAKE_LATENCY_SECONDS"] = str(args.agent_latency)
+            os.environ["AGENT_FAKE_LATENCY_DISTRIBUTION"] = args.agent_latency_distribution
+            os.environ["AGENT_FAKE_LATENCY_SIGMA"] = str(args.agent_latency_sigma)
+            os.environ["AGENT_FAKE_ERROR_RATE"] = str(args.agent_error_rate)
+            os.environ["AGENT_FAKE_SEED"] = str(args.seed)
+            sys.path.insert(0, backend_dir)
+            os.chdir(workdir)
+            os.makedirs("uploads", exist_ok=True)
+
+            import app.main  # noqa: F401 (import app dulu: urutan import models/database)
+            migrate_app_database()
+            from app.services import job_queue
+            from app.services.load_model import METADATA_JSON, ProductionONNXEnsembleModel, get_model_cache
+
+            model_path = build_synthetic_model(os.path.join(workdir, "synthetic.onnx"))
+            get_model_cache().swap_model(ProductionONNXEnsembleModel(model_path, METADATA_JSON, warmup_batch_sizes=[1]))
+
+        async def main():
+            if args.base_url:
+                return await run(args)
+            # ASGITransport tidak menjalankan event startup/shutdown: worker job dan pool DB diurus di sini
+            if args.mode == "job":
+                job_queue.start_workers()
+            try:
+                return await run(args)
+            finally:
+                if args.mode == "job":
+                    await job_queue.stop_workers()
+                await dispose_app_engines()
+
+        report = asyncio.run(main())
+        os.chdir(backend_dir)
+
+    sys.stdout = stdout
+    write_report(report, args.output)
+    if args.max_error_rate is not None:
+        total = args.users * args.iterations
+        error_rate = 1 - report["analyses_completed"] / total if total else 0.0
+        if error_rate > args.max_error_rate:
+            print(f"❌ Analysis error rate {error_rate:.3f} exceeds {args.max_error_rate}", file=sys.stderr)
+            sys.exit(1)
@@ -0,0 +1,93 @@
+"""
+Model ONNX sintetis dengan interface yang sama seperti skin_detection_ensemble.onnx.
+
+Input  : [batch, H, W, 3] float32 (NHWC, 0..1)
+Output : confidence [batch], predicted_class [batch], predictions [batch, C]
+
+Dipakai benchmark/load test saat model asli tidak tersedia:
+    python -m benchmarks.synthetic_model --output /tmp/synthetic.onnx
+"""
+import argparse
+
+import numpy as np
+
+
+def build_synthetic_model(path, num_classes=10, input_size=224, width=32, seed=0):
+    """
+    Tulis CNN kecil (2 conv + global pooling + dense) ke `path`
+    """
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+
+    rng = np.random.RandomState(seed)
+
+    def weight(name, *shape):
+        return numpy_helper.from_array((rng.randn(*shape) * 0.1).astype(np.float32), name)
+
+    initializers = [
+        weight("conv1_w", width // 2, 3, 3, 3),
+        weight("conv1_b", width // 2),
+        weight("conv2_w", width, width // 2, 3, 3),
+        weight("conv2_b", width),
+        weight("dense_w", width, num_classes),
+        weight("dense_b", num_classes),
+        numpy_helper.from_array(np.array([1], dtype=np.int64), "reduce_axes"),
+    ]
+    nodes = [
+        helper.make_node("Transpose", ["input"], ["nchw"], perm=[0, 3, 1, 2]),
+        helper.make_node("Conv", ["nchw", "conv1_w", "conv1_b"], ["conv1"], strides=[2, 2], pads=[1, 1, 1, 1]),
+        helper.make_node("Relu", ["conv1"], ["relu1"]),
+        helper.make_node("Conv", ["relu1", "conv2_w", "conv2_b"], ["conv2"], strides=[2, 2], pads=[1, 1, 1, 1]),
+        helper.make_node("Relu", ["conv2"], ["relu2"]),
+        helper.make_node("GlobalAveragePool", ["relu2"], ["pooled"]),
+        helper.make_node("Flatten", ["pooled"], ["features"]),
+        helper.make_node("Gemm", ["features", "dense_w", "dense_b"], ["logits"]),
+        helper.make_node("Softmax", ["logits"], ["predictions"], axis=-1),
+        helper.make_node("ReduceMax", ["predictions", "reduce_axes"], ["confidence"], keepdims=0),
+        helper.make_node("ArgMax", ["predictions"], ["predicted_class"], axis=1, keepdims=0),
+    ]
+    graph = helper.make_graph(
+        nodes,
+        "synthetic_skin_ensemble",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, ["batch", input_size, input_size, 3])],
+        [
+            helper.make_tensor_value_info("confidence", TensorProto.FLOAT, ["batch"]),
+            helper.make_tensor_value_info("predicted_class", TensorProto.INT64, ["batch"]),
+            helper.make_tensor_value_info("predictions", TensorProto.FLOAT, ["batch", num_classes]),
+        ],
+        initializers,
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 18)])
+    model.ir_version = 9
+    onnx.checker.check_model(model)
+    onnx.save(model, path)
+    return path
+
+
+def synthetic_image_bytes(width, height, seed=0, format="JPEG", quality=90):
+    """
+    Gambar RGB (gradient + noise) yang di-encode seperti foto upload
+    """
+    import io
+
+    from PIL import Image
+
+    rng = np.random.RandomState(seed)
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None, None]
+    x = np.linspace(0, 1, width, dtype=np.float32)[None, :, None]
+    base = np.concatenate([x * np.ones_like(y), y * np.ones_like(x), (x + y) / 2], axis=2)
+    noise = rng.rand(height, width, 3).astype(np.float32) * 0.2
+    pixels = np.clip((base * 0.8 + noise) * 255, 0, 255).astype(np.uint8)
+
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format=format, quality=quality)
+    return buffer.getvalue()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic skin classifier ONNX model")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--num-classes", type=int, default=10)
+    parser.add_argument("--input-size", type=int, default=224)
+    args = parser.parse_args()
+    print(build_synthetic_model(args.output, num_classes=args.num_classes, input_size=args.input_size))
@@ -164,12 +164,11 @@ const ProfilePage = () => {
           userId: analysis.user_id,
           imageUrl: analysis.image_url,
           overallHealth: analysis.overall_health,
-          concerns: Array.isArray(analysis.concerns)
+          concerns: Array.isArray(analysis.top_concerns)
+            ? analysis.top_concerns
+            : Array.isArray(analysis.concerns)
             ? analysis.concerns.map((c) => c.name)
             : [],
-          recommendations: Array.isArray(analysis.recommendations)
-            ? analysis.recommendations.map((r) => r.title)
-            : [],
           createdAt: analysis.created_at,
         }));
         setAnalysisData(analysisData);
@@ -46,7 +46,8 @@ export const analysisService = {
     getAnalysisHistory: async (skip = 0, limit = 10) => {
         try {
             const response = await api.get('/analysis/history', {
-                params: { skip, limit }
+                // Mode summary: tanpa recommendations/skincare_products (cukup untuk list)
+                params: { skip, limit, view: 'summary' }
             });
             
             if (response.data?.items) {